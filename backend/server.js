@@ -858,6 +858,33 @@ app.post('/api/llm/query', requireAuth, async (req, res) => {
   }
 });
 
+app.post('/api/llm/query/batch', requireAuth, async (req, res) => {
+  try {
+    const { queries, threshold, max_results, use_healing } = req.body || {};
+    if (!Array.isArray(queries) || queries.length === 0 || queries.some((q) => !q || !String(q).trim())) {
+      return res.status(400).json({ error: 'queries must be a non-empty array of non-empty strings' });
+    }
+
+    const llmBase = getLlmApiBaseUrl();
+    const payload = {
+      queries: queries.map((q) => String(q)),
+      ...(threshold !== undefined ? { threshold: Number(threshold) } : {}),
+      ...(max_results !== undefined ? { max_results: Number(max_results) } : {}),
+      ...(use_healing !== undefined ? { use_healing: Boolean(use_healing) } : {}),
+    };
+
+    const timeoutMs = getLlmApiTimeoutMs();
+    const data = await requestJson('POST', `${llmBase}/query/batch`, payload, timeoutMs);
+    return res.json(data);
+  } catch (e) {
+    const llmBase = getLlmApiBaseUrl();
+    const status = e && e.status ? Number(e.status) : 502;
+    const response = { error: e.message || 'Failed to call LLM API', llm_base: llmBase };
+    if (e && e.details !== undefined) response.details = e.details;
+    return res.status(status).json(response);
+  }
+});
+
 const staticRoot = path.join(__dirname, '..', 'AutoRag-website');
 app.use(express.static(staticRoot));
 
@@ -0,0 +1,277 @@
+"""
+Answer cache for the Self-Healing RAG API.
+
+Caches complete query results (retrieval, healing and answer text) so retried
+and duplicate requests are answered without recomputation. Keys combine the
+normalized query, the request settings and a base index version string, so
+entries stop matching as soon as healing, document updates or a compaction
+change the base index.
+
+Concurrent requests for the same key are single-flighted: the first computes
+the result, the others await it. Results live in a bounded in-process LRU,
+optionally backed by a SQLite file shared by workers and restarts. On the
+event loop (get_or_compute, aget_many, aput) only the LRU is touched inline; SQLite
+reads and writes run in a worker thread.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+_KEY_SEPARATOR = "\x1f"
+
+
+def answer_cache_key(query: str, index_version: str, **settings: Any) -> str:
+    """Cache key for a query under the given request settings and base index version."""
+    parts = [normalize_query(query), index_version]
+    parts.extend(f"{name}={settings[name]!r}" for name in sorted(settings))
+    return _KEY_SEPARATOR.join(parts)
+
+
+class CachedAnswer(NamedTuple):
+    result: Dict
+    compute_seconds: float  # How long the original computation took
+    stored_at: float
+
+
+class SQLiteAnswerStore:
+    """Disk tier: one SQLite table of JSON results. Entries older than max_age are pruned on open."""
+
+    def __init__(self, db_path: Path, max_age: float):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answer_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                compute_seconds REAL NOT NULL,
+                stored_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("DELETE FROM answer_cache WHERE stored_at < ?", (time.time() - max_age,))
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CachedAnswer]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, compute_seconds, stored_at FROM answer_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return CachedAnswer(json.loads(row[0]), row[1], row[2]) if row else None
+
+    def put(self, key: str, entry: CachedAnswer) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answer_cache VALUES (?, ?, ?, ?)",
+                (key, json.dumps(entry.result, ensure_ascii=False), entry.compute_seconds, entry.stored_at),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()
+        return {"disk_entries": count, "disk_path": str(self.db_path)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class AnswerCache:
+    """Single-flight LRU of query results with optional TTL and SQLite tier, with hit/miss accounting."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 0.0, db_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, "asyncio.Future[Dict]"] = {}
+        self.disk: Optional[SQLiteAnswerStore] = None
+        if db_path is not None and self.enabled:
+            try:
+                self.disk = SQLiteAnswerStore(db_path, max_age=ttl_seconds or 7 * 24 * 3600)
+            except sqlite3.Error as e:
+                logger.warning(f"Answer cache disk tier disabled ({db_path}): {e}")
+        self.hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.stores = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _fresh(self, entry: CachedAnswer) -> bool:
+        return self.ttl_seconds <= 0 or time.time() - entry.stored_at <= self.ttl_seconds
+
+    def get(self, key: str) -> Optional[CachedAnswer]:
+        """Cached entry for key (memory first, then disk), or None. Counts the lookup."""
+        if not self.enabled:
+            return None
+        entry = self._memory_lookup(key)
+        if entry is None and self.disk is not None:
+            entry = self._disk_lookup(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+        return entry
+
+    async def aget_many(self, keys: List[str]) -> List[Optional[CachedAnswer]]:
+        """aget() for several keys, with one worker-thread trip for the memory misses."""
+        if not self.enabled:
+            return [None] * len(keys)
+        entries = [self._memory_lookup(key) for key in keys]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing and self.disk is not None:
+            found = await asyncio.to_thread(lambda: [self._disk_lookup(keys[i]) for i in missing])
+            for i, entry in zip(missing, found):
+                entries[i] = entry
+        with self._lock:
+            self.misses += sum(entry is None for entry in entries)
+        return entries
+
+    def _memory_lookup(self, key: str) -> Optional[CachedAnswer]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._fresh(entry):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry.compute_seconds
+                return entry
+        return None
+
+    def _disk_lookup(self, key: str) -> Optional[CachedAnswer]:
+        try:
+            entry = self.disk.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Answer cache disk read failed: {e}")
+            return None
+        if entry is None or not self._fresh(entry):
+            return None
+        self._remember(key, entry)
+        with self._lock:
+            self.disk_hits += 1
+            self.saved_seconds += entry.compute_seconds
+        return entry
+
+    def put(self, key: str, result: Dict, compute_seconds: float) -> None:
+        entry = self._store(key, result, compute_seconds)
+        if entry is not None and self.disk is not None:
+            self._disk_put(key, entry)
+
+    async def aput(self, key: str, result: Dict, compute_seconds: float) -> None:
+        """put() without blocking the event loop on the disk tier."""
+        entry = self._store(key, result, compute_seconds)
+        if entry is not None and self.disk is not None:
+            await asyncio.to_thread(self._disk_put, key, entry)
+
+    def _store(self, key: str, result: Dict, compute_seconds: float) -> Optional[CachedAnswer]:
+        if not self.enabled:
+            return None
+        entry = CachedAnswer(result, compute_seconds, time.time())
+        self._remember(key, entry)
+        with self._lock:
+            self.stores += 1
+        return entry
+
+    def _disk_put(self, key: str, entry: CachedAnswer) -> None:
+        try:
+            self.disk.put(key, entry)
+        except sqlite3.Error as e:
+            logger.warning(f"Answer cache disk write failed: {e}")
+
+    def _remember(self, key: str, entry: CachedAnswer) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict]],
+                             cacheable: Callable[[Dict], bool] = lambda result: True,
+                             store_key: Optional[Callable[[], str]] = None) -> Tuple[Dict, bool]:
+        """
+        Return (result, served from cache). On a miss the result is computed once for
+        all concurrent callers with the same key, and stored if cacheable(result) under
+        store_key() (evaluated after the computation, default: key), for computations
+        that change what the key depends on. A caller that is cancelled does not cancel
+        the computation for the others.
+        """
+        if not self.enabled:
+            return await compute(), False
+
+        entry = self._memory_lookup(key)
+        if entry is None and self.disk is not None and key not in self._in_flight:
+            entry = await asyncio.to_thread(self._disk_lookup, key)
+        if entry is not None:
+            return dict(entry.result), True
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            with self._lock:
+                self.coalesced += 1
+            return dict(await asyncio.shield(future)), True
+
+        with self._lock:
+            self.misses += 1
+
+        async def run() -> Dict:
+            started = time.perf_counter()
+            try:
+                result = await compute()
+                if cacheable(result):
+                    await self.aput(store_key() if store_key is not None else key, result,
+                                    time.perf_counter() - started)
+                return result
+            finally:
+                self._in_flight.pop(key, None)
+
+        future = asyncio.ensure_future(run())
+        self._in_flight[key] = future
+        return dict(await asyncio.shield(future)), False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            served = self.hits + self.disk_hits + self.coalesced
+            lookups = served + self.misses
+            counters = {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "in_flight": len(self._in_flight),
+            }
+        if self.disk is not None:
+            try:
+                counters.update(self.disk.stats())
+            except sqlite3.Error:
+                pass
+        return counters
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,114 @@
+"""
+Benchmark and equivalence check for text_cleaning.clean_text.
+
+Compares the precompiled cleaner against the original implementation
+(reference_clean_text.py) on text extracted from the HTML fixtures: the raw
+page text, the texts of the main/article/div/p elements the page extractor
+cleans, and one large document built by repeating them. Optionally also
+checks randomly generated strings built from noise fragments.
+
+Exits with status 1 if any output differs.
+
+Usage (from llm-api/):
+    python benchmarks/bench_clean_text.py
+    python benchmarks/bench_clean_text.py --size-kb 1000 --repeat 5 --fuzz 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from bs4 import BeautifulSoup
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from reference_clean_text import clean_text as reference_clean_text  # noqa: E402
+from text_cleaning import BAD_PATTERNS, clean_text  # noqa: E402
+
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+
+FUZZ_FRAGMENTS = [p for p in BAD_PATTERNS if "*" not in p] + [
+    "Cookie", "COOKIE", "Ad", "aD", "Copyright", "İ", "ı", "ſ", "K", "ß", "é", "日本", "😀",
+    "\n", "\r", "\t", "\n\r", " ", "  ", " ", " ", "@", "x@y", "http://a.b/c", "https://q",
+    "www.x", "WWW.y", "=", "#", ".", ",", "-", "(", "a", "d", "s", "word", "is", "quantum computing",
+]
+
+
+def fixture_texts() -> List[str]:
+    """Texts the page extractor hands to clean_text, for every fixture page."""
+    texts = []
+    for path in sorted(FIXTURES_DIR.glob("*.html")):
+        soup = BeautifulSoup(path.read_text(encoding="utf-8"), "html.parser")
+        texts.append(soup.get_text())
+        texts.append(soup.get_text(separator=" ", strip=True))
+        for tag in soup.find_all(["main", "article", "div", "p"]):
+            texts.append(tag.get_text(separator=" ", strip=True))
+    return texts
+
+
+def time_calls(func: Callable[[str], str], texts: List[str], repeat: int) -> float:
+    """Best-of-repeat wall time in milliseconds for cleaning all texts once."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def count_mismatches(texts: List[str], label: str) -> int:
+    mismatches = 0
+    for text in texts:
+        expected, actual = reference_clean_text(text), clean_text(text)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"  MISMATCH ({label}) for input {text[:80]!r}...")
+                print(f"    reference: {expected[:120]!r}")
+                print(f"    clean_text: {actual[:120]!r}")
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-kb", type=int, default=500, help="Size of the large document (default: 500)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions, best is reported (default: 3)")
+    parser.add_argument("--fuzz", type=int, default=20000, help="Random fuzz inputs to compare (default: 20000)")
+    args = parser.parse_args()
+
+    texts = fixture_texts()
+    joined = " \n".join(texts)
+    large = joined * max(1, -(-args.size_kb * 1024 // max(1, len(joined))))
+    print(f"Fixture corpus: {len(texts)} texts, {sum(map(len, texts)) / 1024:.0f} KB; "
+          f"large document: {len(large) / 1024:.0f} KB")
+
+    mismatches = count_mismatches(texts, "fixtures") + count_mismatches([large], "large")
+    rng = random.Random(0)
+    fuzz = [
+        "".join(rng.choice(FUZZ_FRAGMENTS) for _ in range(rng.randint(0, 40)))
+        for _ in range(args.fuzz)
+    ]
+    mismatches += count_mismatches(fuzz, "fuzz")
+
+    print(f"{'input':<12} {'reference ms':>14} {'clean_text ms':>14} {'speedup':>8}")
+    for label, inputs in (("fixtures", texts), ("large", [large])):
+        ref_ms = time_calls(reference_clean_text, inputs, args.repeat)
+        new_ms = time_calls(clean_text, inputs, args.repeat)
+        print(f"{label:<12} {ref_ms:>14.1f} {new_ms:>14.1f} {ref_ms / new_ms:>7.1f}x")
+
+    checked = len(texts) + 1 + len(fuzz)
+    if mismatches:
+        print(f"❌ {mismatches} of {checked} outputs differ from the reference")
+        return 1
+    print(f"✅ All {checked} outputs identical to the reference")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Benchmark for the embedding backends (embedding_backends.py).
+
+For each backend (torch, onnx, onnx-int8), in a fresh child process:
+
+- load time and RSS growth from loading the model
+- encode throughput for single queries (batch of 1) and for chunk batches
+  (sentence-sized texts from the HTML fixtures, --batch-size at a time)
+- parity with the torch model: per-text cosine similarity of the embeddings
+  and top-5 agreement when each fixture sentence is used as a query against
+  the others
+
+The ONNX export is created under --cache-dir on first use.
+
+Usage (from llm-api/):
+    python benchmarks/bench_embed.py
+    python benchmarks/bench_embed.py --model all-MiniLM-L6-v2 --batch-size 64 --repeat 3
+"""
+
+import argparse
+import json
+import logging
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from embedding_backends import EMBEDDING_BACKENDS, load_embedder, onnxruntime_available  # noqa: E402
+from html_extract import extract_main_text  # noqa: E402
+
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+
+
+def corpus_sentences(limit: int) -> List[str]:
+    """Sentences of the fixture pages' main text, cycled up to limit."""
+    sentences = []
+    for path in sorted(FIXTURES_DIR.glob("*.html")):
+        text = extract_main_text(path.read_text(encoding="utf-8")) or ""
+        sentences.extend(s for s in re.split(r'(?<=[.!?])\s+', text) if len(s.split()) >= 4)
+    return [sentences[i % len(sentences)] for i in range(min(limit, 10 * len(sentences)))]
+
+
+def _rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def run_child(backend: str, model: str, cache_dir: str, texts_path: str, batch_size: int, repeat: int,
+              out_path: str) -> None:
+    """Child process: load one backend, time it, and save its embeddings of the corpus."""
+    texts = json.loads(Path(texts_path).read_text(encoding="utf-8"))
+    rss_before = _rss_kb()
+    started = time.perf_counter()
+    embedder = load_embedder(model, backend, Path(cache_dir), min_cosine=-1.0)
+    load_s = time.perf_counter() - started
+    rss_after = _rss_kb()
+
+    embedder.encode(texts[:batch_size], batch_size=batch_size)  # warm up
+    query_s = float("inf")
+    batch_s = float("inf")
+    queries = texts[:64]
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for query in queries:
+            embedder.encode([query], batch_size=1)
+        query_s = min(query_s, time.perf_counter() - started)
+        started = time.perf_counter()
+        embeddings = embedder.encode(texts, batch_size=batch_size)
+        batch_s = min(batch_s, time.perf_counter() - started)
+
+    np.save(out_path, np.asarray(embeddings, dtype=np.float32))
+    print(json.dumps({
+        "load_s": load_s,
+        "rss_mb": (rss_after - rss_before) / 1024 if rss_before is not None else None,
+        "queries_per_s": len(queries) / query_s,
+        "texts_per_s": len(texts) / batch_s,
+    }))
+
+
+def agreement(reference: np.ndarray, candidate: np.ndarray, k: int = 5) -> Dict:
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosine = (ref * cand).sum(axis=1)
+
+    def top_k(emb: np.ndarray) -> np.ndarray:
+        sims = emb @ emb.T
+        np.fill_diagonal(sims, -np.inf)
+        return np.argsort(-sims, axis=1)[:, :k]
+
+    ref_top, cand_top = top_k(ref), top_k(cand)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top.tolist(), cand_top.tolist())])
+    return {"min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean()), "top5_overlap": float(overlap)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="sentence-transformers model (default: all-MiniLM-L6-v2)")
+    parser.add_argument("--cache-dir", default=str(BENCH_DIR.parent / ".cache"), help="Where the ONNX export is kept")
+    parser.add_argument("--texts", type=int, default=512, help="Corpus texts to embed (default: 512)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Encode batch size for the corpus (default: 32)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions, best is reported (default: 3)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--texts-path", help=argparse.SUPPRESS)
+    parser.add_argument("--out-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if args.child:
+        run_child(args.child, args.model, args.cache_dir, args.texts_path, args.batch_size, args.repeat, args.out_path)
+        return 0
+
+    backends = list(EMBEDDING_BACKENDS) if onnxruntime_available() else ["torch"]
+    if not onnxruntime_available():
+        print("onnxruntime is not installed; only the torch backend is measured")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = Path(tmp) / "texts.json"
+        texts_path.write_text(json.dumps(corpus_sentences(args.texts)), encoding="utf-8")
+        if "onnx" in backends:  # Export up front so it is not part of the load time
+            subprocess.run([sys.executable, str(BENCH_DIR.parent / "embedding_backends.py"),
+                            "--model", args.model, "--cache-dir", args.cache_dir],
+                           check=True, capture_output=True)
+
+        results, embeddings = {}, {}
+        for backend in backends:
+            out_path = Path(tmp) / f"{backend}.npy"
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", backend, "--model", args.model, "--cache-dir", args.cache_dir,
+                 "--texts-path", str(texts_path), "--out-path", str(out_path),
+                 "--batch-size", str(args.batch_size), "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[backend] = json.loads(out.strip().splitlines()[-1])
+            embeddings[backend] = np.load(out_path)
+
+    print(f"{'backend':<12}{'load s':>10}{'RSS MB':>10}{'queries/s':>12}{'texts/s':>10}{'speedup':>9}"
+          f"{'min cos':>10}{'mean cos':>10}{'top-5':>8}")
+    for backend in backends:
+        r = results[backend]
+        parity = agreement(embeddings["torch"], embeddings[backend])
+        rss = f"{r['rss_mb']:.0f}" if r["rss_mb"] is not None else "n/a"
+        print(f"{backend:<12}{r['load_s']:>10.2f}{rss:>10}{r['queries_per_s']:>12.1f}{r['texts_per_s']:>10.1f}"
+              f"{r['texts_per_s'] / results['torch']['texts_per_s']:>8.2f}x"
+              f"{parity['min_cosine']:>10.4f}{parity['mean_cosine']:>10.4f}{parity['top5_overlap']:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Benchmark for HTML main-text extraction.
+
+Compares the original BeautifulSoup extractor (reference_extract.py) with
+html_extract using the lxml single-pass walk and its html.parser fallback:
+
+- speed: best-of-N time per page on every fixture and on a large page
+  (a fixture padded with extra article paragraphs to --size-kb)
+- peak memory: max RSS growth while extracting the large page, measured in a
+  fresh child process per extractor (tracemalloc does not see libxml2 memory)
+- text quality: whether the output matches the reference exactly, and the
+  word-level similarity ratio when it does not
+
+Usage (from llm-api/):
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --size-kb 2048 --repeat 5
+"""
+
+import argparse
+import difflib
+import json
+import logging
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from html_extract import extract_main_text, lxml  # noqa: E402
+from reference_extract import extract_page_text as reference_extract  # noqa: E402
+
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+
+EXTRACTORS: Dict[str, Callable[[str], Optional[str]]] = {
+    "reference": lambda html: reference_extract(html, ""),
+    "lxml": lambda html: extract_main_text(html, parser="lxml"),
+    "html.parser": lambda html: extract_main_text(html, parser="html.parser"),
+}
+
+
+def large_page(size_kb: int) -> str:
+    """The news article fixture with its <main> padded by extra paragraphs up to size_kb."""
+    html = (FIXTURES_DIR / "news_article.html").read_text(encoding="utf-8")
+    paragraph = (
+        "<p>Researchers continue to refine decoders, calibration routines and fabrication methods, "
+        "and each improvement in physical error rates reduces the number of qubits a logical qubit needs. "
+        "<a href=\"/more\">Further reading</a> is listed at the end of this article.</p>\n"
+    )
+    count = max(0, (size_kb * 1024 - len(html)) // len(paragraph))
+    return html.replace("</main>", paragraph * count + "</main>")
+
+
+def best_time_ms(func: Callable[[str], Optional[str]], html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def similarity(reference: Optional[str], text: Optional[str]) -> float:
+    if reference == text:
+        return 1.0
+    return difflib.SequenceMatcher(None, (reference or "").split(), (text or "").split(), autojunk=False).ratio()
+
+
+def _status_kb(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM to the current RSS (Linux), so the peak only covers what follows."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure_memory_child(name: str, size_kb: int) -> None:
+    """Child process: print the peak RSS growth (KB) caused by one extraction of the large page."""
+    html = large_page(size_kb)
+    EXTRACTORS[name]("<html><body><p>warm up</p></body></html>")
+    if _reset_peak_rss():
+        before = _status_kb("VmRSS")
+        EXTRACTORS[name](html)
+        after = _status_kb("VmHWM")
+    else:  # ru_maxrss is a lifetime peak: only growth beyond the page construction shows up
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        EXTRACTORS[name](html)
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"peak_kb": max(0, after - before)}))
+
+
+def peak_memory_kb(name: str, size_kb: int) -> int:
+    out = subprocess.run(
+        [sys.executable, __file__, "--memory-child", name, "--size-kb", str(size_kb)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])["peak_kb"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-kb", type=int, default=1024, help="Size of the large page (default: 1024)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions, best is reported (default: 5)")
+    parser.add_argument("--memory-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if args.memory_child:
+        measure_memory_child(args.memory_child, args.size_kb)
+        return 0
+
+    names = list(EXTRACTORS) if lxml is not None else ["reference", "html.parser"]
+    if lxml is None:
+        print("lxml is not installed; only the html.parser extractor is compared")
+
+    pages = {path.name: path.read_text(encoding="utf-8") for path in sorted(FIXTURES_DIR.glob("*.html"))}
+    pages[f"large ({args.size_kb} KB)"] = large_page(args.size_kb)
+
+    header = f"{'page':<24}" + "".join(f"{name + ' ms':>16}" for name in names) + "".join(
+        f"{name + ' sim':>16}" for name in names[1:])
+    print(header)
+    for page_name, html in pages.items():
+        reference = EXTRACTORS["reference"](html)
+        times = [best_time_ms(EXTRACTORS[name], html, args.repeat) for name in names]
+        sims = [similarity(reference, EXTRACTORS[name](html)) for name in names[1:]]
+        print(f"{page_name:<24}" + "".join(f"{t:>16.1f}" for t in times) + "".join(f"{s:>16.3f}" for s in sims))
+
+    print()
+    print(f"Peak RSS growth extracting the large page:")
+    for name in names:
+        print(f"  {name:<12} {peak_memory_kb(name, args.size_kb) / 1024:>8.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Load benchmark for the Self-Healing RAG API.
+
+Starts the API with uvicorn in a child process, on a temporary base index that
+ingest.py builds from half of fixtures/wikipedia_summaries.json. Wikipedia and
+web search are served by the local stand-in in fake_sources.py, so runs are
+offline and repeatable. For each scenario and concurrency level it sends
+--requests requests from that many concurrent clients (after a warm-up round)
+and reports throughput and p50/p95/p99 latency:
+
+- query: POST /query with questions about indexed topics, healing off
+- batch: POST /query/batch with --batch-size of those questions per request
+- heal:  POST /query about topics only the fake sources know, with a threshold
+         above 1 so every request runs the full healing path
+
+The answer, embedding and fetch caches and healed-topic persistence are turned
+off so repeated requests do the full work (--caches keeps them on). All fake
+sources share one host, so the per-host outbound rate limit is off as well
+(--rate-limits keeps the AUTORAG_HTTP_RATE settings).
+
+--json saves the results; --baseline compares them with a saved run and exits 1
+when any throughput drops, or any p95 grows, by more than --max-regression.
+The embedding model has to be available locally (for example in the Hugging
+Face cache) when running without network access.
+
+Usage (from llm-api/):
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --concurrency 1,4,16 --requests 200 --json results.json
+    python benchmarks/bench_load.py --baseline results.json --max-regression 0.25
+    python benchmarks/bench_load.py --url http://127.0.0.1:8000 --scenarios query,batch
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+API_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from fake_sources import FIXTURES_DIR, FakeSources  # noqa: E402
+
+SCENARIOS = ("query", "batch", "heal")
+QUESTION_TEMPLATES = ("What is {topic}?", "Explain {topic}", "{topic} overview", "Tell me about {topic}")
+
+
+def load_topics() -> Tuple[List[Dict], List[Dict]]:
+    """(indexed, heal-only) halves of the fixture summaries."""
+    summaries = json.loads((FIXTURES_DIR / "wikipedia_summaries.json").read_text(encoding="utf-8"))
+    half = len(summaries) // 2
+    return summaries[:half], summaries[half:]
+
+
+def questions(topics: List[Dict]) -> List[str]:
+    return [template.format(topic=t["title"].replace("_", " ").lower())
+            for template in QUESTION_TEMPLATES for t in topics]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_base_cache(topics: List[Dict], cache_dir: Path, env: Dict[str, str]) -> None:
+    corpus = cache_dir.parent / "corpus.jsonl"
+    with open(corpus, "w", encoding="utf-8") as f:
+        for t in topics:
+            f.write(json.dumps({"id": t["title"], "text": t["extract"]}) + "\n")
+    subprocess.run([sys.executable, str(API_DIR / "ingest.py"), str(corpus), "--cache-dir", str(cache_dir)],
+                   cwd=str(API_DIR), env=env, check=True, capture_output=True)
+
+
+def start_api(port: int, env: Dict[str, str], log_path: Path, timeout: float) -> subprocess.Popen:
+    """Run uvicorn in a child process and wait until GET /ready answers 200."""
+    log = open(log_path, "wb")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "self_healing_rag:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=str(API_DIR), env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=2).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    tail = log_path.read_text(encoding="utf-8", errors="replace").splitlines()[-20:]
+    raise RuntimeError("API did not become ready:\n" + "\n".join(tail))
+
+
+def request_bodies(scenario: str, base_questions: List[str], heal_questions: List[str], batch_size: int):
+    """Endless cycle of (path, JSON body) for a scenario."""
+    i = 0
+    while True:
+        if scenario == "query":
+            yield "/query", {"query": base_questions[i % len(base_questions)], "use_healing": False}
+        elif scenario == "batch":
+            batch = [base_questions[(i * batch_size + j) % len(base_questions)] for j in range(batch_size)]
+            yield "/query/batch", {"queries": batch, "use_healing": False}
+        else:
+            yield "/query", {"query": heal_questions[i % len(heal_questions)], "threshold": 1.01}
+        i += 1
+
+
+async def run_level(url: str, scenario: str, concurrency: int, total: int, bodies, timeout: float) -> Dict:
+    """Send `total` requests from `concurrency` workers; returns throughput and latency percentiles."""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        async def worker(record: bool) -> None:
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                path, body = next(bodies)
+                started = time.perf_counter()
+                try:
+                    resp = await client.post(path, json=body)
+                    ok = resp.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if record:
+                    latencies.append(time.perf_counter() - started)
+                    errors += not ok
+
+        remaining = concurrency  # Warm-up round, not recorded
+        await asyncio.gather(*(worker(False) for _ in range(concurrency)))
+        remaining = total
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(True) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ms = np.asarray(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]).tolist()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput": total / elapsed,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict], max_regression: float) -> List[str]:
+    """Regressions of results against the baseline run, as printable lines."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get((r["scenario"], r["concurrency"]))
+        if old is None:
+            continue
+        if r["throughput"] < old["throughput"] * (1 - max_regression):
+            regressions.append(f"{r['scenario']} x{r['concurrency']}: throughput "
+                               f"{old['throughput']:.1f} -> {r['throughput']:.1f} req/s")
+        if r["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{r['scenario']} x{r['concurrency']}: p95 {old['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms")
+    return regressions
+
+
+def print_results(results: List[Dict], baseline: Optional[List[Dict]]) -> None:
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline or []}
+    header = f"{'scenario':<10}{'conc':>6}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header + (f"{'vs base':>10}" if baseline else ""))
+    for r in results:
+        line = (f"{r['scenario']:<10}{r['concurrency']:>6}{r['requests']:>7}{r['errors']:>8}{r['throughput']:>10.1f}"
+                f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+        old = previous.get((r["scenario"], r["concurrency"]))
+        if old is not None:
+            line += f"{r['throughput'] / old['throughput']:>9.2f}x"
+        print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Benchmark a running API instead of starting one (the heal scenario then "
+                                      "uses that server's healing sources)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated (default: query,batch,heal)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated client counts (default: 1,4,16)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario and level (default: 100)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Queries per /query/batch request (default: 8)")
+    parser.add_argument("--latency", type=float, default=50.0, help="Fake source response delay in ms (default: 50)")
+    parser.add_argument("--jitter", type=float, default=20.0, help="Fake source delay jitter in ms (default: 20)")
+    parser.add_argument("--search-latency", type=float, help="Fake search endpoint delay in ms (default: --latency)")
+    parser.add_argument("--seed", type=int, default=0, help="Fake source RNG seed (default: 0)")
+    parser.add_argument("--caches", action="store_true", help="Keep the answer, embedding and fetch caches on")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the per-host outbound rate limits on")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds (default: 120)")
+    parser.add_argument("--startup-timeout", type=float, default=300.0, help="Seconds to wait for /ready (default: 300)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed relative throughput drop / p95 growth against --baseline (default: 0.2)")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    base_topics, heal_topics = load_topics()
+    base_questions, heal_questions = questions(base_topics), questions(heal_topics)
+
+    sources = FakeSources(latency=args.latency, jitter=args.jitter, search_latency=args.search_latency, seed=args.seed)
+    proc = None
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            url = args.url
+            if url is None:
+                sources_url = sources.start()
+                env = dict(os.environ, AUTORAG_CACHE_DIR=str(Path(tmp) / "cache"),
+                           AUTORAG_WIKIPEDIA_URL=sources_url, AUTORAG_SEARCH_PROVIDER=f"{sources_url}/search",
+                           AUTORAG_PERSIST_HEALED="false", AUTORAG_FETCH_CACHE_DB="off")
+                if not args.caches:
+                    env.update(AUTORAG_ANSWER_CACHE_SIZE="0", AUTORAG_EMBED_CACHE_SIZE="0", AUTORAG_FETCH_CACHE_SIZE="0")
+                if not args.rate_limits:
+                    env.update(AUTORAG_HTTP_RATE="0", AUTORAG_HTTP_HOST_RATES="")
+                print(f"Building base index from {len(base_topics)} fixture topics...")
+                build_base_cache(base_topics, Path(tmp) / "cache", env)
+                port = _free_port()
+                proc = start_api(port, env, Path(tmp) / "server.log", args.startup_timeout)
+                url = f"http://127.0.0.1:{port}"
+            print(f"Benchmarking {url}: {', '.join(scenarios)} at concurrency {', '.join(map(str, levels))}\n")
+
+            results = []
+            for scenario in scenarios:
+                bodies = request_bodies(scenario, base_questions, heal_questions, args.batch_size)
+                for concurrency in levels:
+                    results.append(asyncio.run(run_level(url, scenario, concurrency, args.requests, bodies, args.timeout)))
+        finally:
+            if proc is not None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            sources.stop()
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["results"] if args.baseline else None
+    print_results(results, baseline)
+    if args.url is None:
+        print(f"\nFake source requests: {dict(sorted(sources.requests.items()))}")
+
+    if args.json:
+        settings = {name: getattr(args, name) for name in ("url", "requests", "batch_size", "latency", "jitter",
+                                                            "search_latency", "seed", "caches", "rate_limits")}
+        Path(args.json).write_text(json.dumps({"settings": settings, "results": results}, indent=2) + "\n",
+                                   encoding="utf-8")
+    if baseline is not None:
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\nRegressions beyond {args.max_regression:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.max_regression:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Local stand-in for Wikipedia and web search, for offline and repeatable benchmarks.
+
+Replays fixtures/wikipedia_summaries.json and the saved HTML fixtures:
+
+- GET /api/rest_v1/page/summary/<title>   Wikipedia REST summary (titles match case-insensitively,
+                                           with spaces or underscores)
+- GET /w/api.php?list=search&srsearch=..  Wikipedia search API, pages ranked by query word overlap
+- GET /search?q=..&max_results=..         JSON web search returning {title, href, body} results, for
+                                           AUTORAG_SEARCH_PROVIDER; "site:wikipedia.org" queries link
+                                           to en.wikipedia.org/wiki/<title>, other queries to /pages/
+- GET /pages/<name>.html                  an article page per summary (wrapped in the usual page
+                                           boilerplate) and the HTML fixtures
+
+Every response is delayed by --latency ms plus a uniform +-jitter drawn from a
+seeded RNG (--search-latency for the two search endpoints), and a fraction
+--error-rate of requests fail with 503.
+
+Usage (from llm-api/):
+    python benchmarks/fake_sources.py --port 8900 --latency 80 --jitter 30
+    AUTORAG_WIKIPEDIA_URL=http://127.0.0.1:8900 AUTORAG_SEARCH_PROVIDER=http://127.0.0.1:8900/search \\
+        uvicorn self_healing_rag:app
+"""
+
+import argparse
+import html
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+_WORD_RE = re.compile(r"\w+")
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.S | re.I)
+_SITE_RE = re.compile(r"\bsite:\S+", re.I)
+_ROUTES = {"/w/api.php": "wikipedia_search", "/search": "web_search"}
+_STOPWORDS = {"a", "an", "and", "are", "definition", "does", "explanation", "how", "in", "is", "of", "on",
+              "the", "to", "what", "who", "why"}
+
+ARTICLE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>{title} - Reference Library</title></head>
+<body>
+<div class="cookie-banner">We use cookies to improve your experience. <button>Accept all</button></div>
+<nav><a href="/">Home</a> | <a href="/topics">Topics</a> | <a href="/about">About</a> | <a href="/login">Sign in</a></nav>
+<main>
+<article>
+<h1>{title}</h1>
+{paragraphs}
+</article>
+</main>
+<aside class="newsletter">Subscribe to our newsletter for weekly articles.</aside>
+<footer>Copyright Reference Library. All rights reserved. <a href="/privacy">Privacy</a></footer>
+</body>
+</html>
+"""
+
+
+def _words(text: str) -> set:
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS}
+
+
+def _title_key(title: str) -> str:
+    return unquote(title).replace("_", " ").strip().lower()
+
+
+class FakeSources:
+    """Fixture-backed Wikipedia and search responses, served from a background HTTP server."""
+
+    def __init__(self, fixtures_dir: Path = FIXTURES_DIR, latency: float = 0.0, jitter: float = 0.0,
+                 search_latency: Optional[float] = None, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.search_latency = latency if search_latency is None else search_latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.requests: Counter = Counter()
+
+        summaries = json.loads((fixtures_dir / "wikipedia_summaries.json").read_text(encoding="utf-8"))
+        self.summaries: Dict[str, Dict] = {_title_key(s["title"]): s for s in summaries}
+        # name -> (title, html, text) for the /pages/ documents
+        self.pages: Dict[str, Tuple[str, str, str]] = {}
+        for s in summaries:
+            title = s["title"].replace("_", " ")
+            paragraphs = "\n".join(f"<p>{html.escape(p)}</p>" for p in re.split(r"(?<=\.)\s+(?=[A-Z])", s["extract"]))
+            self.pages[s["title"]] = (title, ARTICLE_TEMPLATE.format(title=html.escape(title), paragraphs=paragraphs),
+                                      s["extract"])
+        for path in sorted(fixtures_dir.glob("*.html")):
+            page = path.read_text(encoding="utf-8")
+            match = re.search(r"<title>(.*?)</title>", page, re.S | re.I)
+            title = html.unescape(match.group(1).strip()) if match else path.stem
+            self.pages[path.stem] = (title, page, html.unescape(_TAG_RE.sub(" ", page)))
+        self._page_words = {name: (_words(title), _words(text)) for name, (title, _, text) in self.pages.items()}
+
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def delay(self, search: bool = False) -> float:
+        """Seconds to wait before answering one request."""
+        base = self.search_latency if search else self.latency
+        with self._rng_lock:
+            jitter = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, base + jitter) / 1000.0
+
+    def count(self, route: str) -> None:
+        with self._rng_lock:
+            self.requests[route] += 1
+
+    def fails(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.error_rate
+
+    def rank(self, query: str, limit: int, summaries_only: bool = False) -> List[str]:
+        """Page names by query word overlap (title words count double), best first."""
+        query_words = _words(_SITE_RE.sub(" ", query))
+        scored = []
+        for name, (title_words, text_words) in self._page_words.items():
+            if summaries_only and _title_key(name) not in self.summaries:
+                continue
+            score = 2 * len(query_words & title_words) + len(query_words & text_words)
+            if score > 0:
+                scored.append((-score, name))
+        return [name for _, name in sorted(scored)[:limit]]
+
+    def wikipedia_search(self, query: str, limit: int) -> Dict:
+        results = [{"title": name.replace("_", " "), "snippet": self.pages[name][2][:120]}
+                   for name in self.rank(query, limit, summaries_only=True)]
+        return {"batchcomplete": "", "query": {"searchinfo": {"totalhits": len(results)}, "search": results}}
+
+    def web_search(self, query: str, limit: int, base_url: str) -> List[Dict]:
+        wikipedia_only = "site:wikipedia.org" in query.lower()
+        results = []
+        for name in self.rank(query, limit, summaries_only=wikipedia_only):
+            title, _, text = self.pages[name]
+            href = (f"https://en.wikipedia.org/wiki/{quote(name)}" if wikipedia_only
+                    else f"{base_url}/pages/{quote(name)}.html")
+            results.append({"title": title, "href": href, "body": " ".join(text.split())[:200]})
+        return results
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve in a daemon thread; returns the base URL."""
+        self._server = _Server((host, port), _make_handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-sources", daemon=True)
+        self._thread.start()
+        return self.url
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # Clients cancel slow requests
+            super().handle_error(request, client_address)
+
+
+def _make_handler(sources: FakeSources):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - quiet by default
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, data, status: int = 200) -> None:
+            self._send(status, json.dumps(data).encode("utf-8"), "application/json; charset=utf-8")
+
+        def do_GET(self):  # noqa: N802
+            parts = urlsplit(self.path)
+            params = {name: values[0] for name, values in parse_qs(parts.query).items()}
+            path = parts.path
+            search = path in ("/w/api.php", "/search")
+            sources.count(_ROUTES.get(path, "summary" if path.startswith("/api/rest_v1/page/summary/") else "pages"))
+
+            time.sleep(sources.delay(search))
+            if sources.fails():
+                return self._json({"error": "unavailable"}, 503)
+
+            if path.startswith("/api/rest_v1/page/summary/"):
+                summary = sources.summaries.get(_title_key(path.rsplit("/", 1)[-1]))
+                if summary is None:
+                    return self._json({"type": "https://mediawiki.org/wiki/HyperSwitch/errors/not_found",
+                                       "title": "Not found."}, 404)
+                return self._json({"type": "standard", "title": summary["title"].replace("_", " "),
+                                   "extract": summary["extract"]})
+            if path == "/w/api.php":
+                limit = int(params.get("srlimit", 10))
+                return self._json(sources.wikipedia_search(params.get("srsearch", ""), limit))
+            if path == "/search":
+                limit = int(params.get("max_results", 5))
+                base_url = f"http://{self.headers.get('Host', '%s:%s' % self.server.server_address[:2])}"
+                return self._json(sources.web_search(params.get("q", ""), limit, base_url))
+            if path.startswith("/pages/") and path.endswith(".html"):
+                page = sources.pages.get(unquote(path[len("/pages/"):-len(".html")]))
+                if page is not None:
+                    return self._send(200, page[1].encode("utf-8"), "text/html; charset=utf-8")
+            return self._send(404, b"Not found", "text/plain; charset=utf-8")
+
+    return Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8900, help="Port (default: 8900)")
+    parser.add_argument("--latency", type=float, default=50.0, help="Mean response delay in ms (default: 50)")
+    parser.add_argument("--jitter", type=float, default=20.0, help="Uniform +- delay jitter in ms (default: 20)")
+    parser.add_argument("--search-latency", type=float, help="Mean delay of the search endpoints in ms (default: --latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503 (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the delay and error RNG (default: 0)")
+    args = parser.parse_args()
+
+    sources = FakeSources(latency=args.latency, jitter=args.jitter, search_latency=args.search_latency,
+                          error_rate=args.error_rate, seed=args.seed)
+    url = sources.start(args.host, args.port)
+    print(f"Serving fake Wikipedia and search on {url}")
+    print(f"  AUTORAG_WIKIPEDIA_URL={url} AUTORAG_SEARCH_PROVIDER={url}/search")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sources.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+The original clean_text implementation (one IGNORECASE re.sub per noise pattern),
+kept verbatim as the reference for bench_clean_text.py.
+"""
+
+import re
+
+BAD_PATTERNS = [
+    r"accept all cookies",
+    r"manage preferences",
+    r"privacy policy",
+    r"cookie",
+    r"we value your privacy",
+    r"essential cookies",
+    r"skip to main",
+    r"skip to content",
+    r"menu",
+    r"navigation",
+    r"subscribe",
+    r"newsletter",
+    r"sign up",
+    r"log in",
+    r"register",
+    r"follow us",
+    r"share on",
+    r"tweet",
+    r"facebook",
+    r"instagram",
+    r"linkedin",
+    r"twitter",
+    r"copyright.*?copyright",
+    r"all rights reserved",
+    r"related articles",
+    r"you may also like",
+    r"read more",
+    r"click here",
+    r"advertisement",
+    r"ad",
+]
+
+
+def clean_text(text: str) -> str:
+    """Enhanced text cleaning with better noise removal."""
+    if not isinstance(text, str):
+        return ""
+    
+    # Remove excessive whitespace and newlines first
+    text = re.sub(r'\n+', ' ', text)
+    text = re.sub(r'\r+', ' ', text)
+    text = re.sub(r'\t+', ' ', text)
+    
+    # Remove URLs
+    text = re.sub(r'http[s]?://\S+', '', text)
+    text = re.sub(r'www\.\S+', '', text)
+    
+    # Remove email addresses
+    text = re.sub(r'\S+@\S+', '', text)
+    
+    # Remove common web noise patterns (case-insensitive)
+    for pattern in BAD_PATTERNS:
+        text = re.sub(pattern, "", text, flags=re.IGNORECASE)
+    
+    # Remove markdown headers and separators
+    text = re.sub(r'^=+\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^#+\s*', '', text, flags=re.MULTILINE)
+    
+    # Remove excessive special characters but keep basic punctuation
+    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\'\"\&\%\$\#]', ' ', text)
+    
+    # Remove multiple spaces
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+    
+    # Remove very short words that are likely noise (but keep common short words)
+    words = text.split()
+    common_short = ['ai', 'it', 'we', 'is', 'an', 'a', 'of', 'to', 'in', 'on', 'at', 'be', 'as', 'or', 'if']
+    words = [w for w in words if len(w) > 2 or w.lower() in common_short]
+    text = ' '.join(words)
+    
+    # Keep only substantial text (lower threshold - 50 chars minimum)
+    if len(text) < 50:
+        return ""
+    
+    return text
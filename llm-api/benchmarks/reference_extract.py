@@ -0,0 +1,122 @@
+"""
+The original BeautifulSoup (html.parser) page extractor, kept verbatim as the
+reference for bench_extract.py. It uses the current clean_text (whose output
+matches the original, see bench_clean_text.py) so the comparison isolates
+parsing and extraction.
+"""
+
+import logging
+import re
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from text_cleaning import clean_text
+
+logger = logging.getLogger(__name__)
+
+
+def extract_page_text(html: str, url: str) -> Optional[str]:
+    """Extract the main readable text from an HTML page. Returns None if nothing usable is found."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Remove script and style elements
+    for script in soup(["script", "style", "meta", "link", "nav", "header", "footer", "aside"]):
+        script.decompose()
+
+    # Try to get main content areas with better selection
+    main_content = None
+
+    # Strategy 1: Look for main/article tags
+    main_articles = soup.find_all(['main', 'article'])
+    logger.info(f"    Strategy 1: Found {len(main_articles)} main/article tags")
+    for tag in main_articles:
+        text = tag.get_text(separator=' ', strip=True)
+        logger.info(f"    Main/article text length (raw): {len(text)}")
+        if text and len(text) > 150:  # Lower threshold
+            cleaned = clean_text(text)
+            logger.info(f"    After cleaning: {len(cleaned)} chars")
+            if cleaned and len(cleaned) > 150:
+                main_content = cleaned
+                logger.info(f"     Strategy 1 SUCCESS: Found {len(main_content)} chars in main/article")
+                break
+
+    # Strategy 2: Try divs with content-related classes
+    if not main_content:
+        content_divs = soup.find_all('div', class_=re.compile(r'content|main|article|post|entry|text|body|description|paragraph', re.I))
+        logger.info(f"    Strategy 2: Found {len(content_divs)} content divs")
+        for tag in content_divs:
+            text = tag.get_text(separator=' ', strip=True)
+            if text and len(text) > 150:
+                cleaned = clean_text(text)
+                if cleaned and len(cleaned) > 150:
+                    main_content = cleaned
+                    logger.info(f"     Strategy 2 SUCCESS: Found {len(main_content)} chars in content div")
+                    break
+
+    # Strategy 3: Try paragraphs - collect substantial paragraphs
+    if not main_content:
+        all_paragraphs = soup.find_all('p')
+        logger.info(f"    Strategy 3: Found {len(all_paragraphs)} paragraph tags")
+        paragraphs = []
+        for p in all_paragraphs:
+            text = p.get_text(separator=' ', strip=True)
+            cleaned = clean_text(text)
+            if cleaned and len(cleaned) > 50:  # Individual paragraph threshold
+                paragraphs.append(cleaned)
+        logger.info(f"    Valid paragraphs after cleaning: {len(paragraphs)}")
+        if paragraphs:
+            # Combine paragraphs
+            combined = ' '.join(paragraphs[:10])  # Limit to first 10 paragraphs
+            logger.info(f"    Combined paragraphs length: {len(combined)}")
+            if len(combined) > 200:
+                main_content = combined
+                logger.info(f"     Strategy 3 SUCCESS: Found {len(main_content)} chars from paragraphs")
+
+    # Strategy 4: Fallback to body text with noise removal
+    if not main_content:
+        body = soup.find('body')
+        if body:
+            logger.info(f"    Strategy 4: Trying body text extraction...")
+            # Remove navigation and other noise
+            for noise in body.find_all(['nav', 'header', 'footer', 'script', 'style', 'aside']):
+                noise.decompose()
+            text = body.get_text(separator=' ', strip=True)
+            logger.info(f"    Body text length (raw): {len(text)}")
+            if text and len(text) > 200:
+                cleaned = clean_text(text)
+                logger.info(f"    Body text length (cleaned): {len(cleaned)}")
+                if cleaned and len(cleaned) > 150:  # More lenient for body text
+                    main_content = cleaned
+                    logger.info(f"     Strategy 4 SUCCESS: Found {len(main_content)} chars in body")
+        else:
+            logger.info(f"    No body tag found")
+
+    if main_content:
+        return main_content
+
+    # Last resort: Try minimal cleaning - just get paragraphs with minimal filtering
+    logger.info(f"    All strategies failed, trying minimal cleaning fallback...")
+    paragraphs = []
+    for p in soup.find_all('p'):
+        raw_text = p.get_text(separator=' ', strip=True)
+        # Minimal cleaning - just remove excessive whitespace
+        raw_text = re.sub(r'\s+', ' ', raw_text).strip()
+        if raw_text and len(raw_text) > 50 and not raw_text.isupper():  # Skip ALL CAPS noise
+            paragraphs.append(raw_text)
+
+    logger.info(f"    Minimal cleaning found {len(paragraphs)} valid paragraphs")
+    if paragraphs:
+        combined = ' '.join(paragraphs[:5])  # Take first 5 paragraphs
+        logger.info(f"    Combined (before final cleaning): {len(combined)} chars")
+        if len(combined) > 100:
+            # Apply minimal cleaning
+            combined = re.sub(r'http[s]?://\S+', '', combined)
+            combined = re.sub(r'\s+', ' ', combined).strip()
+            logger.info(f"    Combined (after final cleaning): {len(combined)} chars")
+            if len(combined) > 100:
+                logger.info(f"     Fallback SUCCESS: Extracted {len(combined)} chars (minimal cleaning)")
+                return combined
+    else:
+        logger.warning(f"    ❌ FAILED: Could not extract any content. Checked {len(soup.find_all('p'))} paragraphs but none met criteria.")
+    return None
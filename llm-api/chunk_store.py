@@ -0,0 +1,236 @@
+"""
+Memory-mapped chunk store for the base knowledge index.
+
+Chunk texts live in a flat UTF-8 blob (<name>.bin) addressed by a uint64
+(start, end) byte-offset array (<name>.spans). A third file (<name>.hashes)
+holds a 64-bit content hash per chunk for deduplication. Blob and spans are
+memory-mapped read-only, so opening the store is O(1), only the chunks that
+are actually returned are decoded into Python strings, and every worker
+process on a host shares one page-cache copy.
+
+Chunks appended at runtime (e.g. healed knowledge, which is persisted in its
+own segments) are kept in an in-memory tail after the mapped chunks.
+
+A rewritten store is published by renaming its three files into place while
+holding an exclusive lock on <name>.lock; stores are opened under a shared
+lock, so a reader never pairs a new blob with old spans or the reverse.
+"""
+
+import hashlib
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishing is not coordinated across processes
+    fcntl = None
+
+import numpy as np
+
+SPAN_DTYPE = np.dtype("<u8")
+HASH_DTYPE = np.dtype("<u8")
+
+
+def chunk_hash(text: str) -> str:
+    """Content hash (hex SHA-1 of whitespace-normalized text) used to deduplicate chunks."""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def hash64(hex_digest: str) -> int:
+    """64-bit prefix of a chunk_hash digest, as stored in the .hashes file."""
+    return int(hex_digest[:16], 16)
+
+
+def store_paths(blob_path: Path) -> Tuple[Path, Path, Path]:
+    blob_path = Path(blob_path)
+    return blob_path, blob_path.with_suffix(".spans"), blob_path.with_suffix(".hashes")
+
+
+@contextmanager
+def _store_lock(blob_path: Path, exclusive: bool) -> Iterator[None]:
+    """Lock on <name>.lock held while a store's files are replaced (exclusive) or opened (shared)."""
+    lock_path = Path(blob_path).with_suffix(".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def publish_chunk_store(src_blob: Path, dst_blob: Path) -> None:
+    """Move a complete store written at src_blob into place at dst_blob, as one step for readers."""
+    with _store_lock(dst_blob, exclusive=True):
+        for src, dst in zip(store_paths(src_blob), store_paths(dst_blob)):
+            os.replace(src, dst)
+
+
+class ChunkStoreWriter:
+    """Append-only writer for a chunk store. Call flush() to make appended chunks durable."""
+
+    def __init__(self, blob_path: Path, resume_from: Optional[Tuple[int, int]] = None):
+        """
+        Open a store for appending. With resume_from=(blob_bytes, num_chunks) the
+        files are truncated back to that position first; otherwise they are emptied.
+        """
+        self.blob_path, self.spans_path, self.hashes_path = store_paths(blob_path)
+        self.blob_path.parent.mkdir(parents=True, exist_ok=True)
+
+        blob_bytes, num_chunks = resume_from if resume_from is not None else (0, 0)
+        for path, size in (
+            (self.blob_path, blob_bytes),
+            (self.spans_path, num_chunks * 2 * SPAN_DTYPE.itemsize),
+            (self.hashes_path, num_chunks * HASH_DTYPE.itemsize),
+        ):
+            with open(path, "ab") as f:
+                f.truncate(size)
+
+        self._blob = open(self.blob_path, "ab")
+        self._spans = open(self.spans_path, "ab")
+        self._hashes = open(self.hashes_path, "ab")
+        self.blob_bytes = blob_bytes
+        self.num_chunks = num_chunks
+
+    def append(self, text: str) -> int:
+        """Append one chunk. Returns its position in the store."""
+        return self.append_many([text])
+
+    def append_many(self, texts: Iterable[str]) -> int:
+        """Append chunks in order. Returns the position of the first appended chunk."""
+        first = self.num_chunks
+        spans = []
+        hashes = []
+        for text in texts:
+            data = text.encode("utf-8")
+            self._blob.write(data)
+            spans.append((self.blob_bytes, self.blob_bytes + len(data)))
+            hashes.append(hash64(chunk_hash(text)))
+            self.blob_bytes += len(data)
+        if spans:
+            self._spans.write(np.asarray(spans, dtype=SPAN_DTYPE).tobytes())
+            self._hashes.write(np.asarray(hashes, dtype=HASH_DTYPE).tobytes())
+            self.num_chunks += len(spans)
+        return first
+
+    def position(self) -> Tuple[int, int]:
+        """(blob_bytes, num_chunks) after the last append, usable as resume_from."""
+        return self.blob_bytes, self.num_chunks
+
+    def flush(self) -> None:
+        for f in (self._blob, self._spans, self._hashes):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        for f in (self._blob, self._spans, self._hashes):
+            f.close()
+
+
+def write_chunk_store(blob_path: Path, chunks: Iterable[str]) -> int:
+    """
+    Write a complete chunk store. Returns the number of chunks written.
+    Files are written under temporary names and published with publish_chunk_store,
+    so processes that still have the previous store mapped are not affected.
+    """
+    blob_path = Path(blob_path)
+    tmp_blob = blob_path.with_name(blob_path.stem + ".tmp" + blob_path.suffix)
+    writer = ChunkStoreWriter(tmp_blob)
+    try:
+        writer.append_many(chunks)
+    finally:
+        writer.close()
+    publish_chunk_store(tmp_blob, blob_path)
+    return writer.num_chunks
+
+
+class ChunkStore:
+    """Read-only, memory-mapped chunk store with an in-memory tail for runtime additions."""
+
+    def __init__(self, blob_path: Path):
+        self.blob_path, self.spans_path, self.hashes_path = store_paths(blob_path)
+
+        with _store_lock(self.blob_path, exclusive=False):
+            self._blob_file = open(self.blob_path, "rb")
+            blob_size = os.fstat(self._blob_file.fileno()).st_size
+            # mmap cannot map empty files
+            self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ) if blob_size else b""
+
+            span_bytes = self.spans_path.stat().st_size
+            if span_bytes:
+                self._spans = np.memmap(self.spans_path, dtype=SPAN_DTYPE, mode="r").reshape(-1, 2)
+            else:
+                self._spans = np.zeros((0, 2), dtype=SPAN_DTYPE)
+
+            # Hashes in chunk order (kept mapped so truncate() can drop the hidden chunks' hashes)
+            if self.hashes_path.exists() and self.hashes_path.stat().st_size:
+                self._hashes = np.memmap(self.hashes_path, dtype=HASH_DTYPE, mode="r")
+            else:
+                self._hashes = np.zeros(0, dtype=HASH_DTYPE)
+
+        self._mapped_count = int(self._spans.shape[0])
+        self._sorted_hashes = np.sort(self._hashes[:self._mapped_count])
+        self._tail: List[str] = []
+
+    @classmethod
+    def exists(cls, blob_path: Path) -> bool:
+        blob, spans, _ = store_paths(blob_path)
+        return blob.exists() and spans.exists()
+
+    def __len__(self) -> int:
+        return self._mapped_count + len(self._tail)
+
+    def __getitem__(self, position: int) -> str:
+        position = int(position)
+        if position < 0:
+            position += len(self)
+        if 0 <= position < self._mapped_count:
+            start, end = self._spans[position]
+            return self._blob[int(start):int(end)].decode("utf-8")
+        if self._mapped_count <= position < len(self):
+            return self._tail[position - self._mapped_count]
+        raise IndexError(f"chunk {position} out of range")
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def get_many(self, positions: Iterable[int]) -> List[str]:
+        return [self[p] for p in positions]
+
+    def truncate(self, count: int) -> None:
+        """Hide mapped chunks past `count` (e.g. written after the last index checkpoint)."""
+        count = max(0, count)
+        if count < self._mapped_count:
+            self._mapped_count = count
+            self._sorted_hashes = np.sort(self._hashes[:count])
+        del self._tail[max(0, count - self._mapped_count):]
+
+    def append(self, text: str) -> None:
+        self._tail.append(text)
+
+    def extend(self, texts: Iterable[str]) -> None:
+        self._tail.extend(texts)
+
+    def contains_hash(self, hex_digest: str) -> bool:
+        """Whether a mapped chunk has this chunk_hash (runtime tail chunks are not included)."""
+        if not self._sorted_hashes.size:
+            return False
+        h = np.uint64(hash64(hex_digest))
+        i = int(np.searchsorted(self._sorted_hashes, h))
+        return i < self._sorted_hashes.size and self._sorted_hashes[i] == h
+
+    def stats(self) -> Dict:
+        return {
+            "mapped_chunks": self._mapped_count,
+            "tail_chunks": len(self._tail),
+            "blob_bytes": len(self._blob),
+            "spans_bytes": int(self._spans.nbytes),
+        }
+
+    def close(self) -> None:
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
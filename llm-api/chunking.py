@@ -0,0 +1,186 @@
+"""
+Sentence-aware, token-budgeted text chunking.
+
+Documents are split into chunks that end on sentence boundaries and fit the
+embedding model's input limit (all-MiniLM-L6-v2 truncates at 256 tokens, so
+anything past that in a chunk is never embedded). Chunks are described by
+(start, end) character spans into their document rather than copied strings;
+the text is only sliced out when a chunk is embedded or stored.
+
+Each document is tokenized once, with character offsets, and the chunk
+boundaries are computed on the token offset arrays with numpy:
+
+- a sentence ends after ".", "!" or "?" followed by whitespace
+- a chunk holds as many whole sentences as fit in max_tokens
+- a sentence longer than max_tokens is split between words
+- the next chunk repeats the trailing whole sentences of the previous one that
+  fit in overlap_tokens (the trailing words, after a split sentence)
+
+Token counts come from the model's tokenizer when it is a Hugging Face fast
+tokenizer (sentence-transformers models expose one as `.tokenizer`). Without
+one, words and punctuation marks are counted instead, which underestimates
+WordPiece counts for rare words.
+"""
+
+import copy
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# all-MiniLM-L6-v2 max_seq_length; two positions go to [CLS] and [SEP]
+DEFAULT_MAX_SEQ_LENGTH = 256
+SPECIAL_TOKENS = 2
+DEFAULT_OVERLAP_TOKENS = 32
+
+_SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+')
+_WORD_RE = re.compile(r'\w+|[^\w\s]')
+
+_NO_SPANS = np.zeros((0, 2), dtype=np.int64)
+
+
+class ChunkSpans(NamedTuple):
+    """Chunks of several documents: chunk i is documents[doc_ids[i]][starts[i]:ends[i]]."""
+    doc_ids: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def texts(self, documents: Sequence[str]) -> List[str]:
+        return [documents[d][s:e] for d, s, e in zip(self.doc_ids.tolist(), self.starts.tolist(), self.ends.tolist())]
+
+
+def _backend_tokenizer(tokenizer):
+    """
+    The Rust `tokenizers.Tokenizer` behind a transformers fast tokenizer (or the
+    tokenizer itself), with truncation and padding off. None if there is none.
+    """
+    backend = getattr(tokenizer, "backend_tokenizer", tokenizer)
+    if backend is None or not all(hasattr(backend, name) for name in ("encode_batch", "no_truncation", "no_padding")):
+        return None
+    # Private copy: transformers changes the truncation settings of its backend on every call
+    backend = copy.deepcopy(backend)
+    backend.no_truncation()
+    backend.no_padding()
+    return backend
+
+
+def chunk_spans_from_offsets(text: str, offsets: np.ndarray, max_tokens: int, overlap_tokens: int = 0) -> np.ndarray:
+    """
+    Chunk boundaries for one document, given its (n_tokens, 2) token character offsets.
+    Returns an (n_chunks, 2) int64 array of character spans.
+    """
+    n = len(offsets)
+    if n == 0:
+        return _NO_SPANS
+    max_tokens = max(1, max_tokens)
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens - 1))
+    tok_start = offsets[:, 0]
+    tok_end = offsets[:, 1]
+
+    # Cut points are token indices a chunk may end before (and the next one start at).
+    # Sentence starts: the first token at or after each sentence break
+    breaks = np.fromiter((m.end() for m in _SENTENCE_BREAK_RE.finditer(text)), dtype=np.int64)
+    sentence_cuts = np.unique(np.searchsorted(tok_start, breaks, side='left'))
+    sentence_cuts = sentence_cuts[(sentence_cuts > 0) & (sentence_cuts < n)]
+    # Word starts: tokens separated from the previous one by whitespace (not "##" pieces or punctuation)
+    word_cuts = np.flatnonzero(tok_start[1:] > tok_end[:-1]) + 1
+
+    spans = []
+    start = 0
+    prev_end = 0
+    while True:
+        limit = min(start + max_tokens, n)
+        if limit == n:
+            end, cuts = n, sentence_cuts
+        else:
+            # A new chunk must reach past the previous one, or it would only repeat the overlap
+            floor = max(start, prev_end)
+            end, cuts = _last_cut(sentence_cuts, floor, limit), sentence_cuts
+            if end is None:
+                end, cuts = _last_cut(word_cuts, floor, limit), word_cuts
+            if end is None:
+                end = limit
+        spans.append((tok_start[start], tok_end[end - 1]))
+        if end >= n:
+            break
+
+        next_start = end
+        if overlap_tokens:
+            j = np.searchsorted(cuts, max(end - overlap_tokens, start + 1), side='left')
+            if j < len(cuts) and cuts[j] < end:
+                next_start = int(cuts[j])
+        start, prev_end = next_start, end
+
+    return np.array(spans, dtype=np.int64)
+
+
+def _last_cut(cuts: np.ndarray, floor: int, limit: int) -> Optional[int]:
+    """The largest cut point in (floor, limit], or None."""
+    k = np.searchsorted(cuts, limit, side='right') - 1
+    if k >= 0 and cuts[k] > floor:
+        return int(cuts[k])
+    return None
+
+
+class SentenceChunker:
+    """Split documents into sentence-aligned chunks of at most max_tokens model tokens."""
+
+    def __init__(self, tokenizer=None, max_tokens: int = DEFAULT_MAX_SEQ_LENGTH - SPECIAL_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS):
+        self.backend = _backend_tokenizer(tokenizer) if tokenizer is not None else None
+        self.max_tokens = max(1, int(max_tokens))
+        self.overlap_tokens = max(0, int(overlap_tokens))
+
+    @classmethod
+    def for_model(cls, model, max_tokens: Optional[int] = None,
+                  overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> "SentenceChunker":
+        """Chunker using a sentence-transformers model's tokenizer and input limit."""
+        if not max_tokens:
+            max_seq_length = getattr(model, "max_seq_length", None) or DEFAULT_MAX_SEQ_LENGTH
+            max_tokens = max_seq_length - SPECIAL_TOKENS
+        return cls(getattr(model, "tokenizer", None), max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+    def params(self) -> Dict:
+        """Settings that determine the chunk boundaries (for detecting changes between runs)."""
+        return {
+            "tokenizer": "model" if self.backend is not None else "words",
+            "max_tokens": self.max_tokens,
+            "overlap_tokens": self.overlap_tokens,
+        }
+
+    def token_offsets(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """(n_tokens, 2) character offsets of the tokens of each text."""
+        if self.backend is not None:
+            encodings = self.backend.encode_batch(list(texts), add_special_tokens=False)
+            return [np.array(e.offsets, dtype=np.int64).reshape(-1, 2) for e in encodings]
+        return [
+            np.array([m.span() for m in _WORD_RE.finditer(text)], dtype=np.int64).reshape(-1, 2)
+            for text in texts
+        ]
+
+    def spans(self, text: str) -> np.ndarray:
+        """(n_chunks, 2) character spans of the chunks of one document."""
+        if not text:
+            return _NO_SPANS
+        return chunk_spans_from_offsets(text, self.token_offsets([text])[0], self.max_tokens, self.overlap_tokens)
+
+    def chunk_documents(self, texts: Sequence[str]) -> ChunkSpans:
+        """Chunk several documents, tokenizing them in one batch."""
+        per_doc = [
+            chunk_spans_from_offsets(text, offsets, self.max_tokens, self.overlap_tokens)
+            for text, offsets in zip(texts, self.token_offsets(texts))
+        ]
+        counts = [len(spans) for spans in per_doc]
+        all_spans = np.concatenate(per_doc) if per_doc else _NO_SPANS
+        return ChunkSpans(
+            doc_ids=np.repeat(np.arange(len(per_doc), dtype=np.int64), counts),
+            starts=all_spans[:, 0],
+            ends=all_spans[:, 1],
+        )
+
+    def chunk(self, text: str) -> List[str]:
+        """Chunk texts of one document."""
+        return [text[start:end] for start, end in self.spans(text).tolist()]
@@ -0,0 +1,304 @@
+"""
+Stable document ids and incremental updates for the base index.
+
+Documents added by ingest.py or through the API carry a caller-chosen id.
+A document's chunks occupy a contiguous range of positions in the base index
+and chunk store, and DocumentRegistry maps each id to its range. Updating a
+document appends its new chunks and tombstones the old range; deleting it only
+tombstones the range. Tombstoned positions are filtered out of search results
+(search_live) until compaction drops them from the index.
+
+Changes are recorded in an append-only journal under <cache dir>/documents,
+one segment per request: segment-<seq>.jsonl holds the operations and
+segment-<seq>.npy the embeddings of the chunks they add. The .npy file is
+written last and commits the segment. On startup the journal is replayed on top
+of the registry saved with the base index. Compaction folds committed segments
+into the base index, records the last folded sequence number (folded_through)
+and removes them; sequence numbers are never reused.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# An uncommitted segment older than this is treated as abandoned (its writer crashed)
+STALE_SEGMENT_SECONDS = 60.0
+
+
+class DocumentRegistry:
+    """Document id -> (start, end) chunk positions, plus the tombstoned positions."""
+
+    def __init__(self):
+        self.ranges: Dict[str, Tuple[int, int]] = {}
+        self._deleted = np.zeros(0, dtype=bool)
+        self.deleted_count = 0
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.ranges
+
+    def get(self, doc_id: str) -> Optional[Tuple[int, int]]:
+        return self.ranges.get(doc_id)
+
+    def _tombstone(self, start: int, end: int) -> None:
+        if end > len(self._deleted):
+            grown = np.zeros(max(end, 2 * len(self._deleted)), dtype=bool)
+            grown[:len(self._deleted)] = self._deleted
+            self._deleted = grown
+        self.deleted_count += int(end - start - self._deleted[start:end].sum())
+        self._deleted[start:end] = True
+
+    def put(self, doc_id: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """Point a document at new chunk positions. The previous range (returned) is tombstoned."""
+        previous = self.ranges.get(doc_id)
+        if previous is not None:
+            self._tombstone(*previous)
+        self.ranges[doc_id] = (start, end)
+        return previous
+
+    def delete(self, doc_id: str) -> Optional[Tuple[int, int]]:
+        """Remove a document and tombstone its chunks. Returns its range, or None if unknown."""
+        previous = self.ranges.pop(doc_id, None)
+        if previous is not None:
+            self._tombstone(*previous)
+        return previous
+
+    def is_deleted(self, positions: np.ndarray) -> np.ndarray:
+        """Boolean mask of tombstoned positions (same shape as positions; negative ids are not deleted)."""
+        positions = np.asarray(positions)
+        inside = (positions >= 0) & (positions < len(self._deleted))
+        return inside & self._deleted[np.where(inside, positions, 0)]
+
+    def live_mask(self, count: int) -> np.ndarray:
+        """Mask of the positions 0..count-1 that are not tombstoned."""
+        live = np.ones(count, dtype=bool)
+        n = min(count, len(self._deleted))
+        live[:n] = ~self._deleted[:n]
+        return live
+
+    def renumbered(self, live: np.ndarray) -> "DocumentRegistry":
+        """The registry after the positions where `live` is False have been removed."""
+        new_positions = np.cumsum(live, dtype=np.int64)
+        registry = DocumentRegistry()
+        for doc_id, (start, end) in self.ranges.items():
+            new_start = int(new_positions[start - 1]) if start else 0
+            registry.ranges[doc_id] = (new_start, new_start + (end - start))
+        return registry
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for doc_id, (start, end) in self.ranges.items():
+                f.write(json.dumps({"id": doc_id, "start": start, "end": end}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, limit: Optional[int] = None) -> "DocumentRegistry":
+        """
+        Load a registry file. Later entries for the same id replace earlier ones;
+        entries reaching past `limit` positions (not in the index) are dropped.
+        """
+        registry = cls()
+        path = Path(path)
+        if not path.exists():
+            return registry
+        dropped = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if limit is not None and entry["end"] > limit:
+                    dropped += 1
+                    continue
+                registry.put(entry["id"], entry["start"], entry["end"])
+        if dropped:
+            logger.warning(f"Dropped {dropped} document entries past the end of the index")
+        return registry
+
+    def stats(self) -> Dict:
+        return {"documents": len(self.ranges), "tombstoned_chunks": self.deleted_count}
+
+
+class DocumentJournal:
+    """
+    Append-only journal of document operations, one committed segment per request.
+    Healed knowledge segments (one JSON record per chunk) use the same layout with
+    6-digit sequence numbers.
+    """
+
+    def __init__(self, directory: Path, digits: int = 8):
+        self.directory = Path(directory)
+        self.digits = digits
+
+    def _paths(self, seq: int) -> Tuple[Path, Path]:
+        stem = self.directory / f"segment-{seq:0{self.digits}d}"
+        return stem.with_suffix(".jsonl"), stem.with_suffix(".npy")
+
+    def folded_through(self) -> int:
+        """Sequence number of the last segment folded into the base index by compaction."""
+        try:
+            return int((self.directory / "folded_through").read_text().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def mark_folded(self, seq: int) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / "folded_through"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(str(seq))
+        os.replace(tmp_path, path)
+
+    def _sequence_numbers(self) -> List[int]:
+        if not self.directory.exists():
+            return []
+        return sorted(int(p.stem.split("-")[-1]) for p in self.directory.glob("segment-*.jsonl"))
+
+    def append(self, ops: List[Dict], embeddings: np.ndarray) -> int:
+        """
+        Write a segment and commit it. Returns its sequence number; exclusive file
+        creation keeps sequence numbers unique across worker processes.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        existing = self._sequence_numbers()
+        seq = max(existing[-1] if existing else 0, self.folded_through()) + 1
+        while True:
+            ops_path, emb_path = self._paths(seq)
+            try:
+                f = open(ops_path, "x", encoding="utf-8")
+                break
+            except FileExistsError:
+                seq += 1
+        with f:
+            for op in ops:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        tmp_path = emb_path.with_suffix(".npy.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(embeddings, dtype="float32"))
+        os.replace(tmp_path, emb_path)
+        return seq
+
+    def _in_flight(self, seq: int) -> Optional[bool]:
+        """Whether a segment is still being written: None once it is committed, False if abandoned."""
+        ops_path, emb_path = self._paths(seq)
+        if emb_path.exists():
+            return None
+        try:
+            age = time.time() - ops_path.stat().st_mtime
+        except OSError:
+            return False
+        return age < STALE_SEGMENT_SECONDS
+
+    def committed(self, skip: AbstractSet[int] = frozenset(),
+                  through: Optional[int] = None) -> Iterator[Tuple[int, List[Dict], np.ndarray]]:
+        """
+        Committed segments that are not folded into the base index yet and not in `skip`,
+        in order, up to sequence number `through`. Stops at the first segment that is still
+        being written, so operations are never applied out of order.
+        """
+        after = self.folded_through()
+        for seq in self._sequence_numbers():
+            if through is not None and seq > through:
+                return
+            if seq <= after or seq in skip:
+                continue
+            ops_path, emb_path = self._paths(seq)
+            in_flight = self._in_flight(seq)
+            if in_flight:
+                return
+            if in_flight is False:
+                if ops_path.exists():  # Not removed by a compaction meanwhile
+                    logger.warning(f"Skipping abandoned journal segment {ops_path.name}")
+                continue
+            with open(ops_path, "r", encoding="utf-8") as f:
+                ops = [json.loads(line) for line in f if line.strip()]
+            yield seq, ops, np.load(emb_path)
+
+    def in_flight(self, skip: AbstractSet[int] = frozenset(), through: Optional[int] = None) -> List[int]:
+        """Segments up to `through`, not folded or in `skip`, that other writers have not committed yet."""
+        after = self.folded_through()
+        return [
+            seq for seq in self._sequence_numbers()
+            if after < seq and (through is None or seq <= through) and seq not in skip and self._in_flight(seq)
+        ]
+
+    def remove(self, seqs: Sequence[int]) -> None:
+        for seq in seqs:
+            for path in self._paths(seq):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def clear(self) -> List[int]:
+        """Remove every segment (e.g. when the base index is replaced). Returns their sequence numbers."""
+        seqs = self._sequence_numbers()
+        if seqs:
+            self.mark_folded(max(seqs[-1], self.folded_through()))
+            self.remove(seqs)
+        return seqs
+
+
+def apply_ops(index, chunks, registry: DocumentRegistry, ops: List[Dict], embeddings: np.ndarray) -> None:
+    """
+    Apply journal operations to an index and its chunk store (which must have the same length):
+    "put" appends the document's chunks and points its id at them, "delete" tombstones them.
+    """
+    offset = 0
+    for op in ops:
+        if op["op"] == "put":
+            count = len(op["chunks"])
+            start = len(chunks)
+            if count:
+                index.add(np.ascontiguousarray(embeddings[offset:offset + count], dtype="float32"))
+                chunks.extend(op["chunks"])
+            offset += count
+            registry.put(op["id"], start, start + count)
+        elif op["op"] == "delete":
+            registry.delete(op["id"])
+
+
+def search_live(index, queries: np.ndarray, k: int, registry: Optional[DocumentRegistry], **search_kwargs):
+    """
+    index.search that skips tombstoned positions. Fetches extra candidates and widens the
+    search until every row has k live results or runs out of candidates; missing results
+    are padded with id -1.
+    """
+    if registry is None or registry.deleted_count == 0:
+        return index.search(queries, k, **search_kwargs)
+
+    ntotal = index.ntotal
+    fetch = min(ntotal, k + min(registry.deleted_count, 4 * k))
+    while True:
+        scores, ids = index.search(queries, fetch, **search_kwargs)
+        live = (ids >= 0) & ~registry.is_deleted(ids)
+        # Rows with padding already returned every candidate the index could find
+        done = (live.sum(axis=1) >= k) | (ids < 0).any(axis=1)
+        if done.all() or fetch >= ntotal:
+            break
+        fetch = min(ntotal, fetch * 4)
+
+    # Live results first, in score order
+    order = np.argsort(~live, axis=1, kind="stable")[:, :k]
+    scores = np.take_along_axis(scores, order, axis=1)
+    ids = np.take_along_axis(ids, order, axis=1)
+    kept = np.take_along_axis(live, order, axis=1)
+    if k > kept.shape[1]:
+        pad = k - kept.shape[1]
+        scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+        ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+        kept = np.pad(kept, ((0, 0), (0, pad)), constant_values=False)
+    return np.where(kept, scores, -np.inf), np.where(kept, ids, -1)
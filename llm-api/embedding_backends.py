@@ -0,0 +1,330 @@
+"""
+Embedding backends for CPU inference.
+
+- torch: the sentence-transformers model in PyTorch fp32 (the original setup)
+- onnx: the same transformer exported to ONNX and run with ONNX Runtime in fp32
+- onnx-int8: the ONNX export with its weights dynamically quantized to int8
+
+The ONNX backends are created by an export step that runs once per cache
+directory: the sentence-transformers model is loaded in PyTorch, its transformer
+is exported with torch.onnx.export, quantized with onnxruntime's
+quantize_dynamic, and the tokenizer and pooling settings are saved next to it
+(<cache dir>/onnx/<model>/). The export then checks parity: a fixed set of
+sentences is embedded by PyTorch and by each ONNX variant, and the per-sentence
+cosine similarity and the largest change in pairwise similarity are recorded in
+export.json. load_embedder() refuses a variant whose minimum cosine is below the
+configured bound and falls back to PyTorch.
+
+Once exported, an ONNX backend needs only onnxruntime, tokenizers and numpy;
+torch and sentence-transformers are not imported. Backend libraries are imported
+when a model is loaded, not when this module is.
+
+Usage (from llm-api/), e.g. while building an image:
+    python embedding_backends.py --cache-dir .cache
+"""
+
+import argparse
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model-int8.onnx"}
+DEFAULT_MIN_COSINE = 0.99
+EXPORT_FORMAT_VERSION = 1
+
+# Sentences embedded by both backends for the parity check
+PARITY_TEXTS = [
+    "What is quantum computing?",
+    "Quantum computers use qubits, which can represent 0 and 1 at the same time.",
+    "FastAPI is a modern web framework for building APIs with Python.",
+    "How do I reset my password?",
+    "The mitochondria is the powerhouse of the cell.",
+    "Sourdough bread is leavened by a culture of wild yeast and lactic acid bacteria.",
+    "Error code 0x80070005 means access is denied.",
+    "The Treaty of Westphalia ended the Thirty Years' War in 1648.",
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "Retrieval-augmented generation combines a search index with a language model.",
+    "Rust guarantees memory safety without a garbage collector.",
+    "a",
+    "Employees accrue two days of vacation per month, up to a maximum of thirty days, and unused days carry "
+    "over into the next calendar year unless the employee leaves the company before the end of March.",
+]
+
+
+def onnxruntime_available() -> bool:
+    """Whether the optional onnxruntime package is installed (without importing it)."""
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def onnx_model_dir(cache_dir: Path, model_name: str) -> Path:
+    return Path(cache_dir) / "onnx" / model_name.replace("/", "__")
+
+
+class OnnxEmbedder:
+    """
+    ONNX Runtime replacement for SentenceTransformer with the parts of its interface
+    the API uses: encode(), tokenizer, max_seq_length and get_sentence_embedding_dimension().
+    """
+
+    def __init__(self, model_dir: Path, variant: str = "onnx", threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        config = json.loads((model_dir / "export.json").read_text(encoding="utf-8"))
+        self.variant = variant
+        self.max_seq_length = config["max_seq_length"]
+        self.pooling = config["pooling"]
+        self.normalize = config["normalize"]
+        self.dimension = config["dimension"]
+
+        # The chunker counts tokens with this tokenizer (it turns truncation and padding off on its own copy)
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=config["pad_token_id"], pad_token=config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_dir / ONNX_FILES[variant]), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+
+        mask = feeds["attention_mask"][:, :, None].astype(np.float32)
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        elif self.pooling == "max":
+            pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+        else:
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled.astype(np.float32, copy=False)
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """Embed sentences like SentenceTransformer.encode (always returns a float32 numpy array)."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # Longest first, so each batch is padded to similar lengths
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for begin in range(0, len(texts), max(1, batch_size)):
+            batch = order[begin:begin + batch_size]
+            embeddings[batch] = self._encode_batch([texts[i] for i in batch])
+
+        if self.normalize or normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings[0] if single else embeddings
+
+
+def _pooling_config(model) -> Dict:
+    """Pooling mode and whether embeddings are normalized, read from the sentence-transformers modules."""
+    pooling, normalize = "mean", False
+    for module in model:
+        name = type(module).__name__
+        if name == "Pooling":
+            config = module.get_config_dict()
+            if config.get("pooling_mode_cls_token"):
+                pooling = "cls"
+            elif config.get("pooling_mode_max_tokens"):
+                pooling = "max"
+        elif name == "Normalize":
+            normalize = True
+    return {"pooling": pooling, "normalize": normalize}
+
+
+def parity_report(reference: np.ndarray, candidate: np.ndarray) -> Dict:
+    """Per-sentence cosine similarity and the largest pairwise-similarity change between two embedding sets."""
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosine = (ref * cand).sum(axis=1)
+    pairwise_delta = np.abs(ref @ ref.T - cand @ cand.T).max()
+    return {
+        "min_cosine": round(float(cosine.min()), 6),
+        "mean_cosine": round(float(cosine.mean()), 6),
+        "max_pairwise_delta": round(float(pairwise_delta), 6),
+    }
+
+
+def export_onnx(model_name: str, cache_dir: Path, opset: int = 14) -> Path:
+    """
+    Export a sentence-transformers model to ONNX (fp32 and int8) under cache_dir and record
+    the parity check. Another process finishing the same export first wins; returns the model dir.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    target = onnx_model_dir(cache_dir, model_name)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    started = time.time()
+    logger.info(f"Exporting {model_name} to ONNX...")
+
+    model = SentenceTransformer(model_name, device="cpu")
+    model.eval()
+    tokenizer = model.tokenizer
+    transformer = model[0].auto_model
+
+    work_dir = Path(tempfile.mkdtemp(prefix=target.name + ".", dir=target.parent))
+    try:
+        tokenizer.backend_tokenizer.save(str(work_dir / "tokenizer.json"))
+
+        dummy = tokenizer(["An example sentence for tracing the model."], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+
+        class _LastHiddenState(torch.nn.Module):
+            def __init__(self, inner):
+                super().__init__()
+                self.inner = inner
+
+            def forward(self, *inputs):
+                return self.inner(**dict(zip(input_names, inputs)))[0]
+
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+        # torch >= 2.9 defaults to the dynamo exporter (needs onnxscript); the TorchScript one handles BERT fine
+        extra = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        with torch.no_grad():
+            torch.onnx.export(
+                _LastHiddenState(transformer).eval(),
+                tuple(dummy[name] for name in input_names),
+                str(work_dir / ONNX_FILES["onnx"]),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=opset,
+                do_constant_folding=True,
+                **extra,
+            )
+        quantize_dynamic(
+            str(work_dir / ONNX_FILES["onnx"]), str(work_dir / ONNX_FILES["onnx-int8"]), weight_type=QuantType.QInt8
+        )
+
+        config = {
+            "format_version": EXPORT_FORMAT_VERSION,
+            "model_name": model_name,
+            "max_seq_length": int(model.max_seq_length),
+            "dimension": int(model.get_sentence_embedding_dimension()),
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": int(tokenizer.pad_token_id),
+            **_pooling_config(model),
+            "exported_at": time.time(),
+        }
+        (work_dir / "export.json").write_text(json.dumps(config, indent=2), encoding="utf-8")
+
+        reference = model.encode(PARITY_TEXTS, convert_to_numpy=True)
+        config["parity"] = {
+            variant: parity_report(reference, OnnxEmbedder(work_dir, variant).encode(PARITY_TEXTS))
+            for variant in ONNX_FILES
+        }
+        (work_dir / "export.json").write_text(json.dumps(config, indent=2), encoding="utf-8")
+
+        try:
+            os.rename(work_dir, target)
+        except OSError:
+            logger.info(f"Another process finished exporting {model_name} first; using its files")
+            shutil.rmtree(work_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+    sizes = {variant: (target / name).stat().st_size / 1e6 for variant, name in ONNX_FILES.items()}
+    logger.info(f"✅ ONNX export done in {time.time() - started:.1f}s: "
+                f"{', '.join(f'{v} {s:.1f} MB' for v, s in sizes.items())}; parity {config['parity']}")
+    return target
+
+
+def _load_export(model_dir: Path) -> Optional[Dict]:
+    try:
+        config = json.loads((model_dir / "export.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if config.get("format_version") != EXPORT_FORMAT_VERSION or "parity" not in config:
+        return None
+    return config
+
+
+def load_embedder(model_name: str, backend: str = "torch", cache_dir: Optional[Path] = None,
+                  min_cosine: float = DEFAULT_MIN_COSINE, threads: int = 0):
+    """
+    Load the embedding model with the requested backend, exporting it to ONNX first if needed.
+    Falls back to the PyTorch model if onnxruntime is missing, the export fails or the
+    variant does not reach min_cosine in the parity check.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        logger.warning(f"Unknown embedding backend {backend!r}; using torch (choose from {', '.join(EMBEDDING_BACKENDS)})")
+        backend = "torch"
+
+    if backend != "torch":
+        if not onnxruntime_available():
+            logger.warning(f"onnxruntime is not installed; using the torch embedding backend instead of {backend}")
+        elif cache_dir is None:
+            logger.warning(f"No cache directory for the ONNX export; using the torch embedding backend")
+        else:
+            model_dir = onnx_model_dir(cache_dir, model_name)
+            config = _load_export(model_dir)
+            if config is None:
+                shutil.rmtree(model_dir, ignore_errors=True)
+                try:
+                    model_dir = export_onnx(model_name, cache_dir)
+                    config = _load_export(model_dir)
+                except Exception as e:
+                    logger.warning(f"ONNX export failed ({e}); using the torch embedding backend")
+            if config is not None:
+                parity = config["parity"][backend]
+                if parity["min_cosine"] >= min_cosine:
+                    logger.info(f"Embedding backend: {backend} ({model_dir / ONNX_FILES[backend]}, parity {parity})")
+                    return OnnxEmbedder(model_dir, backend, threads=threads)
+                logger.warning(f"⚠️ {backend} embeddings diverge from the torch model "
+                               f"(min cosine {parity['min_cosine']} < {min_cosine}); using torch")
+
+    from sentence_transformers import SentenceTransformer
+    logger.info("Embedding backend: torch")
+    return SentenceTransformer(model_name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (fp32 and int8) with a parity check")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="sentence-transformers model (default: all-MiniLM-L6-v2)")
+    parser.add_argument("--cache-dir", default=str(Path(__file__).resolve().parent / ".cache"),
+                        help="Cache directory the API reads (default: llm-api/.cache)")
+    parser.add_argument("--force", action="store_true", help="Export again even if an export exists")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    model_dir = onnx_model_dir(Path(args.cache_dir), args.model)
+    if args.force or _load_export(model_dir) is None:
+        shutil.rmtree(model_dir, ignore_errors=True)
+        model_dir = export_onnx(args.model, Path(args.cache_dir))
+    print(json.dumps(_load_export(model_dir)["parity"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Query embedding cache for the Self-Healing RAG API.
+
+A bounded, thread-safe LRU cache of query embeddings keyed on the embedding
+model name and the normalized query text, with optional TTL expiry and
+optional persistence to a .npz file so warm entries survive restarts.
+"""
+
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_KEY_SEPARATOR = "\x1f"
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text for cache lookups (unicode form, case and whitespace)."""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """LRU cache of L2-normalized query embeddings with size and TTL eviction."""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 0.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - stored_at > self.ttl_seconds
+
+    def get(self, model_name: str, query: str) -> Optional[np.ndarray]:
+        """Return a copy of the cached embedding, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1], time.time()):
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy()
+
+    def put(self, model_name: str, query: str, vector: np.ndarray) -> None:
+        if not self.enabled:
+            return
+
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            self._entries[key] = (np.array(vector, dtype="float32"), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def save(self, path: Path) -> int:
+        """Write all live entries to a .npz file. Returns the number of entries saved."""
+        now = time.time()
+        with self._lock:
+            items = [(k, v) for k, v in self._entries.items() if not self._expired(v[1], now)]
+        if not items:
+            return 0
+
+        keys = np.array([_KEY_SEPARATOR.join(k) for k, _ in items])
+        vectors = np.stack([v[0] for _, v in items]).astype("float32")
+        stored_at = np.array([v[1] for _, v in items], dtype="float64")
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, keys=keys, vectors=vectors, stored_at=stored_at)
+        os.replace(tmp_path, path)
+        return len(items)
+
+    def load(self, path: Path) -> int:
+        """Load entries saved by save(). Returns the number of entries restored."""
+        path = Path(path)
+        if not path.exists():
+            return 0
+
+        with np.load(path, allow_pickle=False) as data:
+            keys, vectors, stored_at = data["keys"], data["vectors"], data["stored_at"]
+
+        now = time.time()
+        restored = 0
+        with self._lock:
+            for key, vector, ts in zip(keys, vectors, stored_at):
+                if self._expired(float(ts), now):
+                    continue
+                model_name, _, query = str(key).partition(_KEY_SEPARATOR)
+                self._entries[(model_name, query)] = (vector.astype("float32"), float(ts))
+                restored += 1
+            # Oldest entries first so the LRU order is preserved
+            ordered = sorted(self._entries.items(), key=lambda item: item[1][1])
+            self._entries = OrderedDict(ordered[-self.max_size:] if self.max_size > 0 else [])
+        return restored
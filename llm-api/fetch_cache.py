@@ -0,0 +1,227 @@
+"""
+HTTP fetch cache for self-healing lookups.
+
+Caches Wikipedia REST/search responses and extracted web page text so popular
+topics are not re-downloaded on every low-score query. Entries keep their
+ETag/Last-Modified validators so stale entries can be revalidated with a
+conditional request, and negative results (404/410) are cached too.
+
+Backends are pluggable: MemoryFetchCache (LRU), SQLiteFetchCache (disk) and
+TieredFetchCache, which checks memory first and falls back to disk. Its
+aget/aput variants are for the event loop: only the memory tier is touched
+inline, SQLite reads and writes run in a worker thread. stats() counts the
+SQLite entries with a query, so async callers run it in a worker thread too.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Status codes that are safe to cache as negative results
+NEGATIVE_STATUS_CODES = {404, 410}
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    body: str
+    content_type: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    expires_at: float
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) < self.expires_at
+
+    def can_revalidate(self) -> bool:
+        return self.status_code == 200 and bool(self.etag or self.last_modified)
+
+
+class FetchCacheBackend:
+    """Interface for fetch cache backends."""
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryFetchCache(FetchCacheBackend):
+    """Bounded in-process LRU tier."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"memory_entries": len(self._entries), "memory_max_entries": self.max_entries}
+
+
+class SQLiteFetchCache(FetchCacheBackend):
+    """Disk tier backed by a single SQLite table. Entries older than max_age are pruned on open."""
+
+    def __init__(self, db_path: Path, max_age: float = 7 * 24 * 3600):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fetch_cache (
+                key TEXT PRIMARY KEY,
+                status_code INTEGER NOT NULL,
+                body TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("DELETE FROM fetch_cache WHERE stored_at < ?", (time.time() - max_age,))
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status_code, body, content_type, etag, last_modified, stored_at, expires_at "
+                "FROM fetch_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fetch_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, *entry),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM fetch_cache").fetchone()
+        return {"disk_entries": count, "disk_path": str(self.db_path)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredFetchCache(FetchCacheBackend):
+    """Memory tier in front of an optional disk tier, with hit/miss accounting."""
+
+    def __init__(self, memory: MemoryFetchCache, disk: Optional[FetchCacheBackend] = None):
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self._disk_get(key)
+        return entry
+
+    async def aget(self, key: str) -> Optional[CachedResponse]:
+        """get() without blocking the event loop on the disk tier."""
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        return entry
+
+    def _disk_get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            entry = self.disk.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Fetch cache disk read failed: {e}")
+            return None
+        if entry is not None:
+            self.memory.put(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        self.memory.put(key, entry)
+        if self.disk is not None:
+            self._disk_put(key, entry)
+
+    async def aput(self, key: str, entry: CachedResponse) -> None:
+        """put() without blocking the event loop on the disk tier."""
+        self.memory.put(key, entry)
+        if self.disk is not None:
+            await asyncio.to_thread(self._disk_put, key, entry)
+
+    def _disk_put(self, key: str, entry: CachedResponse) -> None:
+        try:
+            self.disk.put(key, entry)
+        except sqlite3.Error as e:
+            logger.warning(f"Fetch cache disk write failed: {e}")
+
+    def record(self, outcome: str) -> None:
+        """Count a lookup outcome: hit, negative_hit, revalidated or miss."""
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "negative_hit":
+                self.negative_hits += 1
+            elif outcome == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+            }
+        counters.update(self.memory.stats())
+        if self.disk is not None:
+            try:
+                counters.update(self.disk.stats())
+            except sqlite3.Error:
+                pass
+        return counters
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,134 @@
+"""
+Concurrent healing lookups for the Self-Healing RAG API.
+
+A HealFanout runs the lookups of one healing attempt (Wikipedia title
+variants, search API, web search, page fetches) as concurrent tasks and
+collects the (source label, text) pairs they return:
+
+- Lookups in an exclusive group (for example the Wikipedia lookups, of which
+  only one page is used) are ranked by priority: a group's result is the
+  highest-priority good one, taken as soon as every higher-priority member has
+  failed, and the remaining members are cancelled.
+- Once `enough(texts)` holds, all lookups still running are cancelled.
+- After `deadline` seconds the lookups still running are cancelled and the
+  texts gathered so far are returned, marked as timed out.
+
+A lookup may launch further lookups (a web search launching the page fetches
+of its results) before it returns.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A lookup resolves to (source label, text), or None when it found nothing usable
+Lookup = Awaitable[Optional[Tuple[str, str]]]
+
+
+class HealText(NamedTuple):
+    priority: int
+    source: str
+    text: str
+
+
+class FanoutResult(NamedTuple):
+    texts: List[HealText]  # By priority
+    timed_out: bool
+    cancelled: int  # Lookups stopped before they finished
+    elapsed: float
+
+
+class HealFanout:
+    """Concurrent healing lookups with exclusive groups, an early stop rule and a deadline."""
+
+    def __init__(self, deadline: float, enough: Callable[[List[HealText]], bool]):
+        self.deadline = deadline
+        self.enough = enough
+        self.texts: List[HealText] = []
+        self._priority: Dict[asyncio.Task, int] = {}
+        self._group_of: Dict[asyncio.Task, str] = {}
+        self._groups: Dict[str, List[asyncio.Task]] = {}
+        self._results: Dict[asyncio.Task, Optional[Tuple[str, str]]] = {}
+        self._pending: Set[asyncio.Task] = set()
+        self._stopped: List[asyncio.Task] = []
+
+    def launch(self, lookup: Lookup, priority: int, group: Optional[str] = None) -> None:
+        """Start a lookup; lower priority values rank first among results and within a group."""
+        task = asyncio.ensure_future(lookup)
+        self._priority[task] = priority
+        self._pending.add(task)
+        if group is not None:
+            self._group_of[task] = group
+            members = self._groups.setdefault(group, [])
+            members.append(task)
+            members.sort(key=self._priority.__getitem__)
+
+    def _accept(self, task: asyncio.Task) -> None:
+        source, text = self._results[task]
+        self.texts.append(HealText(self._priority[task], source, text))
+
+    def _settle_group(self, group: str, final: bool = False) -> None:
+        """Take the group's result once it is decided (or, if final, the best finished one)."""
+        members = self._groups[group]
+        for task in members:
+            if task in self._pending:
+                if final:
+                    continue
+                return  # A higher-priority member may still succeed
+            if self._results.get(task):
+                self._accept(task)
+                break
+        del self._groups[group]
+        for task in members:
+            if task in self._pending:
+                self._cancel(task)
+
+    def _cancel(self, task: asyncio.Task) -> None:
+        task.cancel()
+        self._pending.discard(task)
+        self._stopped.append(task)
+
+    def _finish(self, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.debug(f"Healing lookup failed: {error}")
+            return
+        result = task.result()
+        self._results[task] = result if result and result[1] else None
+        if task not in self._group_of and self._results[task]:
+            self._accept(task)
+
+    async def run(self) -> FanoutResult:
+        """Wait for the launched lookups until enough text is gathered, all are done, or the deadline passes."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        timed_out = False
+        try:
+            while self._pending and not self.enough(self.texts):
+                remaining = started + self.deadline - loop.time()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                done, _ = await asyncio.wait(set(self._pending), timeout=remaining,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    timed_out = True
+                    break
+                for task in done:
+                    self._finish(task)
+                for group in list(self._groups):
+                    self._settle_group(group)
+        finally:
+            for group in list(self._groups):
+                self._settle_group(group, final=True)
+            for task in list(self._pending):
+                self._cancel(task)
+            if self._stopped:
+                await asyncio.gather(*self._stopped, return_exceptions=True)
+
+        return FanoutResult(sorted(self.texts), timed_out, len(self._stopped), loop.time() - started)
@@ -0,0 +1,249 @@
+"""
+Main-text extraction from HTML pages fetched during self-healing.
+
+A page is parsed once into a PageTexts view that exposes the candidate texts
+the extraction strategies look at (main/article elements, content-like divs,
+paragraphs and the body), with navigation, header, footer, aside, script and
+style content removed. select_main_text() then picks the main content from
+those candidates.
+
+Two parsers produce PageTexts:
+
+- lxml (default when installed): the C-backed HTML parser builds the tree and
+  a single iterative walk collects all text nodes in document order, skipping
+  noise subtrees and recording each candidate element as a range of those
+  text nodes. Candidate texts are only joined when a strategy asks for them.
+- html.parser: the BeautifulSoup tree, used when lxml is not available.
+"""
+
+import logging
+import re
+from typing import Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from text_cleaning import clean_text
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # Optional dependency: fall back to BeautifulSoup's html.parser
+    lxml = None
+
+NOISE_TAGS = ("script", "style", "meta", "link", "nav", "header", "footer", "aside")
+CONTENT_CLASS_RE = re.compile(r'content|main|article|post|entry|text|body|description|paragraph', re.I)
+HTML_PARSERS = ("lxml", "html.parser")
+
+
+class PageTexts:
+    """Candidate texts of a parsed page, each joined from its stripped text nodes with spaces."""
+
+    def main_articles(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def content_divs(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def paragraphs(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def body(self) -> Optional[str]:
+        raise NotImplementedError
+
+
+class SoupPageTexts(PageTexts):
+    """PageTexts backed by a BeautifulSoup (html.parser) tree."""
+
+    def __init__(self, html: str):
+        self.soup = BeautifulSoup(html, "html.parser")
+        for tag in self.soup(list(NOISE_TAGS)):
+            tag.decompose()
+
+    def main_articles(self) -> Iterator[str]:
+        for tag in self.soup.find_all(['main', 'article']):
+            yield tag.get_text(separator=' ', strip=True)
+
+    def content_divs(self) -> Iterator[str]:
+        for tag in self.soup.find_all('div', class_=CONTENT_CLASS_RE):
+            yield tag.get_text(separator=' ', strip=True)
+
+    def paragraphs(self) -> Iterator[str]:
+        for tag in self.soup.find_all('p'):
+            yield tag.get_text(separator=' ', strip=True)
+
+    def body(self) -> Optional[str]:
+        body = self.soup.find('body')
+        return body.get_text(separator=' ', strip=True) if body else None
+
+
+class LxmlPageTexts(PageTexts):
+    """PageTexts built from an lxml tree in one traversal."""
+
+    def __init__(self, html: str):
+        self.pieces: List[str] = []
+        self.spans = {"main": [], "content": [], "p": [], "body": []}
+        root = _lxml_parse(html)
+        if root is not None:
+            self._walk(root)
+
+    def _add(self, text: Optional[str]) -> None:
+        if text:
+            text = text.strip()
+            if text:
+                self.pieces.append(text)
+
+    def _walk(self, root) -> None:
+        # Explicit stack: (element, None) enters an element, (element, span) leaves it
+        stack: List[Tuple[object, Optional[list]]] = [(root, None)]
+        while stack:
+            element, span = stack.pop()
+            if span is not None:
+                span[1] = len(self.pieces)
+                self._add(element.tail)
+                continue
+
+            tag = element.tag
+            if not isinstance(tag, str) or tag in NOISE_TAGS:
+                # Comments, processing instructions and noise elements: only the tail is page text
+                self._add(element.tail)
+                continue
+
+            span = [len(self.pieces), len(self.pieces)]
+            if tag in ("main", "article"):
+                self.spans["main"].append(span)
+            elif tag == "p":
+                self.spans["p"].append(span)
+            elif tag == "div" and CONTENT_CLASS_RE.search(element.get("class") or ""):
+                self.spans["content"].append(span)
+            elif tag == "body":
+                self.spans["body"].append(span)
+
+            stack.append((element, span))
+            self._add(element.text)
+            stack.extend((child, None) for child in reversed(element))
+
+    def _texts(self, kind: str) -> Iterator[str]:
+        for start, end in self.spans[kind]:
+            yield ' '.join(self.pieces[start:end])
+
+    def main_articles(self) -> Iterator[str]:
+        return self._texts("main")
+
+    def content_divs(self) -> Iterator[str]:
+        return self._texts("content")
+
+    def paragraphs(self) -> Iterator[str]:
+        return self._texts("p")
+
+    def body(self) -> Optional[str]:
+        return next(self._texts("body"), None)
+
+
+def _lxml_parse(html: str):
+    try:
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # Unicode strings with an XML encoding declaration are rejected; parse the bytes instead
+            return lxml.html.document_fromstring(
+                html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8")
+            )
+    except etree.ParserError:  # Empty document
+        return None
+
+
+def parse_page(html: str, parser: str = "lxml") -> PageTexts:
+    """Parse a page with the requested parser, falling back to html.parser when lxml is not installed."""
+    if parser == "lxml" and lxml is not None:
+        return LxmlPageTexts(html)
+    return SoupPageTexts(html)
+
+
+def select_main_text(page: PageTexts) -> Optional[str]:
+    """Pick the main readable text of a page. Returns None if nothing usable is found."""
+    main_content = None
+
+    # Strategy 1: Look for main/article tags
+    for text in page.main_articles():
+        logger.info(f"    Main/article text length (raw): {len(text)}")
+        if text and len(text) > 150:  # Lower threshold
+            cleaned = clean_text(text)
+            logger.info(f"    After cleaning: {len(cleaned)} chars")
+            if cleaned and len(cleaned) > 150:
+                main_content = cleaned
+                logger.info(f"     Strategy 1 SUCCESS: Found {len(main_content)} chars in main/article")
+                break
+
+    # Strategy 2: Try divs with content-related classes
+    if not main_content:
+        for text in page.content_divs():
+            if text and len(text) > 150:
+                cleaned = clean_text(text)
+                if cleaned and len(cleaned) > 150:
+                    main_content = cleaned
+                    logger.info(f"     Strategy 2 SUCCESS: Found {len(main_content)} chars in content div")
+                    break
+
+    # Strategy 3: Try paragraphs - collect substantial paragraphs
+    if not main_content:
+        paragraphs = []
+        for text in page.paragraphs():
+            cleaned = clean_text(text)
+            if cleaned and len(cleaned) > 50:  # Individual paragraph threshold
+                paragraphs.append(cleaned)
+        logger.info(f"    Valid paragraphs after cleaning: {len(paragraphs)}")
+        if paragraphs:
+            # Combine paragraphs
+            combined = ' '.join(paragraphs[:10])  # Limit to first 10 paragraphs
+            logger.info(f"    Combined paragraphs length: {len(combined)}")
+            if len(combined) > 200:
+                main_content = combined
+                logger.info(f"     Strategy 3 SUCCESS: Found {len(main_content)} chars from paragraphs")
+
+    # Strategy 4: Fallback to body text (navigation and other noise already removed)
+    if not main_content:
+        text = page.body()
+        if text is not None:
+            logger.info(f"    Strategy 4: Body text length (raw): {len(text)}")
+            if len(text) > 200:
+                cleaned = clean_text(text)
+                logger.info(f"    Body text length (cleaned): {len(cleaned)}")
+                if cleaned and len(cleaned) > 150:  # More lenient for body text
+                    main_content = cleaned
+                    logger.info(f"     Strategy 4 SUCCESS: Found {len(main_content)} chars in body")
+        else:
+            logger.info(f"    No body tag found")
+
+    if main_content:
+        return main_content
+
+    # Last resort: Try minimal cleaning - just get paragraphs with minimal filtering
+    logger.info(f"    All strategies failed, trying minimal cleaning fallback...")
+    paragraphs = []
+    checked = 0
+    for raw_text in page.paragraphs():
+        checked += 1
+        # Minimal cleaning - just remove excessive whitespace
+        raw_text = ' '.join(raw_text.split())
+        if raw_text and len(raw_text) > 50 and not raw_text.isupper():  # Skip ALL CAPS noise
+            paragraphs.append(raw_text)
+
+    logger.info(f"    Minimal cleaning found {len(paragraphs)} valid paragraphs")
+    if paragraphs:
+        combined = ' '.join(paragraphs[:5])  # Take first 5 paragraphs
+        if len(combined) > 100:
+            # Apply minimal cleaning
+            combined = ' '.join(re.sub(r'http[s]?://\S+', '', combined).split())
+            if len(combined) > 100:
+                logger.info(f"     Fallback SUCCESS: Extracted {len(combined)} chars (minimal cleaning)")
+                return combined
+    else:
+        logger.warning(f"    ❌ FAILED: Could not extract any content. Checked {checked} paragraphs but none met criteria.")
+    return None
+
+
+def extract_main_text(html: str, parser: str = "lxml") -> Optional[str]:
+    """Parse an HTML page and extract its main readable text."""
+    return select_main_text(parse_page(html, parser))
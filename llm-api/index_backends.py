@@ -0,0 +1,344 @@
+"""
+FAISS index backends for the base knowledge index.
+
+The backend is selected with AUTORAG_INDEX_TYPE:
+
+- flat:  exact inner-product search (IndexFlatIP), O(N) per query
+- ivf:   IVF-Flat with k-means centroids trained on a sample
+- hnsw:  HNSW graph (IndexHNSWFlat), no training needed
+- ivfpq: IVF with product-quantized codes, smallest memory footprint
+
+All backends use inner product on L2-normalized vectors (cosine similarity).
+Search-time knobs (nprobe for IVF, efSearch for HNSW) can be overridden per
+query with search_params().
+
+A cached index can be opened memory-mapped and read-only (read_index with
+mmap=True) so that several worker processes share one page-cache copy.
+Vectors added at runtime then go to a small in-memory delta index that is
+searched alongside the mapped one (LayeredIndex).
+
+compact_index() copies an index without deleted rows (renumbering the rest)
+and without retraining, for compacting tombstoned documents away.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+
+def index_config_from_env() -> Dict:
+    """Read the index backend configuration from environment variables."""
+    index_type = os.getenv("AUTORAG_INDEX_TYPE", "flat").strip().lower()
+    if index_type not in INDEX_TYPES:
+        logger.warning(f"Unknown AUTORAG_INDEX_TYPE '{index_type}', falling back to flat")
+        index_type = "flat"
+
+    return {
+        "index_type": index_type,
+        "nlist": int(os.getenv("AUTORAG_IVF_NLIST", "1024")),
+        "nprobe": int(os.getenv("AUTORAG_IVF_NPROBE", "16")),
+        "pq_m": int(os.getenv("AUTORAG_PQ_M", "48")),
+        "pq_nbits": int(os.getenv("AUTORAG_PQ_NBITS", "8")),
+        "hnsw_m": int(os.getenv("AUTORAG_HNSW_M", "32")),
+        "ef_construction": int(os.getenv("AUTORAG_HNSW_EF_CONSTRUCTION", "200")),
+        "ef_search": int(os.getenv("AUTORAG_HNSW_EF_SEARCH", "64")),
+        "train_sample": int(os.getenv("AUTORAG_INDEX_TRAIN_SAMPLE", "100000")),
+    }
+
+
+def build_params(config: Dict) -> Dict:
+    """The subset of the configuration that determines the on-disk index layout."""
+    keys = {
+        "flat": (),
+        "ivf": ("nlist",),
+        "hnsw": ("hnsw_m", "ef_construction"),
+        "ivfpq": ("nlist", "pq_m", "pq_nbits"),
+    }[config["index_type"]]
+    return {"index_type": config["index_type"], **{k: config[k] for k in keys}}
+
+
+def _pq_subquantizers(dim: int, requested: int) -> int:
+    """Largest divisor of dim that does not exceed the requested number of sub-quantizers."""
+    for m in range(min(requested, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def create_index(dim: int, num_vectors: int, config: Dict) -> faiss.Index:
+    """
+    Create an empty (untrained) index for roughly num_vectors vectors.
+    Falls back to a flat index when there are too few vectors to train the requested backend.
+    """
+    index_type = config["index_type"]
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = config["ef_construction"]
+        index.hnsw.efSearch = config["ef_search"]
+        return index
+
+    if index_type in ("ivf", "ivfpq"):
+        # k-means needs at least one point per centroid; faiss recommends ~39 per centroid
+        nlist = max(1, min(config["nlist"], num_vectors // 39))
+        min_vectors = nlist
+        if index_type == "ivfpq":
+            min_vectors = max(nlist, 2 ** config["pq_nbits"])
+
+        if num_vectors < min_vectors:
+            logger.warning(
+                f"Only {num_vectors} vectors available, too few to train {index_type}; using a flat index"
+            )
+            return faiss.IndexFlatIP(dim)
+        if nlist != config["nlist"]:
+            logger.info(f"Reducing nlist from {config['nlist']} to {nlist} for {num_vectors} vectors")
+
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            m = _pq_subquantizers(dim, config["pq_m"])
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, config["pq_nbits"], faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = min(config["nprobe"], nlist)
+        return index
+
+    return faiss.IndexFlatIP(dim)
+
+
+def train_index(index: faiss.Index, embeddings: np.ndarray, sample_size: int, seed: int = 0) -> None:
+    """Train the index on a random sample of the embeddings (no-op for indexes that need no training)."""
+    if index.is_trained:
+        return
+
+    n = embeddings.shape[0]
+    if n > sample_size:
+        rng = np.random.default_rng(seed)
+        sample = embeddings[np.sort(rng.choice(n, size=sample_size, replace=False))]
+    else:
+        sample = embeddings
+    logger.info(f"Training {type(index).__name__} on {sample.shape[0]} vectors...")
+    index.train(np.ascontiguousarray(sample, dtype="float32"))
+
+
+def build_index(embeddings: np.ndarray, config: Dict) -> faiss.Index:
+    """Create, train and fill an index from L2-normalized float32 embeddings."""
+    index = create_index(embeddings.shape[1], embeddings.shape[0], config)
+    train_index(index, embeddings, config["train_sample"])
+    index.add(embeddings)
+    return index
+
+
+def _empty_like(index: faiss.Index) -> faiss.Index:
+    """An empty index with the structure and training of `index`."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        empty = faiss.IndexIVFPQ(faiss.clone_index(index.quantizer), index.d, index.nlist,
+                                 index.pq.M, index.pq.nbits, index.metric_type)
+        empty.pq = index.pq
+        empty.by_residual = index.by_residual
+        empty.is_trained = True
+        empty.precompute_table()
+    elif isinstance(index, faiss.IndexIVFFlat):
+        empty = faiss.IndexIVFFlat(faiss.clone_index(index.quantizer), index.d, index.nlist, index.metric_type)
+    elif isinstance(index, faiss.IndexHNSWFlat):
+        empty = faiss.IndexHNSWFlat(index.d, index.hnsw.nb_neighbors(1), index.metric_type)
+        empty.hnsw.efConstruction = index.hnsw.efConstruction
+        empty.hnsw.efSearch = index.hnsw.efSearch
+        return empty
+    elif isinstance(index, faiss.IndexFlat):
+        return faiss.IndexFlat(index.d, index.metric_type)
+    else:
+        empty = faiss.clone_index(index)
+        empty.reset()
+        return empty
+    empty.nprobe = index.nprobe
+    return empty
+
+
+def compact_index(index: faiss.Index, keep: np.ndarray, extra: Optional[np.ndarray] = None,
+                  batch_size: int = 65536) -> faiss.Index:
+    """
+    Copy of `index` holding only the rows where `keep` is True, renumbered in order,
+    followed by the `extra` vectors. IVF codes are copied list by list, so nothing is
+    re-encoded; flat and HNSW vectors are reconstructed and re-added (HNSW rebuilds
+    its graph). Trained parameters are reused as they are.
+    """
+    keep = np.asarray(keep, dtype=bool)
+    compacted = _empty_like(index)
+    ivf = faiss.try_extract_index_ivf(index)
+
+    if ivf is not None:
+        # Old id -> new id for kept rows
+        new_ids = np.cumsum(keep, dtype=np.int64) - 1
+        source_lists = ivf.invlists
+        target_lists = faiss.extract_index_ivf(compacted).invlists
+        code_size = source_lists.code_size
+        for list_no in range(ivf.nlist):
+            size = source_lists.list_size(list_no)
+            if size == 0:
+                continue
+            ids_ptr = source_lists.get_ids(list_no)
+            codes_ptr = source_lists.get_codes(list_no)
+            ids = faiss.rev_swig_ptr(ids_ptr, size).copy()
+            codes = faiss.rev_swig_ptr(codes_ptr, size * code_size).reshape(size, code_size).copy()
+            source_lists.release_ids(list_no, ids_ptr)
+            source_lists.release_codes(list_no, codes_ptr)
+
+            kept = keep[ids]
+            if kept.any():
+                list_ids = np.ascontiguousarray(new_ids[ids[kept]])
+                list_codes = np.ascontiguousarray(codes[kept])
+                target_lists.add_entries(list_no, len(list_ids), faiss.swig_ptr(list_ids), faiss.swig_ptr(list_codes))
+        compacted.ntotal = int(keep.sum())
+    else:
+        for start in range(0, index.ntotal, batch_size):
+            end = min(start + batch_size, index.ntotal)
+            rows = keep[start:end]
+            if rows.any():
+                compacted.add(np.ascontiguousarray(index.reconstruct_n(start, end - start)[rows]))
+
+    if extra is not None and len(extra):
+        compacted.add(np.ascontiguousarray(extra, dtype="float32"))
+    return compacted
+
+
+def read_index(path: Path, mmap: bool = False) -> faiss.Index:
+    """
+    Read a cached index. With mmap=True the vector data is mapped read-only instead
+    of copied to the heap: IVF inverted lists via IO_FLAG_MMAP, flat/HNSW storage via
+    IO_FLAG_MMAP_IFC (faiss >= 1.8). Falls back to a regular read if mapping fails.
+    """
+    if not mmap:
+        return faiss.read_index(str(path))
+
+    # Serialized IVF indexes start with an "Iw.." fourcc
+    with open(path, "rb") as f:
+        is_ivf = f.read(4).startswith(b"Iw")
+    flag = faiss.IO_FLAG_MMAP if is_ivf else getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+
+    if flag is None:
+        logger.warning("This faiss version cannot memory-map flat index storage; loading it into memory")
+        return faiss.read_index(str(path))
+    try:
+        return faiss.read_index(str(path), flag | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError as e:
+        logger.warning(f"Could not memory-map {path}, loading it into memory: {e}")
+        return faiss.read_index(str(path))
+
+
+class LayeredIndex:
+    """
+    A read-only (memory-mapped) base index plus an in-memory flat delta index for
+    vectors added at runtime. Delta ids continue after the base ids, so positions
+    line up with a chunk store whose runtime additions are appended after the
+    mapped chunks. Implements the subset of the faiss.Index API the app uses.
+    """
+
+    def __init__(self, base: faiss.Index, mapped_path: Optional[Path] = None):
+        self.base = base
+        self.delta = faiss.IndexFlatIP(base.d)
+        self.mapped_path = Path(mapped_path) if mapped_path is not None else None
+
+    @property
+    def d(self) -> int:
+        return self.base.d
+
+    @property
+    def ntotal(self) -> int:
+        return self.base.ntotal + self.delta.ntotal
+
+    @property
+    def is_trained(self) -> bool:
+        return True
+
+    def add(self, x: np.ndarray) -> None:
+        self.delta.add(x)
+
+    def search(self, x: np.ndarray, k: int, params=None):
+        scores, ids = self.base.search(x, k, params=params) if params is not None else self.base.search(x, k)
+        if self.delta.ntotal == 0:
+            return scores, ids
+
+        delta_scores, delta_ids = self.delta.search(x, min(k, self.delta.ntotal))
+        delta_ids = np.where(delta_ids >= 0, delta_ids + self.base.ntotal, -1)
+        all_scores = np.concatenate([scores, delta_scores], axis=1)
+        all_ids = np.concatenate([ids, delta_ids], axis=1)
+        # Padding (-1) results must sort last
+        all_scores = np.where(all_ids >= 0, all_scores, -np.inf)
+        order = np.argsort(-all_scores, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(all_scores, order, axis=1), np.take_along_axis(all_ids, order, axis=1)
+
+
+AnyIndex = Union[faiss.Index, LayeredIndex]
+
+
+def _base(index: AnyIndex) -> faiss.Index:
+    return index.base if isinstance(index, LayeredIndex) else index
+
+
+def reconstruct_rows(index: AnyIndex, ids: np.ndarray) -> np.ndarray:
+    """
+    Stored vectors at the given positions, shape (len(ids), d); approximate for PQ/SQ
+    codes, like the scores search() returns for them. IVF indexes get the id -> list
+    direct map they need on first use.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return np.zeros((0, index.d), dtype="float32")
+    if isinstance(index, LayeredIndex):
+        n_base = index.base.ntotal
+        in_base = ids < n_base
+        rows = np.empty((len(ids), index.d), dtype="float32")
+        rows[in_base] = reconstruct_rows(index.base, ids[in_base])
+        rows[~in_base] = reconstruct_rows(index.delta, ids[~in_base] - n_base)
+        return rows
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    return index.reconstruct_batch(ids)
+
+
+def search_params(index: AnyIndex, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """
+    Per-query search parameters for the index, or None to use the index defaults.
+    SearchParameters objects keep concurrent queries from racing on shared index attributes.
+    """
+    index = _base(index)
+    if nprobe is not None:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            return faiss.SearchParametersIVF(nprobe=max(1, min(nprobe, ivf.nlist)))
+    if ef_search is not None:
+        hnsw = faiss.downcast_index(index)
+        if isinstance(hnsw, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(efSearch=max(1, ef_search))
+    return None
+
+
+def describe_index(index: Optional[AnyIndex]) -> Dict:
+    """Summary of an index for health/diagnostic output."""
+    if index is None:
+        return {}
+    if isinstance(index, LayeredIndex):
+        info = describe_index(index.base)
+        info.update({"ntotal": int(index.ntotal), "mmap": True, "delta_ntotal": int(index.delta.ntotal)})
+        if index.mapped_path is not None and index.mapped_path.exists():
+            info["mapped_bytes"] = index.mapped_path.stat().st_size
+        return info
+
+    info = {"class": type(faiss.downcast_index(index)).__name__, "ntotal": int(index.ntotal), "dim": int(index.d)}
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        info.update({"nlist": int(ivf.nlist), "nprobe": int(ivf.nprobe)})
+    hnsw = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        info.update({"ef_search": int(hnsw.hnsw.efSearch)})
+    return info
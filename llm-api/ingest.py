@@ -0,0 +1,478 @@
+"""
+Bulk corpus ingestion for the Self-Healing RAG base index.
+
+Streams documents from local directories (.txt/.md/.rst), JSONL and Parquet
+files through clean_text -> sentence-aware chunking -> batched embedding ->
+FAISS index add and writes the result to the AUTORAG_CACHE_DIR cache that the API loads on
+startup. Memory use is bounded by the embedding batch (and, for IVF backends,
+the training sample): documents are read lazily, chunks are appended to the
+chunk store as they are indexed, and the index is checkpointed periodically.
+An interrupted run resumes from its last checkpoint when started again with
+the same inputs.
+
+The index, chunk store and document registry are built in <cache dir>/ingest/
+and only swapped into the cache once the final checkpoint is written, so a
+running API keeps serving the previous files until it restarts. The swap waits
+for any compaction. Healed segments and document changes journaled by the API
+are kept and replayed on top of the new index (--discard-journals drops them);
+the index metadata is written last.
+
+Every document gets a stable id (the --id-field of JSONL/Parquet records,
+otherwise its file and line/row/section), recorded with its chunk positions in
+base_documents.jsonl so the API can later replace or delete it without a
+rebuild.
+
+Cleaning and chunking can run in worker processes (--workers) while the main
+process embeds; chunks wait for their embedding batch as (document, start,
+end) spans and are only sliced out of their document when the batch is
+encoded.
+
+Usage:
+    python ingest.py docs/ corpus.jsonl wiki.parquet
+    python ingest.py corpus.jsonl --text-field body --batch-size 128 --checkpoint-every 20000
+    python ingest.py docs/ --restart    # ignore any previous checkpoint
+    python ingest.py corpus.jsonl --workers 4
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import shutil
+import time
+try:
+    import fcntl
+except ImportError:  # Windows: the swap is not coordinated with a running compaction
+    fcntl = None
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from chunk_store import ChunkStore, ChunkStoreWriter, publish_chunk_store
+from chunking import SentenceChunker
+from index_backends import build_params, create_index, index_config_from_env, train_index
+from self_healing_rag import (
+    _cache_dir,
+    _cache_paths,
+    _documents_path,
+    _get_document_journal,
+    _get_healed_journal,
+    _lexical_path,
+    _write_index_meta,
+    clean_text,
+    create_chunker,
+    create_embedder,
+)
+
+logger = logging.getLogger("ingest")
+
+TEXT_EXTENSIONS = {".txt", ".md", ".rst"}
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS | {".jsonl", ".parquet"}
+
+# Plain-text files are split into sections of at most this many characters
+MAX_SECTION_CHARS = 100_000
+PARQUET_BATCH_ROWS = 1024
+# Documents handed to each chunking worker per round
+CHUNK_WINDOW_DOCS = 64
+
+
+def _iter_files(paths: List[str]) -> Iterator[Path]:
+    """Input files in a deterministic order (needed to resume by document count)."""
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_dir():
+            for file_path in sorted(p for p in path.rglob("*") if p.is_file()):
+                if file_path.suffix.lower() in SUPPORTED_EXTENSIONS:
+                    yield file_path
+        elif path.is_file():
+            yield path
+        else:
+            raise FileNotFoundError(f"Input not found: {path}")
+
+
+def _iter_text_file(path: Path) -> Iterator[Tuple[str, str]]:
+    """Stream a text file as paragraph-aligned sections of bounded size (ids: path, path#1, ...)."""
+    section: List[str] = []
+    size = 0
+    sections = 0
+
+    def section_id() -> str:
+        return str(path) if sections == 0 else f"{path}#{sections}"
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            section.append(line)
+            size += len(line)
+            if size >= MAX_SECTION_CHARS and not line.strip():
+                yield section_id(), "".join(section)
+                section, size = [], 0
+                sections += 1
+            elif size >= 2 * MAX_SECTION_CHARS:
+                # No paragraph break in sight; cut anyway to bound memory
+                yield section_id(), "".join(section)
+                section, size = [], 0
+                sections += 1
+    if section:
+        yield section_id(), "".join(section)
+
+
+def _record_id(record: Dict, id_field: str, fallback: str) -> str:
+    value = record.get(id_field)
+    return str(value) if isinstance(value, (str, int)) and not isinstance(value, bool) else fallback
+
+
+def _iter_jsonl(path: Path, text_field: str, id_field: str) -> Iterator[Tuple[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"{path}:{line_number}: skipping invalid JSON ({e})")
+                continue
+            text = record.get(text_field) if isinstance(record, dict) else None
+            if isinstance(text, str):
+                yield _record_id(record, id_field, f"{path}:{line_number}"), text
+
+
+def _iter_parquet(path: Path, text_field: str, id_field: str) -> Iterator[Tuple[str, str]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet input requires pyarrow: pip install pyarrow") from e
+
+    parquet_file = pq.ParquetFile(str(path))
+    columns = [text_field] + ([id_field] if id_field in parquet_file.schema_arrow.names else [])
+    row = 0
+    for batch in parquet_file.iter_batches(columns=columns, batch_size=PARQUET_BATCH_ROWS):
+        for record in batch.to_pylist():
+            text = record.get(text_field)
+            if isinstance(text, str):
+                yield _record_id(record, id_field, f"{path}:{row}"), text
+            row += 1
+
+
+def iter_documents(paths: List[str], text_field: str = "text", id_field: str = "id") -> Iterator[Tuple[str, str]]:
+    """Lazily yield (document id, raw text) pairs from all inputs."""
+    for file_path in _iter_files(paths):
+        suffix = file_path.suffix.lower()
+        logger.info(f"Reading {file_path}")
+        if suffix == ".jsonl":
+            yield from _iter_jsonl(file_path, text_field, id_field)
+        elif suffix == ".parquet":
+            yield from _iter_parquet(file_path, text_field, id_field)
+        else:
+            yield from _iter_text_file(file_path)
+
+
+_worker_chunker: Optional[SentenceChunker] = None
+
+
+def _init_chunk_worker(chunker: SentenceChunker) -> None:
+    global _worker_chunker
+    _worker_chunker = chunker
+
+
+def _clean_and_chunk(document: Tuple[str, str], chunker: Optional[SentenceChunker] = None
+                     ) -> Tuple[str, str, List[Tuple[int, int]]]:
+    """Document id, cleaned text and the (start, end) spans of its chunks."""
+    doc_id, raw_text = document
+    cleaned = clean_text(raw_text)
+    if not cleaned:
+        return doc_id, "", []
+    return doc_id, cleaned, (chunker or _worker_chunker).spans(cleaned).tolist()
+
+
+def iter_chunked_documents(
+    documents: Iterator[Tuple[str, str]], chunker: SentenceChunker, workers: int = 1
+) -> Iterator[Tuple[str, str, List[Tuple[int, int]]]]:
+    """
+    Clean and chunk (id, text) documents, in order. With workers > 1 this runs in a
+    process pool, one window of documents ahead of the consumer.
+    """
+    if workers <= 1:
+        for document in documents:
+            yield _clean_and_chunk(document, chunker)
+        return
+
+    window = workers * CHUNK_WINDOW_DOCS
+    with ProcessPoolExecutor(workers, initializer=_init_chunk_worker, initargs=(chunker,)) as pool:
+        in_flight = None
+        while True:
+            batch = list(itertools.islice(documents, window))
+            submitted = pool.map(_clean_and_chunk, batch, chunksize=max(1, len(batch) // (workers * 4))) if batch else None
+            if in_flight is not None:
+                yield from in_flight
+            if submitted is None:
+                break
+            in_flight = submitted
+
+
+def _staging_dir() -> Path:
+    return _cache_dir() / "ingest"
+
+
+def _state_path() -> Path:
+    return _staging_dir() / "ingest_state.json"
+
+
+def _load_state() -> Optional[Dict]:
+    path = _state_path()
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(state: Dict) -> None:
+    path = _state_path()
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def publish_staged_index(index: faiss.Index, config: Dict, discard_journals: bool = False) -> Dict:
+    """
+    Swap the staged index, chunk store and document registry into the cache, writing the
+    index metadata last. The healed and document journals are kept, to be replayed on top of
+    the new index, unless discard_journals is set. Returns how many segments were dropped.
+    """
+    staging_dir = _staging_dir()
+    index_path, chunks_path = _cache_paths()
+    documents_path = _documents_path()
+    with open(_cache_dir() / "compaction.lock", "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # Wait for a running compaction
+        os.replace(staging_dir / index_path.name, index_path)
+        publish_chunk_store(staging_dir / chunks_path.name, chunks_path)
+        os.replace(staging_dir / documents_path.name, documents_path)
+        dropped = {"healed_segments": 0, "journal_segments": 0}
+        if discard_journals:
+            dropped = {
+                "healed_segments": len(_get_healed_journal().clear()),
+                "journal_segments": len(_get_document_journal().clear()),
+            }
+        # Positions changed: the API rebuilds the lexical index on startup
+        _lexical_path().unlink(missing_ok=True)
+        _write_index_meta(index, config)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return dropped
+
+
+def ingest_paths(
+    paths: List[str],
+    batch_size: int = 64,
+    checkpoint_every: int = 10000,
+    text_field: str = "text",
+    id_field: str = "id",
+    restart: bool = False,
+    embedder=None,
+    discard_journals: bool = False,
+    workers: int = 1,
+) -> Dict:
+    """
+    Build the base index from the given inputs, resuming an interrupted run when possible.
+    Returns summary statistics for the run.
+    """
+    if embedder is None:
+        embedder = create_embedder()
+
+    # Built in the staging directory and swapped in by publish_staged_index
+    staging_dir = _staging_dir()
+    index_path, chunks_path, documents_path = (staging_dir / path.name
+                                               for path in (*_cache_paths(), _documents_path()))
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    config = index_config_from_env()
+    chunker = create_chunker(embedder)
+    inputs = [str(Path(p).resolve()) for p in paths]
+
+    state = _load_state()
+    resuming = (
+        not restart
+        and state is not None
+        and state.get("status") == "running"
+        and state.get("inputs") == inputs
+        and state.get("build_params") == build_params(config)
+        and state.get("chunking") == chunker.params()
+        and index_path.exists()
+        and ChunkStore.exists(chunks_path)
+        and "chunk_store" in state
+        and "documents_bytes" in state
+        and documents_path.exists()
+    )
+
+    if not resuming and not restart and state is not None and state.get("status") == "running":
+        logger.warning("Found an unfinished ingestion with different inputs or index settings; starting over")
+
+    index: Optional[faiss.Index] = None
+    docs_done = 0
+    if resuming:
+        index = faiss.read_index(str(index_path))
+        docs_done = state["docs_done"]
+        # Drop chunks and document entries written after the last checkpoint
+        writer = ChunkStoreWriter(chunks_path, resume_from=tuple(state["chunk_store"]))
+        documents_file = open(documents_path, "r+b")
+        documents_file.truncate(state["documents_bytes"])
+        documents_file.seek(state["documents_bytes"])
+        logger.info(f"Resuming ingestion after {docs_done} documents ({index.ntotal} chunks indexed)")
+    else:
+        writer = ChunkStoreWriter(chunks_path)
+        documents_file = open(documents_path, "wb")
+        state = {
+            "inputs": inputs,
+            "build_params": build_params(config),
+            "chunking": chunker.params(),
+            "started_at": time.time(),
+        }
+
+    needs_training = index is None and config["index_type"] in ("ivf", "ivfpq")
+    # Chunks waiting for their embedding batch, as spans into their (cleaned) document
+    pending: List[Tuple[str, int, int]] = []
+    train_chunks: List[str] = []
+    train_embeddings: List[np.ndarray] = []
+    chunks_since_checkpoint = 0
+    # Index position of the next chunk, for the document registry
+    next_position = int(index.ntotal) if index is not None else 0
+    started = time.time()
+    new_chunks = 0
+
+    def add_to_index(chunks: List[str], embeddings: np.ndarray) -> None:
+        index.add(embeddings)
+        writer.append_many(chunks)
+
+    def finish_training() -> None:
+        nonlocal index, needs_training, train_chunks, train_embeddings
+        all_embeddings = np.concatenate(train_embeddings)
+        index = create_index(all_embeddings.shape[1], all_embeddings.shape[0], config)
+        train_index(index, all_embeddings, config["train_sample"])
+        add_to_index(train_chunks, all_embeddings)
+        needs_training = False
+        train_chunks, train_embeddings = [], []
+
+    def flush() -> None:
+        nonlocal index, new_chunks
+        if not pending:
+            return
+        chunks = [text[start:end] for text, start, end in pending]
+        pending.clear()
+        embeddings = embedder.encode(chunks, batch_size=batch_size, show_progress_bar=False)
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        faiss.normalize_L2(embeddings)
+        new_chunks += len(chunks)
+
+        if needs_training:
+            # IVF centroids are trained on the first train_sample chunks before anything is added
+            train_chunks.extend(chunks)
+            train_embeddings.append(embeddings)
+            if len(train_chunks) >= config["train_sample"]:
+                finish_training()
+        else:
+            if index is None:
+                index = create_index(embeddings.shape[1], 0, config)
+            add_to_index(chunks, embeddings)
+
+    def checkpoint(doc_count: int, status: str = "running") -> None:
+        writer.flush()
+        documents_file.flush()
+        os.fsync(documents_file.fileno())
+        tmp_path = index_path.with_suffix(".faiss.tmp")
+        faiss.write_index(index, str(tmp_path))
+        os.replace(tmp_path, index_path)
+        state.update({
+            "status": status,
+            "docs_done": doc_count,
+            "chunks_indexed": int(index.ntotal),
+            "chunk_store": list(writer.position()),
+            "documents_bytes": documents_file.tell(),
+            "updated_at": time.time(),
+        })
+        _save_state(state)
+        elapsed = max(time.time() - started, 1e-6)
+        logger.info(f"Checkpoint: {doc_count} documents, {index.ntotal} chunks ({new_chunks / elapsed:.1f} chunks/s)")
+
+    doc_count = docs_done
+    try:
+        # Documents before the checkpoint are skipped without being cleaned or chunked
+        documents = itertools.islice(iter_documents(paths, text_field, id_field), docs_done, None)
+        for doc_count, (doc_id, cleaned, spans) in enumerate(iter_chunked_documents(documents, chunker, workers), docs_done + 1):
+            if spans:
+                entry = {"id": doc_id, "start": next_position, "end": next_position + len(spans)}
+                documents_file.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+                next_position += len(spans)
+            for start, end in spans:
+                pending.append((cleaned, start, end))
+                chunks_since_checkpoint += 1
+                if len(pending) >= batch_size:
+                    flush()
+
+            if chunks_since_checkpoint >= checkpoint_every and not needs_training:
+                flush()
+                checkpoint(doc_count)
+                chunks_since_checkpoint = 0
+
+        flush()
+        if needs_training and train_chunks:
+            finish_training()
+        if index is None:
+            raise RuntimeError("No indexable text found in the given inputs")
+
+        checkpoint(doc_count, status="complete")
+    finally:
+        writer.close()
+        documents_file.close()
+
+    dropped = publish_staged_index(index, config, discard_journals)
+    if discard_journals:
+        logger.info(f"Discarded {dropped['healed_segments']} healed and {dropped['journal_segments']} "
+                    f"document journal segments recorded against the previous index")
+
+    elapsed = time.time() - started
+    summary = {
+        "documents": doc_count,
+        "chunks_indexed": int(index.ntotal),
+        "new_chunks": new_chunks,
+        "seconds": round(elapsed, 2),
+        "index_path": str(_cache_paths()[0]),
+    }
+    logger.info(f"Ingestion complete: {summary}")
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest documents into the AutoRAG base index")
+    parser.add_argument("paths", nargs="+", help="Directories, .jsonl or .parquet files to ingest")
+    parser.add_argument("--text-field", default="text", help="Text field for JSONL/Parquet records (default: text)")
+    parser.add_argument("--id-field", default="id", help="Document id field for JSONL/Parquet records (default: id)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding batch (default: 64)")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="Chunks between index checkpoints (default: 10000)")
+    parser.add_argument("--cache-dir", help="Cache directory to write (default: AUTORAG_CACHE_DIR or llm-api/.cache)")
+    parser.add_argument("--restart", action="store_true", help="Start over instead of resuming a previous run")
+    parser.add_argument("--discard-journals", action="store_true",
+                        help="Drop the healed segments and document changes journaled by the API instead of "
+                             "replaying them on the new index")
+    parser.add_argument("--workers", type=int, default=1, help="Processes for cleaning and chunking documents (default: 1)")
+    args = parser.parse_args()
+
+    if args.cache_dir:
+        os.environ["AUTORAG_CACHE_DIR"] = args.cache_dir
+
+    ingest_paths(
+        args.paths,
+        batch_size=args.batch_size,
+        checkpoint_every=args.checkpoint_every,
+        text_field=args.text_field,
+        id_field=args.id_field,
+        restart=args.restart,
+        discard_journals=args.discard_journals,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Precomputed keyword index for the lightweight API variants.
+
+Maps each distinct document term to the documents containing it, so a query
+only touches the postings of its own terms instead of re-tokenizing the whole
+knowledge base. Uses only the standard library (the 256MB/512MB tiers do not
+install numpy): postings are one flat array('I') with per-term offsets, and
+document frequencies and per-document term counts are arrays as well.
+"""
+
+import heapq
+import re
+from array import array
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+
+# score(matched query terms, query terms, document terms) -> relevance
+ScoreFunction = Callable[[int, int, int], float]
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def word_tokens(text: str) -> Set[str]:
+    """Lowercased runs of word characters, punctuation dropped."""
+    return set(_WORD_RE.findall(text.lower()))
+
+
+class KeywordIndex:
+    """Term -> document postings over a fixed list of documents, built once."""
+
+    def __init__(self, documents: Sequence[str], tokenize: Callable[[str], Iterable[str]] = word_tokens):
+        self.documents = list(documents)
+        self.tokenize = tokenize
+        postings: Dict[str, List[int]] = {}
+        self.doc_terms = array("I")
+        for doc_id, doc in enumerate(self.documents):
+            terms = set(tokenize(doc))
+            self.doc_terms.append(len(terms))
+            for term in terms:
+                postings.setdefault(term, []).append(doc_id)
+
+        self._term_ids: Dict[str, int] = {}
+        self.offsets = array("Q", [0])
+        self.postings = array("I")
+        self.df = array("I")
+        for term_id, (term, doc_ids) in enumerate(postings.items()):
+            self._term_ids[term] = term_id
+            self.postings.extend(doc_ids)
+            self.offsets.append(len(self.postings))
+            self.df.append(len(doc_ids))
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def document_frequency(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        return self.df[term_id] if term_id is not None else 0
+
+    def matches(self, query_terms: Iterable[str]) -> Dict[int, int]:
+        """Number of distinct query terms each matching document contains."""
+        counts: Dict[int, int] = {}
+        for term in set(query_terms):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                continue
+            for doc_id in self.postings[self.offsets[term_id]:self.offsets[term_id + 1]]:
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+        return counts
+
+    def search(self, query: str, k: int, score: ScoreFunction) -> List[Tuple[str, float]]:
+        """
+        Top k (document, score) pairs with a positive score, best first; equal
+        scores keep knowledge base order.
+        """
+        query_terms = set(self.tokenize(query))
+        scored = (
+            (score(matched, len(query_terms), self.doc_terms[doc_id]), -doc_id)
+            for doc_id, matched in self.matches(query_terms).items()
+        )
+        top = heapq.nlargest(k, (item for item in scored if item[0] > 0))
+        return [(self.documents[-neg_id], s) for s, neg_id in top]
+
+    def stats(self) -> Dict[str, int]:
+        return {"documents": len(self.documents), "terms": len(self.df), "postings": len(self.postings)}
+
+
+def jaccard(matched: int, query_terms: int, doc_terms: int) -> float:
+    """Jaccard similarity of the query and document term sets."""
+    union = query_terms + doc_terms - matched
+    return matched / union if union > 0 else 0
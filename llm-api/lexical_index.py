@@ -0,0 +1,345 @@
+"""
+BM25 inverted index over chunk texts, for lexical and hybrid retrieval.
+
+Dense embeddings are weak on exact-term queries (product names, error codes,
+identifiers); BM25 matches them directly. The index is built once over the
+base chunks and kept in flat numpy arrays (CSR layout):
+
+- postings of term t: doc_ids[offsets[t]:offsets[t + 1]] (int32) with term
+  frequencies tfs[...] (uint16), sorted by term, then chunk position
+- df: document frequency per term, doc_len: tokens per chunk
+
+Chunks added later (healing, document updates) go to a small in-memory delta
+that is searched alongside the arrays. add() never rebuilds the arrays; the
+maintenance loop calls merge_delta() once needs_merge() reports the delta has
+grown past a fraction of the base, and the merge sorts outside the caller's
+lock so searches are only held up while the result is swapped in. Document frequencies and the average chunk length
+include the delta, so idf values are computed per query term from df when a
+query is scored, which keeps BM25 exact as chunks are added.
+
+Querying touches only the postings of the query terms: per-posting scores are
+computed with numpy, summed per chunk and the top k are selected with
+argpartition. reciprocal_rank_fusion() merges a lexical and a dense ranking.
+"""
+
+import logging
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal-rank fusion constant (Cormack et al.): larger values flatten the rank weights
+RRF_K = 60
+MAX_TOKEN_CHARS = 40
+MAX_TF = np.iinfo(np.uint16).max
+# The delta is merged into the arrays once it holds this many chunks, or a tenth of the base if larger
+MERGE_MIN_DELTA = 10000
+FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords and overlong tokens (URLs, hashes)."""
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS and len(token) <= MAX_TOKEN_CHARS
+    ]
+
+
+class BM25Index:
+    """Okapi BM25 over chunk positions 0..n_docs-1, with array-backed postings."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        self.df = np.zeros(0, dtype=np.int32)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.total_len = 0.0
+        # Cache generation of the chunks this index was built from (see self_healing_rag._write_index_meta)
+        self.generation = 0
+        # Chunks added after the arrays were built: term -> [(position, tf)], plus their lengths
+        self._delta: Dict[str, List[Tuple[int, int]]] = {}
+        self._delta_len: List[float] = []
+        self._merging = threading.Lock()
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_len) + len(self._delta_len)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        """
+        Index texts as positions 0, 1, ... in one streaming pass. Postings are collected
+        in typed arrays (10 bytes each) and sorted into the CSR layout once at the end.
+        """
+        index = cls(k1, b)
+        terms, docs, tfs, lengths = array("i"), array("i"), array("H"), array("f")
+        for position, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                terms.append(index.vocab.setdefault(term, len(index.vocab)))
+                docs.append(position)
+                tfs.append(min(tf, MAX_TF))
+            lengths.append(sum(counts.values()))
+        index.total_len = float(sum(lengths))
+        index._set_arrays(index.vocab, *index._merged_postings(terms, docs, tfs, lengths))
+        return index
+
+    def add(self, texts: Iterable[str]) -> int:
+        """Append texts at the next positions (into the delta). Returns how many were added."""
+        added = 0
+        for text in texts:
+            position = self.n_docs
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                self._delta.setdefault(term, []).append((position, tf))
+            length = sum(counts.values())
+            self._delta_len.append(length)
+            self.total_len += length
+            added += 1
+        return added
+
+    def needs_merge(self) -> bool:
+        return len(self._delta_len) > max(MERGE_MIN_DELTA, len(self.doc_len) // 10)
+
+    def merge_delta(self, lock=None) -> int:
+        """
+        Fold the delta into the posting arrays. `lock` (the one guarding searches and add())
+        is held only to snapshot the delta and to swap in the new arrays; chunks added while
+        the arrays are rebuilt stay in the delta. Returns the number of chunks merged.
+        """
+        lock = lock if lock is not None else nullcontext()
+        with self._merging:
+            with lock:
+                count = len(self._delta_len)
+                if not count:
+                    return 0
+                delta = [(term, list(postings)) for term, postings in self._delta.items()]
+                lengths = self._delta_len[:count]
+                vocab = dict(self.vocab)
+
+            delta_terms = array("i")
+            delta_docs = array("i")
+            delta_tfs = array("H")
+            for term, postings in delta:
+                term_id = vocab.setdefault(term, len(vocab))
+                for position, tf in postings:
+                    delta_terms.append(term_id)
+                    delta_docs.append(position)
+                    delta_tfs.append(min(tf, MAX_TF))
+            merged = self._merged_postings(delta_terms, delta_docs, delta_tfs, lengths, n_terms=len(vocab))
+
+            with lock:
+                cutoff = len(self.doc_len) + count
+                self._set_arrays(vocab, *merged)
+                remaining = {}
+                for term, postings in self._delta.items():
+                    later = [p for p in postings if p[0] >= cutoff]
+                    if later:
+                        remaining[term] = later
+                self._delta = remaining
+                self._delta_len = self._delta_len[count:]
+        return count
+
+    def _merged_postings(self, terms: array, docs: array, tfs: array, lengths: Sequence[float],
+                         n_terms: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """
+        The arrays with the postings (term id, position, tf) of the chunks after them merged in:
+        (offsets, doc_ids, tfs, df, doc_len). Reads the current arrays but does not modify them.
+        """
+        base_terms = np.repeat(np.arange(len(self.df), dtype=np.int32), np.diff(self.offsets))
+        terms = np.concatenate([base_terms, np.frombuffer(terms, dtype=np.int32)])
+        docs = np.concatenate([self.doc_ids, np.frombuffer(docs, dtype=np.int32)])
+        tfs = np.concatenate([self.tfs, np.frombuffer(tfs, dtype=np.uint16)])
+        order = np.lexsort((docs, terms))
+        df = np.bincount(terms, minlength=n_terms if n_terms is not None else len(self.vocab)).astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(df, dtype=np.int64)])
+        doc_len = np.concatenate([self.doc_len, np.asarray(lengths, dtype=np.float32)])
+        return offsets, docs[order], tfs[order], df, doc_len
+
+    def _set_arrays(self, vocab: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                    df: np.ndarray, doc_len: np.ndarray) -> None:
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.df = df
+        self.doc_len = doc_len
+
+    def _term_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(positions, tfs, chunk lengths) of one term, arrays and delta together."""
+        parts_docs, parts_tfs = [], []
+        term_id = self.vocab.get(term)
+        if term_id is not None:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            parts_docs.append(self.doc_ids[start:end])
+            parts_tfs.append(self.tfs[start:end])
+        delta = self._delta.get(term)
+        if delta:
+            delta_docs, delta_tfs = zip(*delta)
+            parts_docs.append(np.array(delta_docs, dtype=np.int32))
+            parts_tfs.append(np.array(delta_tfs, dtype=np.uint16))
+        if not parts_docs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16), np.zeros(0, dtype=np.float32)
+        if not delta:
+            return parts_docs[0], parts_tfs[0], self.doc_len[parts_docs[0]]
+        n_base = len(self.doc_len)
+        delta_lengths = np.array([self._delta_len[position - n_base] for position in delta_docs], dtype=np.float32)
+        if len(parts_docs) == 1:
+            return parts_docs[0], parts_tfs[0], delta_lengths
+        return (np.concatenate(parts_docs), np.concatenate(parts_tfs),
+                np.concatenate([self.doc_len[parts_docs[0]], delta_lengths]))
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        BM25 scores of every chunk containing a query term: (positions, scores, coverage),
+        where coverage is the idf-weighted share of the query terms the chunk contains (0..1).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        n_docs = self.n_docs
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32))
+        if not terms or n_docs == 0:
+            return empty
+        avgdl = self.total_len / n_docs or 1.0
+
+        all_docs, all_scores, all_idf = [], [], []
+        query_idf = 0.0
+        for term in terms:
+            docs, tfs, lengths = self._term_postings(term)
+            df = len(docs)
+            idf = float(np.log1p((n_docs - df + 0.5) / (df + 0.5)))
+            query_idf += idf
+            if df == 0:
+                continue
+            tfs = tfs.astype(np.float32)
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / avgdl)
+            all_docs.append(docs)
+            all_scores.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+            all_idf.append(np.full(df, idf, dtype=np.float32))
+        if not all_docs:
+            return empty
+
+        positions, inverse = np.unique(np.concatenate(all_docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores)).astype(np.float32)
+        coverage = np.bincount(inverse, weights=np.concatenate(all_idf)) / max(query_idf, 1e-9)
+        return positions.astype(np.int64), scores, coverage.astype(np.float32)
+
+    def search(self, queries: Sequence[str], k: int, exclude=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Top-k chunks per query by BM25: (scores, positions, coverage) arrays of shape
+        (n_queries, k), padded with -inf / -1 / 0. `exclude(positions)` returns a mask of
+        positions to skip (e.g. deleted chunks).
+        """
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        out_coverage = np.zeros((len(queries), k), dtype=np.float32)
+        for row, query in enumerate(queries):
+            positions, scores, coverage = self.score(query)
+            if exclude is not None and len(positions):
+                keep = ~exclude(positions)
+                positions, scores, coverage = positions[keep], scores[keep], coverage[keep]
+            if not len(positions):
+                continue
+            top = min(k, len(positions))
+            best = np.argpartition(-scores, top - 1)[:top] if top < len(positions) else np.arange(len(positions))
+            best = best[np.argsort(-scores[best], kind="stable")]
+            out_scores[row, :top] = scores[best]
+            out_ids[row, :top] = positions[best]
+            out_coverage[row, :top] = coverage[best]
+        return out_scores, out_ids, out_coverage
+
+    def save(self, path: Path) -> None:
+        """Write the index (delta merged) to an .npz file, atomically. Not safe during concurrent searches."""
+        self.merge_delta()
+        path = Path(path)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                format_version=np.array(FORMAT_VERSION),
+                params=np.array([self.k1, self.b, self.total_len, self.generation], dtype=np.float64),
+                terms=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+                offsets=self.offsets,
+                doc_ids=self.doc_ids,
+                tfs=self.tfs,
+                doc_len=self.doc_len,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BM25Index"]:
+        """Read an index written by save(); None if the file is missing or unreadable."""
+        try:
+            with np.load(Path(path)) as data:
+                if int(data["format_version"]) != FORMAT_VERSION:
+                    return None
+                k1, b, total_len, generation = data["params"].tolist()
+                index = cls(k1, b)
+                index.generation = int(generation)
+                blob = data["terms"].tobytes().decode("utf-8")
+                index.vocab = {term: i for i, term in enumerate(blob.split("\n"))} if blob else {}
+                index.offsets = data["offsets"]
+                index.doc_ids = data["doc_ids"]
+                index.tfs = data["tfs"]
+                index.doc_len = data["doc_len"]
+        except (OSError, KeyError, ValueError) as e:
+            if Path(path).exists():
+                logger.warning(f"Could not read lexical index {path}: {e}")
+            return None
+        index.df = np.diff(index.offsets).astype(np.int32)
+        index.total_len = total_len
+        return index
+
+    def stats(self) -> Dict:
+        return {
+            "chunks": self.n_docs,
+            "terms": len(self.vocab) + sum(1 for t in self._delta if t not in self.vocab),
+            "postings": int(len(self.doc_ids) + sum(len(p) for p in self._delta.values())),
+            "delta_chunks": len(self._delta_len),
+        }
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], k: int, rrf_k: int = RRF_K) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse ranked id lists (one 1-D array per retriever, best first, -1 = padding) by
+    reciprocal rank: score(id) = sum over lists of 1 / (rrf_k + rank). Returns the top-k
+    (ids, fused scores), best first.
+    """
+    ids = np.concatenate([np.asarray(r, dtype=np.int64) for r in rankings])
+    weights = np.concatenate([1.0 / (rrf_k + 1 + np.arange(len(r))) for r in rankings])
+    keep = ids >= 0
+    ids, weights = ids[keep], weights[keep]
+    if not len(ids):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    unique, inverse = np.unique(ids, return_inverse=True)
+    fused = np.bincount(inverse, weights=weights)
+    order = np.argsort(-fused, kind="stable")[:k]
+    return unique[order], fused[order]
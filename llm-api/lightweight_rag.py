@@ -5,7 +5,7 @@ Optimized for Render free tier
 
 import json
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Set
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -13,6 +13,8 @@ import requests
 from bs4 import BeautifulSoup
 from datetime import datetime
 
+from keyword_index import KeywordIndex, jaccard
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -58,24 +60,15 @@ KNOWLEDGE_BASE = [
     "Natural language understanding helps computers comprehend and respond to human language naturally."
 ]
 
-def simple_similarity_search(query: str, knowledge_base: List[str], max_results: int = 3) -> List[str]:
-    """Simple keyword-based similarity search"""
-    query_words = set(query.lower().split())
-    scored_docs = []
-    
-    for doc in knowledge_base:
-        doc_words = set(doc.lower().split())
-        # Simple Jaccard similarity
-        intersection = len(query_words.intersection(doc_words))
-        union = len(query_words.union(doc_words))
-        score = intersection / union if union > 0 else 0
-        
-        if score > 0:
-            scored_docs.append((doc, score))
-    
-    # Sort by score and return top results
-    scored_docs.sort(key=lambda x: x[1], reverse=True)
-    return [doc for doc, score in scored_docs[:max_results]]
+def _kb_words(text: str) -> Set[str]:
+    return set(text.lower().split())
+
+# Built once at startup; a query only reads the postings of its own words
+KB_INDEX = KeywordIndex(KNOWLEDGE_BASE, tokenize=_kb_words)
+
+def simple_similarity_search(query: str, index: KeywordIndex, max_results: int = 3) -> List[str]:
+    """Simple keyword-based similarity search (Jaccard similarity of the word sets)"""
+    return [doc for doc, score in index.search(query, max_results, jaccard)]
 
 def search_wikipedia_simple(query: str, max_results: int = 2) -> List[str]:
     """Simple Wikipedia search using API"""
@@ -122,7 +115,7 @@ def web_search_simple(query: str, max_results: int = 1) -> List[str]:
 async def startup_event():
     """Initialize the lightweight RAG system"""
     logger.info("🚀 Initializing Lightweight RAG System...")
-    logger.info(f"📚 Knowledge base loaded with {len(KNOWLEDGE_BASE)} documents")
+    logger.info(f"📚 Knowledge base loaded with {len(KNOWLEDGE_BASE)} documents ({KB_INDEX.stats()['terms']} indexed words)")
     logger.info("✅ Lightweight RAG System ready!")
 
 @app.get("/")
@@ -160,7 +153,7 @@ async def query_rag(request: QueryRequest):
         logger.info(f"Processing query: {query}")
         
         # Search knowledge base
-        kb_results = simple_similarity_search(query, KNOWLEDGE_BASE, max_results=3)
+        kb_results = simple_similarity_search(query, KB_INDEX, max_results=3)
         sources_used = ["Knowledge Base"]
         
         # Initial response from knowledge base
@@ -5,11 +5,13 @@ Only basic functionality - no external dependencies
 
 import json
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Set
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from datetime import datetime
 
+from keyword_index import KeywordIndex, jaccard
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -61,33 +63,20 @@ KNOWLEDGE_BASE = [
     "User experience (UX) design focuses on creating intuitive, accessible, and enjoyable interactions between users and digital products."
 ]
 
-def simple_similarity_search(query: str, knowledge_base: List[str], max_results: int = 3) -> List[str]:
+def _kb_words(text: str) -> Set[str]:
+    return set(word.lower().strip('.,!?') for word in text.split() if len(word) > 2)
+
+def _combined_score(matched: int, query_words: int, doc_words: int) -> float:
+    # Jaccard similarity and word overlap ratio
+    overlap_score = matched / query_words if query_words > 0 else 0
+    return (jaccard(matched, query_words, doc_words) * 0.6) + (overlap_score * 0.4)
+
+# Built once at startup; a query only reads the postings of its own words
+KB_INDEX = KeywordIndex(KNOWLEDGE_BASE, tokenize=_kb_words)
+
+def simple_similarity_search(query: str, index: KeywordIndex, max_results: int = 3) -> List[str]:
     """Enhanced keyword-based similarity search"""
-    query_words = set(word.lower().strip('.,!?') for word in query.split() if len(word) > 2)
-    scored_docs = []
-    
-    for doc in knowledge_base:
-        doc_words = set(word.lower().strip('.,!?') for word in doc.split() if len(word) > 2)
-        
-        # Calculate multiple similarity metrics
-        intersection = len(query_words.intersection(doc_words))
-        union = len(query_words.union(doc_words))
-        
-        # Jaccard similarity
-        jaccard_score = intersection / union if union > 0 else 0
-        
-        # Word overlap ratio
-        overlap_score = intersection / len(query_words) if len(query_words) > 0 else 0
-        
-        # Combined score
-        combined_score = (jaccard_score * 0.6) + (overlap_score * 0.4)
-        
-        if combined_score > 0:
-            scored_docs.append((doc, combined_score))
-    
-    # Sort by score and return top results
-    scored_docs.sort(key=lambda x: x[1], reverse=True)
-    return [doc for doc, score in scored_docs[:max_results]]
+    return [doc for doc, score in index.search(query, max_results, _combined_score)]
 
 def get_fallback_response(query: str) -> str:
     """Generate a helpful fallback response"""
@@ -116,7 +105,7 @@ def get_fallback_response(query: str) -> str:
 async def startup_event():
     """Initialize the minimal RAG system"""
     logger.info("🚀 Initializing Minimal RAG System...")
-    logger.info(f"📚 Knowledge base loaded with {len(KNOWLEDGE_BASE)} documents")
+    logger.info(f"📚 Knowledge base loaded with {len(KNOWLEDGE_BASE)} documents ({KB_INDEX.stats()['terms']} indexed words)")
     logger.info("✅ Minimal RAG System ready!")
 
 @app.get("/")
@@ -156,7 +145,7 @@ async def query_rag(request: QueryRequest):
         logger.info(f"Processing query: {query}")
         
         # Search knowledge base
-        kb_results = simple_similarity_search(query, KNOWLEDGE_BASE, max_results=request.max_results)
+        kb_results = simple_similarity_search(query, KB_INDEX, max_results=request.max_results)
         sources_used = ["Knowledge Base"]
         
         # Calculate confidence based on results
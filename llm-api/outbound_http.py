@@ -0,0 +1,298 @@
+"""
+Outbound HTTP layer for the self-healing lookups.
+
+Every host gets its own keep-alive connection pool (an httpx.AsyncClient with
+at most `max_connections` connections), a token bucket limiting how fast
+requests are sent to it, and a circuit breaker: after `failure_threshold`
+consecutive failures (transport errors, timeouts, 429 and 5xx responses) the
+host is skipped for `cooldown` seconds, then a single trial request decides
+whether it is used again. Skipped requests fail immediately with
+CircuitOpenError instead of waiting for a timeout, and requests that would
+wait longer than `max_wait` for a token fail with RateLimitedError instead of
+queueing behind a traffic spike.
+
+Blocking clients running in worker threads (the web search providers) go
+through the same per-host limits and breakers with `guard_sync`.
+
+Per-host counters (requests, new vs reused connections, throttling,
+rejections, failures) and breaker states are reported by `stats()`.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import httpx
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+
+class OutboundRefused(Exception):
+    """A request was not sent because of the host's rate limit or circuit breaker."""
+
+
+class CircuitOpenError(OutboundRefused):
+    pass
+
+
+class RateLimitedError(OutboundRefused):
+    pass
+
+
+def parse_host_rates(spec: str) -> Dict[str, Tuple[float, Optional[float]]]:
+    """Per-host overrides "host=rate[:burst],..." -> {host: (rate, burst or None)}."""
+    rates = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        host, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        try:
+            rates[host.strip().lower()] = (float(rate), float(burst) if burst else None)
+        except ValueError:
+            raise ValueError(f"Invalid host rate {item.strip()!r} (expected host=rate or host=rate:burst)")
+    return rates
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second up to `burst`; rate <= 0 means unlimited."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Take a token: seconds to wait before using it, or None (nothing taken) if that exceeds max_wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= 1.0
+            return wait
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half open (one trial request) after the cool-down."""
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0  # Times the breaker opened
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return self.state == CLOSED
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if success:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """The trial request was abandoned without a verdict: allow another one."""
+        with self._lock:
+            self._probing = False
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+
+class HostPolicy:
+    """Rate limit, circuit breaker, connection pool and counters of one outbound host."""
+
+    def __init__(self, host: str, bucket: TokenBucket, breaker: CircuitBreaker):
+        self.host = host
+        self.bucket = bucket
+        self.breaker = breaker
+        self.client: Optional["httpx.AsyncClient"] = None
+        self.counters = {
+            "requests": 0,
+            "pooled_requests": 0,  # Sent through the host's connection pool (not guard_sync)
+            "connections_opened": 0,
+            "throttled": 0,
+            "throttle_seconds": 0.0,
+            "rate_limited": 0,
+            "circuit_open": 0,
+            "failures": 0,
+        }
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def admit(self, max_wait: float) -> float:
+        """Check the breaker and take a token; returns the seconds to wait before sending."""
+        if not self.breaker.allow():
+            self.count("circuit_open")
+            raise CircuitOpenError(f"{self.host}: circuit open, retry in {self.breaker.retry_after():.0f}s")
+        wait = self.bucket.reserve(max_wait)
+        if wait is None:
+            self.breaker.release()
+            self.count("rate_limited")
+            raise RateLimitedError(f"{self.host}: rate limit of {self.bucket.rate:g}/s exceeded")
+        self.count("requests")
+        if wait > 0:
+            self.count("throttled")
+            self.count("throttle_seconds", wait)
+        return wait
+
+    def record(self, success: bool) -> None:
+        if not success:
+            self.count("failures")
+        self.breaker.record(success)
+
+    async def trace(self, event_name: str, info: Dict) -> None:
+        """httpcore trace hook: counts the connections opened for this host."""
+        if event_name == "connection.connect_tcp.complete":
+            self.count("connections_opened")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["throttle_seconds"] = round(counters["throttle_seconds"], 3)
+        pooled = counters["pooled_requests"]
+        counters["connections_reused"] = max(0, pooled - counters["connections_opened"])
+        counters["reuse_rate"] = round(counters["connections_reused"] / pooled, 4) if pooled else 0.0
+        counters["breaker"] = self.breaker.state
+        counters["breaker_opened"] = self.breaker.opened
+        counters["retry_after"] = round(self.breaker.retry_after(), 1)
+        return counters
+
+
+def _failed_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+class OutboundHTTP:
+    """Per-host connection pools, token buckets and circuit breakers for outbound requests."""
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = 10.0, max_connections: int = 10,
+                 rate: float = 0.0, burst: float = 1.0, max_wait: float = 2.0, failure_threshold: int = 5,
+                 cooldown: float = 30.0, host_rates: Optional[Dict[str, Tuple[float, Optional[float]]]] = None):
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.host_rates = host_rates or {}
+        self._hosts: Dict[str, HostPolicy] = {}
+        self._lock = threading.Lock()
+
+    def host(self, host: str) -> HostPolicy:
+        host = (host or "").lower()
+        with self._lock:
+            policy = self._hosts.get(host)
+            if policy is None:
+                if host in self.host_rates:
+                    rate, burst = self.host_rates[host]
+                    bucket = TokenBucket(rate, burst if burst is not None else min(self.burst, max(1.0, 2 * rate)))
+                else:
+                    bucket = TokenBucket(self.rate, self.burst)
+                policy = self._hosts[host] = HostPolicy(host, bucket, CircuitBreaker(self.failure_threshold,
+                                                                                     self.cooldown))
+            return policy
+
+    def _client(self, policy: HostPolicy) -> "httpx.AsyncClient":
+        import httpx
+
+        if policy.client is None or policy.client.is_closed:
+            policy.client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+        return policy.client
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator["httpx.Response"]:
+        """httpx stream() through the host's pool, rate limit and circuit breaker."""
+        import httpx
+
+        policy = self.host(urlsplit(url).hostname)
+        wait = policy.admit(self.max_wait)
+        policy.count("pooled_requests")
+        verdict: Optional[bool] = None
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            extensions = dict(kwargs.pop("extensions", None) or {}, trace=policy.trace)
+            async with self._client(policy).stream(method, url, extensions=extensions, **kwargs) as resp:
+                verdict = not _failed_status(resp.status_code)
+                yield resp
+        except httpx.TransportError:
+            verdict = False
+            raise
+        finally:
+            if verdict is None:
+                policy.breaker.release()
+            else:
+                policy.record(verdict)
+
+    @contextmanager
+    def guard_sync(self, host: str) -> Iterator[HostPolicy]:
+        """Apply the host's rate limit and breaker to a blocking call; any exception counts as a failure."""
+        policy = self.host(host)
+        wait = policy.admit(self.max_wait)
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            yield policy
+        except Exception:
+            policy.record(False)
+            raise
+        policy.record(True)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            policies = list(self._hosts.values())
+        return {policy.host: policy.stats() for policy in sorted(policies, key=lambda p: p.host)}
+
+    async def aclose(self) -> None:
+        with self._lock:
+            policies = list(self._hosts.values())
+        for policy in policies:
+            if policy.client is not None:
+                await policy.client.aclose()
+                policy.client = None
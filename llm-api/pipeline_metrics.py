@@ -0,0 +1,189 @@
+"""
+Pipeline metrics for the Self-Healing RAG API.
+
+Stage latencies are recorded with `span(stage)` into per-stage histograms and
+counters are kept per label set; `render()` writes both in the Prometheus text
+exposition format for GET /metrics. Everything is in-process and per worker.
+
+A request can also collect its own timing breakdown: inside
+`request_timings()`, every span finished in the same context (including tasks
+created from it, such as concurrent healing lookups) adds its duration to a
+per-stage total. Work run on executor threads without the request's context,
+like the batched base index search shared by several requests, is only
+recorded in the histograms.
+
+Histogram is a cumulative bucket histogram; besides the stage latencies, the
+query batcher records its queue depth and batch sizes in one each.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_request_timings: "ContextVar[Optional[Dict[str, float]]]" = ContextVar("autorag_request_timings", default=None)
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, "counter" or "gauge", help, [(labels, value), ...]) of metrics kept outside PipelineMetrics
+MetricFamily = Tuple[str, str, str, Sequence[Tuple[Dict[str, str], float]]]
+
+
+class Histogram:
+    """Cumulative bucket histogram (Prometheus style: each bucket counts observations <= its bound)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def snapshot(self) -> Dict:
+        buckets = {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0,
+            "buckets": buckets,
+        }
+
+
+def _format_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: Labels = ()) -> List[str]:
+    lines = [f"{name}_bucket{_format_labels(labels, [('le', repr(float(bound)))])} {count}"
+             for bound, count in zip(histogram.buckets, histogram.counts)]
+    lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {repr(float(histogram.sum))}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+class PipelineMetrics:
+    """Per-stage latency histograms and labelled counters, thread-safe."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stages: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Set the HELP line of a counter."""
+        self._help[name] = help_text
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of `stage` (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def counter(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def stage_summary(self) -> Dict[str, Dict]:
+        """count / total seconds / mean per stage, for /health."""
+        with self._lock:
+            return {
+                stage: {"count": h.count, "seconds": round(h.sum, 3), "mean": round(h.sum / h.count, 4) if h.count else 0.0}
+                for stage, h in sorted(self._stages.items())
+            }
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None,
+               families: Sequence[MetricFamily] = (),
+               histograms: Optional[Dict[str, Tuple[str, Histogram]]] = None) -> str:
+        """
+        Prometheus text format: stage histograms, counters, the given {name: (help, value)}
+        gauges, labelled metric families and {name: (help, Histogram)} histograms.
+        """
+        lines: List[str] = [
+            "# HELP autorag_stage_duration_seconds Time spent in each RAG pipeline stage",
+            "# TYPE autorag_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                lines.extend(_histogram_lines("autorag_stage_duration_seconds", histogram, (("stage", stage),)))
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        for name, metric_type, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}")
+        for name, (help_text, histogram) in sorted((histograms or {}).items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            lines.extend(_histogram_lines(name, histogram))
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def detached_from_request() -> Iterator[None]:
+    """Record spans in this context only in the histograms (for work shared by several requests)."""
+    token = _request_timings.set(None)
+    try:
+        yield
+    finally:
+        _request_timings.reset(token)
+
+
+@contextmanager
+def request_timings() -> Iterator[Dict[str, float]]:
+    """Collect the seconds spent per stage by spans finished in this context (summed over concurrent spans)."""
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings["total"] = time.perf_counter() - started
+        _request_timings.reset(token)
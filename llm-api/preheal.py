@@ -0,0 +1,205 @@
+"""
+Background pre-healing for the Self-Healing RAG API.
+
+Queries whose base index score fell below their threshold are offered to a
+PreHealWorker, which heals their topics into the persistent base index while
+the API is idle, so the next query about the topic is answered from the base
+index instead of waiting for healing. Seed topics can be queued at startup the
+same way.
+
+Offers are deduplicated by topic key: a topic already queued, being healed or
+attempted within `retry_after` seconds is not queued again. The queue is
+bounded (offers beyond `max_queue` are dropped) and at most `concurrency`
+topics are healed at a time, each only after no query has been answered for
+`idle_seconds`.
+
+Worker processes sharing a `claim_dir` also skip topics another process is
+healing or attempted within `retry_after` seconds: each topic has a claim file
+there, locked while it is healed and holding the time of the last attempt.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: topics are only deduplicated within each process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# heal(query, threshold) -> outcome: "healed", "skipped" (base index already answers it) or "failed"
+HealFunction = Callable[[str, float], Awaitable[str]]
+
+_IDLE_POLL_SECONDS = 0.2
+_MAX_REMEMBERED = 10000
+
+
+def load_seed_topics(path: Path) -> List[str]:
+    """Topics from a text file, one per line; blank lines and lines starting with # are skipped."""
+    topics = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            topics.append(line)
+    return topics
+
+
+class PreHealWorker:
+    """Bounded, deduplicated queue of topics healed in the background while no queries are running."""
+
+    def __init__(self, heal: HealFunction, topic_key: Callable[[str], str], max_queue: int = 256,
+                 concurrency: int = 1, idle_seconds: float = 2.0, retry_after: float = 3600.0,
+                 claim_dir: Optional[Path] = None):
+        self.heal = heal
+        self.topic_key = topic_key
+        self.max_queue = max_queue
+        self.concurrency = max(1, concurrency)
+        self.idle_seconds = idle_seconds
+        self.retry_after = retry_after
+        self.claim_dir = Path(claim_dir) if claim_dir is not None and fcntl is not None else None
+        self._queue: "Optional[asyncio.Queue[Tuple[str, float, str]]]" = None
+        self._queued: Set[str] = set()  # Keys queued or being healed
+        self._attempted: "OrderedDict[str, float]" = OrderedDict()  # Key -> time of the last attempt
+        self._tasks: List[asyncio.Task] = []
+        self._active_requests = 0
+        self._last_request = 0.0
+        self.counters = {"offered": 0, "deduplicated": 0, "dropped": 0, "healed": 0, "skipped": 0, "failed": 0,
+                         "other_worker": 0}
+
+    @contextmanager
+    def busy(self) -> Iterator[None]:
+        """Mark a query as being answered; healing waits until none have run for idle_seconds."""
+        self._active_requests += 1
+        try:
+            yield
+        finally:
+            self._active_requests -= 1
+            self._last_request = time.monotonic()
+
+    def idle(self) -> bool:
+        return self._active_requests == 0 and time.monotonic() - self._last_request >= self.idle_seconds
+
+    def offer(self, query: str, threshold: float, origin: str = "query") -> bool:
+        """Queue a topic for healing unless it is a duplicate or the queue is full. Returns whether it was queued."""
+        if self._queue is None:
+            return False
+        self.counters["offered"] += 1
+        key = self.topic_key(query)
+        attempted = self._attempted.get(key)
+        if key in self._queued or (attempted is not None and time.monotonic() - attempted < self.retry_after):
+            self.counters["deduplicated"] += 1
+            return False
+        try:
+            self._queue.put_nowait((query, threshold, origin))
+        except asyncio.QueueFull:
+            self.counters["dropped"] += 1
+            return False
+        self._queued.add(key)
+        return True
+
+    def start(self) -> None:
+        """Start the healing tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        if self.claim_dir is not None:
+            self.claim_dir.mkdir(parents=True, exist_ok=True)
+            self._prune_claims()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while True:
+            query, threshold, origin = await self._queue.get()
+            key = self.topic_key(query)
+            claim = None
+            try:
+                while not self.idle():
+                    await asyncio.sleep(_IDLE_POLL_SECONDS)
+                claim = self._claim(key)
+                if claim is False:
+                    self.counters["other_worker"] += 1
+                    continue
+                started = time.perf_counter()
+                outcome = await self.heal(query, threshold)
+                self.counters[outcome] += 1
+                logger.info(f"🩹 Pre-heal ({origin}) '{query}': {outcome} in {time.perf_counter() - started:.1f}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["failed"] += 1
+                logger.warning(f"Pre-heal of '{query}' failed: {e}")
+            finally:
+                if claim:
+                    claim.close()  # Releases the lock
+                self._queued.discard(key)
+                self._remember(key)
+                self._queue.task_done()
+
+    def _claim(self, key: str):
+        """
+        Lock the topic's claim file and record this attempt in it. Returns the open file
+        (closing it releases the claim), None without a claim_dir, or False when another
+        process holds the claim or attempted the topic within retry_after seconds.
+        """
+        if self.claim_dir is None:
+            return None
+        path = self.claim_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.claim"
+        claim: IO[str] = open(path, "a+")
+        try:
+            fcntl.flock(claim, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            claim.close()
+            return False
+        claim.seek(0)
+        try:
+            attempted = float(claim.read().strip() or 0)
+        except ValueError:
+            attempted = 0.0
+        if time.time() - attempted < self.retry_after:
+            claim.close()
+            return False
+        claim.seek(0)
+        claim.truncate()
+        claim.write(str(time.time()))
+        claim.flush()
+        return claim
+
+    def _prune_claims(self) -> None:
+        """Remove claim files whose attempts are older than retry_after."""
+        cutoff = time.time() - self.retry_after
+        for path in self.claim_dir.glob("*.claim"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    def _remember(self, key: str) -> None:
+        self._attempted[key] = time.monotonic()
+        self._attempted.move_to_end(key)
+        while len(self._attempted) > _MAX_REMEMBERED:
+            self._attempted.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "in_progress": len(self._queued) - (self._queue.qsize() if self._queue is not None else 0),
+            "concurrency": self.concurrency,
+            "active_requests": self._active_requests,
+        }
@@ -0,0 +1,111 @@
+"""
+Micro-batching for concurrent queries.
+
+QueryBatcher collects items submitted within a short window (or until a
+maximum batch size is reached) and hands them to a single batched call, then
+scatters the results back to the awaiting callers. The Self-Healing RAG API
+uses it to turn concurrent /query requests into one encode + index search
+instead of one batch-size-1 forward pass each.
+
+Items are grouped by a key (e.g. the search settings), since only items with
+the same key can share a call. Queue depth and batch sizes are recorded in
+histograms for /health and /metrics.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+from pipeline_metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BatchRunner = Callable[[Hashable, List[Any]], Awaitable[List[Any]]]
+
+
+class QueryBatcher:
+    """
+    Coalesce concurrent submissions into batched calls.
+
+    `runner(key, items)` must return one result per item, in order. Must be used
+    from a single event loop.
+    """
+
+    def __init__(self, runner: BatchRunner, max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.runner = runner
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self.queue_depth = Histogram()
+        self.batch_size = Histogram()
+        self.batches = 0
+        self.items = 0
+
+    @property
+    def depth(self) -> int:
+        """Items waiting for their batch to start."""
+        return sum(len(items) for items in self._pending.values())
+
+    async def submit(self, item: Any, key: Hashable = None) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue_depth.observe(self.depth)
+
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future))
+        if len(pending) >= self.max_batch_size or self.max_wait == 0:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        self.batch_size.observe(len(batch))
+        task = asyncio.ensure_future(self._run(key, batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Hashable, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.runner(key, [item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch runner returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error(f"Batched call failed for {len(batch)} items: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # The caller may have been cancelled
+                future.set_result(result)
+
+    def flush_all(self) -> None:
+        """Start every pending batch now (e.g. on shutdown)."""
+        for key in list(self._pending):
+            self._flush(key)
+
+    def stats(self) -> Dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": self.depth,
+            "in_flight_batches": len(self._tasks),
+            "batches": self.batches,
+            "items": self.items,
+            "queue_depth": self.queue_depth.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
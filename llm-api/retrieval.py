@@ -0,0 +1,89 @@
+"""
+Array-backed retrieval results for the Self-Healing RAG API.
+
+A RetrievalResult holds the hits of one or more queries as (n_queries, k)
+NumPy arrays: chunk ids (-1 where an ANN backend or a fusion step returned
+fewer than k hits), scores and a boolean mask of the hits that are kept.
+Thresholding and per-query averaging are single vectorized operations over
+the whole batch, and the chunk texts of the kept hits are resolved once, when
+the result is built, while the caller still holds a consistent view of the
+chunk store (the base index can be compacted or reloaded afterwards).
+
+Iterating a result (or indexing it with an int) yields one-row results, so a
+batched search can be scattered back to its callers, and rows can be
+filtered further, for example by a reranker, without touching the chunk store.
+"""
+
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class RetrievalResult:
+    """Search hits of a batch of queries: ids, scores and mask, each (n_queries, k)."""
+
+    __slots__ = ("ids", "scores", "mask", "texts")
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray, mask: np.ndarray, texts: np.ndarray):
+        self.ids = ids
+        self.scores = scores
+        self.mask = mask
+        self.texts = texts  # object array, filled where mask is set
+
+    @classmethod
+    def from_search(cls, chunks: Sequence[str], scores: np.ndarray, ids: np.ndarray,
+                    min_score: float) -> "RetrievalResult":
+        """Keep the hits scoring above min_score and look up their chunk texts."""
+        ids = np.atleast_2d(np.asarray(ids, dtype=np.int64))
+        scores = np.atleast_2d(np.asarray(scores, dtype=np.float32))
+        mask = (ids >= 0) & (scores > min_score)
+        texts = np.empty(ids.shape, dtype=object)
+        texts[mask] = [chunks[i] for i in ids[mask].tolist()]
+        return cls(ids, scores, mask, texts)
+
+    @classmethod
+    def empty(cls, n_queries: int) -> "RetrievalResult":
+        return cls(np.full((n_queries, 0), -1, dtype=np.int64), np.zeros((n_queries, 0), dtype=np.float32),
+                   np.zeros((n_queries, 0), dtype=bool), np.empty((n_queries, 0), dtype=object))
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def __getitem__(self, row: int) -> "RetrievalResult":
+        rows = slice(row, row + 1)
+        return RetrievalResult(self.ids[rows], self.scores[rows], self.mask[rows], self.texts[rows])
+
+    def __iter__(self) -> Iterator["RetrievalResult"]:
+        return (self[row] for row in range(len(self)))
+
+    def filter(self, min_score: Optional[float] = None, keep: Optional[np.ndarray] = None) -> "RetrievalResult":
+        """Narrow the mask by a score threshold and/or a boolean (n_queries, k) array."""
+        mask = self.mask
+        if min_score is not None:
+            mask = mask & (self.scores > min_score)
+        if keep is not None:
+            mask = mask & keep
+        return RetrievalResult(self.ids, self.scores, mask, self.texts)
+
+    def counts(self) -> np.ndarray:
+        """Kept hits per query."""
+        return self.mask.sum(axis=1)
+
+    def mean_scores(self) -> np.ndarray:
+        """Average score of the kept hits per query, 0 for queries without any."""
+        counts = self.counts()
+        sums = np.where(self.mask, self.scores, 0.0).sum(axis=1, dtype=np.float64)
+        return np.divide(sums, counts, out=np.zeros(len(self), dtype=np.float64), where=counts > 0)
+
+    def docs(self, row: int = 0) -> List[str]:
+        """Kept chunk texts of one query, best first."""
+        return self.texts[row][self.mask[row]].tolist()
+
+    def hits(self, row: int = 0) -> List[Tuple[str, float]]:
+        """Kept (chunk text, score) pairs of one query, best first."""
+        mask = self.mask[row]
+        return list(zip(self.texts[row][mask].tolist(), self.scores[row][mask].tolist()))
+
+    def docs_and_score(self, row: int = 0) -> Tuple[List[str], float]:
+        """(kept chunk texts, average score) of one query."""
+        return self.docs(row), float(self.mean_scores()[row])
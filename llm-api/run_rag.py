@@ -4,7 +4,7 @@ This script initializes the system and runs some demo queries.
 """
 
 import asyncio
-from self_healing_rag import autorag_with_diff, startup_event, embedder, base_index, base_chunks
+from self_healing_rag import autorag_with_diff, initialize_rag, shutdown_event
 
 async def main():
     """Initialize and test the RAG system."""
@@ -13,7 +13,7 @@ async def main():
     print("=" * 70)
     
     # Initialize the system
-    await startup_event()
+    await initialize_rag()
     
     print("\n" + "=" * 70)
     print("System Ready! Running Demo Queries...")
@@ -40,7 +40,7 @@ async def main():
         print(f"Demo Query {i}: {demo['query']}")
         print(f"{'=' * 70}\n")
         
-        result = autorag_with_diff(
+        result = await autorag_with_diff(
             query=demo['query'],
             threshold=demo['threshold'],
             k=5,
@@ -66,6 +66,8 @@ async def main():
         print(result['after_answer'])
         print("\n")
     
+    await shutdown_event()
+
     print("\n" + "=" * 70)
     print("Demo Complete!")
     print("=" * 70)
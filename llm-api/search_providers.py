@@ -0,0 +1,86 @@
+"""
+Web search providers for self-healing.
+
+Healing only needs a text search returning a list of {"title", "href", "body"}
+results. DDGSProvider wraps duckduckgo_search (the default); HTTPSearchProvider
+queries any endpoint that answers `GET <url>?q=...&max_results=...` with such a
+list, for example the local stand-in in benchmarks/fake_sources.py, so healing
+can run offline and reproducibly; NullSearchProvider turns web search off.
+
+Providers are blocking and are called from a worker thread; `host` names the
+host whose rate limit and circuit breaker apply to them (None for no network).
+"""
+
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class SearchProvider:
+    """Interface for web search providers."""
+
+    name = "none"
+    host: Optional[str] = None
+
+    def text(self, query: str, max_results: int) -> List[Dict]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSearchProvider(SearchProvider):
+    """No web search: every query returns no results."""
+
+    def text(self, query: str, max_results: int) -> List[Dict]:
+        return []
+
+
+class DDGSProvider(SearchProvider):
+    """DuckDuckGo text search through duckduckgo_search (imported on first use)."""
+
+    name = "ddgs"
+    host = "duckduckgo.com"
+
+    def text(self, query: str, max_results: int) -> List[Dict]:
+        from duckduckgo_search import DDGS
+
+        with DDGS() as ddgs:
+            return list(ddgs.text(query, max_results=max_results))
+
+
+class HTTPSearchProvider(SearchProvider):
+    """JSON search endpoint: GET url?q=...&max_results=... returning a list of results (or {"results": [...]})."""
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        import httpx
+
+        self.url = url
+        self.host = urlsplit(url).hostname
+        self._client = httpx.Client(timeout=timeout)
+
+    def text(self, query: str, max_results: int) -> List[Dict]:
+        resp = self._client.get(self.url, params={"q": query, "max_results": max_results})
+        resp.raise_for_status()
+        data = resp.json()
+        results = data.get("results", []) if isinstance(data, dict) else data
+        return list(results)[:max_results]
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_search_provider(spec: str, timeout: float = 10.0) -> SearchProvider:
+    """Provider for a setting: "ddgs", "off"/"none", or an http(s) URL of a JSON search endpoint."""
+    spec = (spec or "ddgs").strip()
+    if spec.lower() == "ddgs":
+        return DDGSProvider()
+    if spec.lower() in {"0", "off", "false", "no", "none"}:
+        return NullSearchProvider()
+    if spec.startswith(("http://", "https://")):
+        return HTTPSearchProvider(spec, timeout=timeout)
+    raise ValueError(f"Unknown search provider {spec!r} (expected ddgs, off or an http(s) URL)")
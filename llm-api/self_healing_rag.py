@@ -1,8 +1,18 @@
 """
 Self-Healing RAG (Retrieval Augmented Generation) System
 FastAPI Application with Improved Self-Healing Capabilities
+
+Startup is split so the port is bound right away: importing this module only
+loads what serving needs (the healing dependencies httpx, duckduckgo_search,
+BeautifulSoup/lxml and the PyTorch or ONNX runtime are imported on first use),
+and the embedding model and base index are loaded by a background task after
+uvicorn starts. GET /health answers immediately; GET /ready returns 503 until
+the index is loaded.
 """
 
+import time
+_import_started = time.perf_counter()
+
 import warnings
 # Suppress duckduckgo_search deprecation warning more aggressively
 warnings.filterwarnings("ignore")
@@ -10,27 +20,74 @@ warnings.filterwarnings("ignore", message=".*duckduckgo_search.*")
 warnings.filterwarnings("ignore", message=".*has been renamed.*")
 warnings.filterwarnings("ignore", category=RuntimeWarning, module="__main__")
 
+import asyncio
+import contextvars
+import hashlib
+import itertools
+import json
+import threading
 import numpy as np
 import faiss
-import requests
 import re
 import logging
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import partial
+try:
+    import fcntl
+except ImportError:  # Windows: compaction is not coordinated across processes
+    fcntl = None
+from typing import TYPE_CHECKING, AbstractSet, Iterator, List, Dict, NamedTuple, Optional, Sequence, Tuple
 from datetime import datetime
-from urllib.parse import quote, unquote
+from urllib.parse import quote, unquote, urlencode
 import os
 import pickle
+import uuid
 from pathlib import Path
 
 # Removed datasets import - causing PyArrow issues
 # from datasets import load_dataset
-from sentence_transformers import SentenceTransformer
-from bs4 import BeautifulSoup
-from duckduckgo_search import DDGS
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
+from answer_cache import AnswerCache, answer_cache_key
+from chunk_store import ChunkStore, chunk_hash, write_chunk_store
+from chunking import DEFAULT_OVERLAP_TOKENS, SentenceChunker
+from embedding_backends import DEFAULT_MIN_COSINE, load_embedder
+from document_store import DocumentJournal, DocumentRegistry, apply_ops, search_live
+from embedding_cache import EmbeddingCache, normalize_query
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from text_cleaning import clean_text
+from pipeline_metrics import PipelineMetrics, detached_from_request, request_timings
+from outbound_http import OutboundHTTP, OutboundRefused, parse_host_rates
+from preheal import PreHealWorker, load_seed_topics
+from query_batcher import QueryBatcher
+from search_providers import DDGSProvider, SearchProvider, create_search_provider
+from retrieval import RetrievalResult
+from index_backends import (
+    LayeredIndex,
+    build_index,
+    build_params,
+    compact_index,
+    describe_index,
+    index_config_from_env,
+    read_index,
+    reconstruct_rows,
+    search_params,
+)
+from heal_fanout import HealFanout, HealText
+from fetch_cache import (
+    NEGATIVE_STATUS_CODES,
+    CachedResponse,
+    MemoryFetchCache,
+    SQLiteFetchCache,
+    TieredFetchCache,
+)
+
+if TYPE_CHECKING:  # Imported on first use, only healing needs it
+    import httpx
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -50,44 +107,8 @@ HEADERS = {
     "User-Agent": "AutoRAG-Demo/1.0 (contact: demo@example.com)"
 }
 
-BAD_PATTERNS = [
-    r"accept all cookies",
-    r"manage preferences",
-    r"privacy policy",
-    r"cookie",
-    r"we value your privacy",
-    r"essential cookies",
-    r"skip to main",
-    r"skip to content",
-    r"menu",
-    r"navigation",
-    r"subscribe",
-    r"newsletter",
-    r"sign up",
-    r"log in",
-    r"register",
-    r"follow us",
-    r"share on",
-    r"tweet",
-    r"facebook",
-    r"instagram",
-    r"linkedin",
-    r"twitter",
-    r"copyright.*?copyright",
-    r"all rights reserved",
-    r"related articles",
-    r"you may also like",
-    r"read more",
-    r"click here",
-    r"advertisement",
-    r"ad",
-]
-
-# Global variables (initialized on startup)
-embedder = None
-base_index = None
-base_chunks = None
-
+# Question words dropped when building web search queries and healing topic keys
+HEAL_STOPWORDS = {'what', 'is', 'are', 'how', 'does', 'the', 'a', 'an'}
 
 def _is_truthy_env(value: Optional[str]) -> bool:
     if value is None:
@@ -95,55 +116,740 @@ def _is_truthy_env(value: Optional[str]) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
-def _cache_paths() -> Tuple[Path, Path]:
+# Outbound HTTP and worker pool sizing
+HTTP_TIMEOUT = float(os.getenv("AUTORAG_HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("AUTORAG_HTTP_MAX_CONNECTIONS", "10"))  # Keep-alive pool per host
+
+# Outbound limits per host: requests/second (0 = unlimited) and burst, the longest a request waits
+# for a token before it is refused, per-host overrides ("host=rate[:burst],..."), and the circuit
+# breaker (consecutive failures that open it, 0 = off, and seconds until a host is retried)
+HTTP_RATE = float(os.getenv("AUTORAG_HTTP_RATE", "20"))
+HTTP_BURST = float(os.getenv("AUTORAG_HTTP_BURST", "40"))
+HTTP_RATE_MAX_WAIT = float(os.getenv("AUTORAG_HTTP_RATE_MAX_WAIT", "2"))
+HTTP_HOST_RATES = parse_host_rates(os.getenv("AUTORAG_HTTP_HOST_RATES", "duckduckgo.com=1:3"))
+BREAKER_FAILURES = int(os.getenv("AUTORAG_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("AUTORAG_BREAKER_COOLDOWN", "30"))
+
+# Healing sources: Wikipedia site and web search provider (ddgs, off, or the URL of a JSON search
+# endpoint); both can point at the local stand-ins in benchmarks/fake_sources.py
+WIKIPEDIA_URL = os.getenv("AUTORAG_WIKIPEDIA_URL", "https://en.wikipedia.org").rstrip("/")
+SEARCH_PROVIDER = os.getenv("AUTORAG_SEARCH_PROVIDER", "ddgs")
+CPU_WORKERS = int(os.getenv("AUTORAG_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Web pages fetched while healing: download cap and HTML parser (lxml, or html.parser)
+MAX_PAGE_BYTES = int(os.getenv("AUTORAG_MAX_PAGE_BYTES", str(1024 * 1024)))
+HTML_PARSER = os.getenv("AUTORAG_HTML_PARSER", "lxml").strip().lower()
+
+# Outbound fetch cache (memory tier + optional SQLite tier); TTLs in seconds
+FETCH_CACHE_SIZE = int(os.getenv("AUTORAG_FETCH_CACHE_SIZE", "1024"))
+FETCH_CACHE_DB = os.getenv("AUTORAG_FETCH_CACHE_DB")
+FETCH_TTL = float(os.getenv("AUTORAG_FETCH_TTL", str(24 * 3600)))
+FETCH_SEARCH_TTL = float(os.getenv("AUTORAG_FETCH_SEARCH_TTL", "3600"))
+FETCH_NEGATIVE_TTL = float(os.getenv("AUTORAG_FETCH_NEGATIVE_TTL", "3600"))
+
+# Answer cache: complete /query results per normalized query, settings and base index version
+# (memory LRU + optional SQLite tier); TTL in seconds, 0 for no expiry
+ANSWER_CACHE_SIZE = int(os.getenv("AUTORAG_ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("AUTORAG_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_DB = os.getenv("AUTORAG_ANSWER_CACHE_DB")
+
+# Embedding model and query embedding cache
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# Embedding backend: torch, onnx or onnx-int8 (exported to <cache dir>/onnx on first use)
+EMBEDDING_BACKEND = os.getenv("AUTORAG_EMBEDDING_BACKEND", "torch").strip().lower()
+ONNX_MIN_COSINE = float(os.getenv("AUTORAG_ONNX_MIN_COSINE", str(DEFAULT_MIN_COSINE)))
+ONNX_THREADS = int(os.getenv("AUTORAG_ONNX_THREADS", "0"))
+EMBED_CACHE_SIZE = int(os.getenv("AUTORAG_EMBED_CACHE_SIZE", "10000"))
+EMBED_CACHE_TTL = float(os.getenv("AUTORAG_EMBED_CACHE_TTL", "0"))
+EMBED_CACHE_PATH = os.getenv("AUTORAG_EMBED_CACHE_PATH")
+
+# Chunking: token budget per chunk (0 = the embedding model's input limit) and sentence overlap
+CHUNK_MAX_TOKENS = int(os.getenv("AUTORAG_CHUNK_MAX_TOKENS", "0"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("AUTORAG_CHUNK_OVERLAP_TOKENS", str(DEFAULT_OVERLAP_TOKENS)))
+
+# Micro-batching of concurrent /query requests into shared encode + search calls
+BATCH_WAIT_MS = float(os.getenv("AUTORAG_BATCH_WAIT_MS", "2"))
+MAX_BATCH_SIZE = int(os.getenv("AUTORAG_MAX_BATCH_SIZE", "32"))
+
+# Upper bound on the number of queries accepted by POST /query/batch
+MAX_BATCH_QUERIES = int(os.getenv("AUTORAG_MAX_BATCH_QUERIES", "256"))
+
+# Base index retrieval: dense (FAISS), lexical (BM25) or hybrid (both, fused by reciprocal rank),
+# and how many candidates each retriever contributes to the fusion
+RETRIEVAL_MODE = os.getenv("AUTORAG_RETRIEVAL_MODE", "dense").strip().lower()
+HYBRID_CANDIDATES = int(os.getenv("AUTORAG_HYBRID_CANDIDATES", "50"))
+if RETRIEVAL_MODE not in ("dense", "lexical", "hybrid"):
+    logger.warning(f"Unknown AUTORAG_RETRIEVAL_MODE {RETRIEVAL_MODE!r}; using dense retrieval")
+    RETRIEVAL_MODE = "dense"
+
+# Retrieved chunks must score above this to be used (cosine similarity, or BM25 query-term coverage)
+MIN_SCORE = float(os.getenv("AUTORAG_MIN_SCORE", "0.15"))
+
+# Memory-map the cached base index read-only so uvicorn workers share one copy
+INDEX_MMAP = _is_truthy_env(os.getenv("AUTORAG_INDEX_MMAP"))
+
+# Healing source lookups run concurrently: total seconds allowed per query (requests can override
+# it with heal_deadline), and the point where the remaining lookups are cancelled: at least
+# HEAL_TARGET_CHARS characters of text from at least HEAL_MIN_SOURCES sources
+HEAL_DEADLINE = float(os.getenv("AUTORAG_HEAL_DEADLINE", "8"))
+HEAL_TARGET_CHARS = int(os.getenv("AUTORAG_HEAL_TARGET_CHARS", "3000"))
+HEAL_MIN_SOURCES = int(os.getenv("AUTORAG_HEAL_MIN_SOURCES", "2"))
+
+# Fold successful healing results back into the persistent base index
+PERSIST_HEALED = _is_truthy_env(os.getenv("AUTORAG_PERSIST_HEALED", "true"))
+# Seconds between checks for healed segments persisted by other worker processes
+HEALED_SYNC_INTERVAL = float(os.getenv("AUTORAG_HEALED_SYNC_INTERVAL", "30"))
+
+# Background pre-healing: low-score queries (and the seed topics in AUTORAG_PREHEAL_TOPICS, one per
+# line, checked against AUTORAG_PREHEAL_THRESHOLD) are healed into the base index while no queries
+# are running. Queue bound, topics healed at once, idle seconds required before each topic and
+# seconds before a topic is attempted again
+PREHEAL = _is_truthy_env(os.getenv("AUTORAG_PREHEAL"))
+PREHEAL_TOPICS = os.getenv("AUTORAG_PREHEAL_TOPICS")
+PREHEAL_THRESHOLD = float(os.getenv("AUTORAG_PREHEAL_THRESHOLD", "0.5"))
+PREHEAL_QUEUE = int(os.getenv("AUTORAG_PREHEAL_QUEUE", "256"))
+PREHEAL_CONCURRENCY = int(os.getenv("AUTORAG_PREHEAL_CONCURRENCY", "1"))
+PREHEAL_IDLE_SECONDS = float(os.getenv("AUTORAG_PREHEAL_IDLE_SECONDS", "2"))
+PREHEAL_RETRY_AFTER = float(os.getenv("AUTORAG_PREHEAL_RETRY_AFTER", "3600"))
+
+# Document updates: how often each worker picks up other workers' changes (seconds) and the
+# share of tombstoned chunks that triggers a background compaction (0 disables it)
+DOCUMENT_SYNC_INTERVAL = float(os.getenv("AUTORAG_DOCUMENT_SYNC_INTERVAL", "30"))
+COMPACT_TOMBSTONE_RATIO = float(os.getenv("AUTORAG_COMPACT_TOMBSTONE_RATIO", "0.1"))
+# How often a worker checks whether an earlier journal segment it must apply first is committed (seconds)
+JOURNAL_POLL_SECONDS = 0.05
+
+# Global variables (initialized on startup)
+embedder = None
+base_index = None
+base_chunks = None
+outbound: Optional[OutboundHTTP] = None
+cpu_executor: Optional[ThreadPoolExecutor] = None
+healed_sync_task: Optional[asyncio.Task] = None
+fetch_cache: Optional[TieredFetchCache] = None
+answer_cache: Optional[AnswerCache] = None
+search_provider: Optional[SearchProvider] = None
+query_batcher: Optional[QueryBatcher] = None
+chunker: Optional[SentenceChunker] = None
+base_documents: Optional[DocumentRegistry] = None
+# BM25 index over the base chunks (AUTORAG_RETRIEVAL_MODE lexical/hybrid)
+base_lexical: Optional[BM25Index] = None
+# Document journal segments applied to the live index, and the cache generation it was loaded from
+applied_journal_seqs = set()
+base_generation = 0
+document_lock = threading.Lock()
+maintenance_task: Optional[asyncio.Task] = None
+preheal_worker: Optional[PreHealWorker] = None
+# Startup progress ("starting", "ready" or "failed") and seconds spent in each startup phase
+startup_state = "starting"
+startup_error: Optional[str] = None
+startup_phases: Dict[str, float] = {"imports": round(time.perf_counter() - _import_started, 3)}
+warmup_task: Optional[asyncio.Task] = None
+query_embedding_cache = EmbeddingCache(max_size=EMBED_CACHE_SIZE, ttl_seconds=EMBED_CACHE_TTL)
+# Stage latency histograms and counters exported on GET /metrics
+pipeline_metrics = PipelineMetrics()
+pipeline_metrics.describe("autorag_queries_total", "Queries answered, by whether the answer cache served them")
+pipeline_metrics.describe("autorag_heal_triggered_total", "Computed queries whose base score was below the threshold")
+pipeline_metrics.describe("autorag_heal_successful_total", "Healing attempts whose results were used in the answer")
+pipeline_metrics.describe("autorag_heal_source_attempts_total", "Lookups per healing source")
+pipeline_metrics.describe("autorag_heal_lookups_cancelled_total",
+                          "Healing lookups cancelled once enough text was found or the deadline passed")
+pipeline_metrics.describe("autorag_heal_deadline_exceeded_total", "Healing attempts cut short by the deadline")
+pipeline_metrics.describe("autorag_heal_source_hits_total", "Lookups per healing source that returned usable text")
+
+# Healed-knowledge bookkeeping: content hashes of healed chunks (base chunk hashes
+# live in the chunk store), the healed segments applied to the live index and a
+# lock guarding base index mutation.
+chunk_hashes = set()
+healed_chunks_count = 0
+applied_healed_seqs = set()
+base_index_lock = threading.RLock()
+
+
+def _cache_dir() -> Path:
     cache_dir = os.getenv("AUTORAG_CACHE_DIR")
     if cache_dir:
-        base_dir = Path(cache_dir)
+        return Path(cache_dir)
+    return Path(__file__).resolve().parent / ".cache"
+
+
+def _cache_paths() -> Tuple[Path, Path]:
+    base_dir = _cache_dir()
+    return base_dir / "base_index.faiss", base_dir / "base_chunks.bin"
+
+
+def _open_cached_chunks(chunks_path: Path) -> Optional[ChunkStore]:
+    """
+    Open the memory-mapped base chunk store. Caches from older versions (a JSONL
+    chunk log, or the pickled chunk list shipped in .cache/) are converted once.
+    """
+    if ChunkStore.exists(chunks_path):
+        return ChunkStore(chunks_path)
+
+    chunk_log_path = chunks_path.with_suffix(".jsonl")
+    if chunk_log_path.exists():
+        logger.info(f"Converting chunk log {chunk_log_path.name} to a memory-mapped chunk store...")
+        with open(chunk_log_path, "r", encoding="utf-8") as f:
+            write_chunk_store(chunks_path, (json.loads(line) for line in f if line.strip()))
+        chunk_log_path.unlink()
+        return ChunkStore(chunks_path)
+
+    legacy_path = chunks_path.with_suffix(".pkl")
+    if legacy_path.exists():
+        logger.info(f"Converting legacy chunk cache {legacy_path.name} to a memory-mapped chunk store...")
+        try:
+            with open(legacy_path, "rb") as f:
+                legacy_chunks = pickle.load(f)
+            write_chunk_store(chunks_path, legacy_chunks)
+        except Exception as e:
+            # Falling back to a rebuild would silently replace the cached corpus with the demo data
+            raise RuntimeError(f"Could not convert legacy chunk cache {legacy_path}: {e}") from e
+        return ChunkStore(chunks_path)
+    return None
+
+
+def _healed_dir() -> Path:
+    return _cache_dir() / "healed"
+
+
+def _is_known_chunk(chunks: ChunkStore, h: str) -> bool:
+    return h in chunk_hashes or chunks.contains_hash(h)
+
+
+def _get_healed_journal() -> DocumentJournal:
+    """Healed segments: segment-NNNNNN.jsonl (one record per chunk) committed by its .npy embeddings."""
+    return DocumentJournal(_healed_dir(), digits=6)
+
+
+def _iter_healed_segments(skip: AbstractSet[int] = frozenset()) -> Iterator[Tuple[int, List[Dict], np.ndarray]]:
+    """Committed healed segments not in `skip`, in order, as (sequence number, records, embeddings)."""
+    for seq, records, embeddings in _get_healed_journal().committed(skip=skip):
+        if len(records) != len(embeddings):
+            logger.warning(f"Skipping healed segment {seq}: {len(records)} records vs {len(embeddings)} vectors")
+            continue
+        yield seq, records, embeddings
+
+
+def _add_healed_records(index: faiss.Index, chunks: ChunkStore, records: List[Dict], embeddings: np.ndarray) -> int:
+    """Add the healed chunks not known yet (by content hash) to the index. Returns how many were added."""
+    global healed_chunks_count
+
+    keep = []
+    seen = set()
+    for i, record in enumerate(records):
+        if not _is_known_chunk(chunks, record["hash"]) and record["hash"] not in seen:
+            seen.add(record["hash"])
+            keep.append(i)
+    if keep:
+        index.add(np.ascontiguousarray(embeddings[keep], dtype="float32"))
+        chunks.extend(records[i]["text"] for i in keep)
+        chunk_hashes.update(records[i]["hash"] for i in keep)
+        healed_chunks_count += len(keep)
+    return len(keep)
+
+
+def load_healed_segments(index: faiss.Index, chunks: ChunkStore) -> int:
+    """
+    Replay append-only healed segments from the cache dir into the base index.
+    Returns the number of healed chunks added.
+    """
+    global chunk_hashes, healed_chunks_count, applied_healed_seqs
+
+    chunk_hashes = set()
+    healed_chunks_count = 0
+    applied_healed_seqs = set()
+
+    for seq, records, embeddings in _iter_healed_segments():
+        _add_healed_records(index, chunks, records, embeddings)
+        applied_healed_seqs.add(seq)
+
+    if healed_chunks_count:
+        logger.info(f"Replayed {healed_chunks_count} healed chunks from {_healed_dir()}")
+    return healed_chunks_count
+
+
+def sync_healed_segments() -> int:
+    """Add healed segments committed by other workers. Returns the number of chunks added."""
+    if base_index is None or base_chunks is None:
+        return 0
+
+    added = 0
+    with base_index_lock:
+        for seq, records, embeddings in _iter_healed_segments(skip=applied_healed_seqs):
+            added += _add_healed_records(base_index, base_chunks, records, embeddings)
+            applied_healed_seqs.add(seq)
+    if added:
+        logger.info(f"Added {added} healed chunks persisted by other workers")
+    return added
+
+
+def persist_healed_chunks(chunks: List[str], embeddings: np.ndarray, chunk_sources: List[str]) -> int:
+    """
+    Append new healed chunks to the live base index and write them to the cache dir
+    as a new append-only segment. Chunks already known (by content hash) are skipped.
+    Returns the number of chunks added.
+    """
+    if base_index is None or base_chunks is None:
+        return 0
+
+    with base_index_lock:
+        # Chunks other workers persisted meanwhile count as known
+        sync_healed_segments()
+        keep = []
+        seen = set()
+        for i, chunk in enumerate(chunks):
+            h = chunk_hash(chunk)
+            if not _is_known_chunk(base_chunks, h) and h not in seen:
+                seen.add(h)
+                keep.append((i, h))
+        if not keep:
+            return 0
+
+        new_embeddings = np.ascontiguousarray(embeddings[[i for i, _ in keep]], dtype="float32")
+        records = [
+            {"hash": h, "text": chunks[i], "source": chunk_sources[i], "added_at": datetime.now().isoformat()}
+            for i, h in keep
+        ]
+
+        segment_id = None
+        try:
+            # Exclusive creation gives each worker its own segment number
+            segment_id = _get_healed_journal().append(records, new_embeddings)
+            applied_healed_seqs.add(segment_id)
+        except Exception as e:
+            logger.warning(f"Could not write healed segment: {e}")
+
+        _add_healed_records(base_index, base_chunks, records, new_embeddings)
+
+    logger.info(f"Persisted {len(records)} healed chunks to base index (segment {segment_id})")
+    return len(records)
+
+
+async def healed_sync_loop() -> None:
+    while True:
+        await asyncio.sleep(HEALED_SYNC_INTERVAL)
+        try:
+            await run_cpu_bound(sync_healed_segments)
+        except Exception as e:
+            logger.warning(f"Healed segment sync failed: {e}")
+
+
+def _index_meta_path() -> Path:
+    return _cache_dir() / "base_index.json"
+
+
+def _read_index_meta() -> Dict:
+    """Build parameters of the cached base index. Caches written before backends were configurable are flat."""
+    meta_path = _index_meta_path()
+    if not meta_path.exists():
+        return {"build_params": {"index_type": "flat"}}
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_index_meta(index: faiss.Index, config: Dict) -> None:
+    # The generation changes whenever the cached index is rewritten, so other workers know to reload it
+    meta = {
+        "build_params": build_params(config),
+        "index": describe_index(index),
+        "built_at": datetime.now().isoformat(),
+        "generation": _read_index_meta().get("generation", 0) + 1,
+    }
+    tmp_path = _index_meta_path().with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, _index_meta_path())
+
+
+def _open_base_index(index_path: Path):
+    """
+    Open the cached base index. With AUTORAG_INDEX_MMAP the index is mapped read-only
+    and wrapped so runtime additions (healed chunks) go to an in-memory delta index.
+    """
+    index = read_index(index_path, mmap=INDEX_MMAP)
+    return LayeredIndex(index, mapped_path=index_path) if INDEX_MMAP else index
+
+
+def _documents_path() -> Path:
+    return _cache_dir() / "base_documents.jsonl"
+
+
+def _lexical_path() -> Path:
+    return _cache_dir() / "base_lexical.npz"
+
+
+def build_lexical_index(chunks: Sequence[str], generation: int) -> BM25Index:
+    """Build the BM25 index over the given chunks and save it for the next startup."""
+    started = time.time()
+    index = BM25Index.build(chunks[i] for i in range(len(chunks)))
+    index.generation = generation
+    index.save(_lexical_path())
+    logger.info(f"Built lexical index over {index.n_docs} chunks in {time.time() - started:.1f}s ({index.stats()})")
+    return index
+
+
+def load_lexical_index(chunks: Sequence[str]) -> Optional[BM25Index]:
+    """
+    Make the BM25 index for the base chunks the live one (dense mode: none). The saved index is
+    reused when it was built for the current cache generation; chunks appended since (healed
+    segments, document journal) are added to it, otherwise it is rebuilt.
+    """
+    global base_lexical
+
+    if RETRIEVAL_MODE == "dense":
+        base_lexical = None
+        return None
+    index = BM25Index.load(_lexical_path())
+    if index is None or index.generation != base_generation or index.n_docs > len(chunks):
+        logger.info("Building lexical index over the base chunks...")
+        index = build_lexical_index(chunks, base_generation)
     else:
-        base_dir = Path(__file__).resolve().parent / ".cache"
-    return base_dir / "base_index.faiss", base_dir / "base_chunks.pkl"
+        index.add(chunks[i] for i in range(index.n_docs, len(chunks)))
+    base_lexical = index
+    return index
+
+
+def _get_document_journal() -> DocumentJournal:
+    return DocumentJournal(_cache_dir() / "documents")
+
+
+def load_documents(index: faiss.Index, chunks: ChunkStore, registry: DocumentRegistry) -> int:
+    """
+    Replay the document journal into the base index on top of the saved registry and make
+    that registry the live one. Returns the number of journal segments applied.
+    """
+    global base_documents, applied_journal_seqs, base_generation
+
+    applied = set()
+    for seq, ops, embeddings in _get_document_journal().committed():
+        apply_ops(index, chunks, registry, ops, embeddings)
+        applied.add(seq)
+
+    base_documents = registry
+    applied_journal_seqs = applied
+    base_generation = _read_index_meta().get("generation", 0)
+    if applied:
+        logger.info(f"Replayed {len(applied)} document journal segments ({registry.stats()})")
+    return len(applied)
+
+
+def upsert_documents(documents: List[Tuple[str, str]]) -> List[Dict]:
+    """
+    Add or replace (id, text) documents: clean, chunk and embed them, journal the change
+    and apply it to the live base index. Only these documents are embedded.
+    """
+    cleaned = [clean_text(text) for _, text in documents]
+    empty = [doc_id for (doc_id, _), text in zip(documents, cleaned) if not text]
+    if empty:
+        raise ValueError(f"No indexable text in document(s): {', '.join(empty)}")
+
+    spans = get_chunker().chunk_documents(cleaned)
+    texts = spans.texts(cleaned)
+    embeddings = embed_chunks(texts)
+    counts = np.bincount(spans.doc_ids, minlength=len(documents)).tolist()
+
+    ops = []
+    offset = 0
+    added_at = datetime.now().isoformat()
+    for (doc_id, _), count in zip(documents, counts):
+        ops.append({"op": "put", "id": doc_id, "chunks": texts[offset:offset + count], "added_at": added_at})
+        offset += count
+
+    with document_lock:
+        seq = _get_document_journal().append(ops, embeddings)
+        _apply_journal_segments(before=seq)
+        with base_index_lock:
+            existed = [doc_id in base_documents for doc_id, _ in documents]
+            apply_ops(base_index, base_chunks, base_documents, ops, embeddings)
+        applied_journal_seqs.add(seq)
+
+    logger.info(f"Indexed {len(documents)} documents ({len(texts)} chunks, journal segment {seq})")
+    return [
+        {"id": doc_id, "chunks": count, "status": "updated" if was_known else "created"}
+        for (doc_id, _), count, was_known in zip(documents, counts, existed)
+    ]
+
+
+def delete_document(doc_id: str) -> Optional[int]:
+    """Tombstone a document's chunks. Returns how many there were, or None for an unknown id."""
+    with document_lock:
+        _apply_journal_segments()
+        if doc_id not in base_documents:
+            return None
+        seq = _get_document_journal().append([{"op": "delete", "id": doc_id}], np.zeros((0, base_index.d), dtype="float32"))
+        _apply_journal_segments(before=seq)
+        with base_index_lock:
+            removed = base_documents.delete(doc_id)
+        applied_journal_seqs.add(seq)
+
+    # An earlier segment from another worker may have deleted it first
+    count = removed[1] - removed[0] if removed is not None else 0
+    logger.info(f"Deleted document {doc_id} ({count} chunks tombstoned)")
+    return count
+
+
+def _apply_journal_segments(before: Optional[int] = None) -> int:
+    """
+    Apply the committed journal segments this worker has not applied yet, in sequence order.
+    With `before` (this worker's own new segment), only earlier segments are applied, waiting
+    for those other workers are still writing, so every worker applies operations in the
+    same order. Callers hold document_lock. Returns the number applied.
+    """
+    journal = _get_document_journal()
+    through = before - 1 if before is not None else None
+    applied = 0
+    while True:
+        for seq, ops, embeddings in journal.committed(skip=applied_journal_seqs, through=through):
+            with base_index_lock:
+                apply_ops(base_index, base_chunks, base_documents, ops, embeddings)
+            applied_journal_seqs.add(seq)
+            applied += 1
+        # In-flight segments are committed or count as abandoned within STALE_SEGMENT_SECONDS
+        if before is None or not journal.in_flight(skip=applied_journal_seqs, through=through):
+            return applied
+        time.sleep(JOURNAL_POLL_SECONDS)
+
+
+def sync_documents() -> int:
+    """Apply journal segments committed by other workers. Returns the number applied."""
+    with document_lock:
+        applied = _apply_journal_segments()
+    if applied:
+        logger.info(f"Applied {applied} document journal segments from other workers")
+    return applied
+
+
+class _AppendedRows:
+    """Stands in for the index and chunk store to collect the rows replayed after the base rows."""
+
+    def __init__(self, base_count: int):
+        self.base_count = base_count
+        self.vectors: List[np.ndarray] = []
+        self.texts: List[str] = []
+
+    def add(self, x: np.ndarray) -> None:
+        self.vectors.append(np.asarray(x, dtype="float32"))
+
+    def extend(self, texts) -> None:
+        self.texts.extend(texts)
+
+    def __len__(self) -> int:
+        return self.base_count + len(self.texts)
+
+
+def compact_base_index() -> Dict:
+    """
+    Rewrite the cached base index, chunk store and document registry without tombstoned
+    chunks, folding in the committed healed segments and document journal. Works from the
+    cache files rather than this worker's live index, so every worker can reload the result.
+    Trained index parameters are reused and nothing is re-embedded.
+    """
+    _cache_dir().mkdir(parents=True, exist_ok=True)
+    lock_file = open(_cache_dir() / "compaction.lock", "w")
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return {"status": "busy"}
+
+        started = time.time()
+        index_path, chunks_path = _cache_paths()
+        source_index = read_index(index_path, mmap=True)
+        source_chunks = ChunkStore(chunks_path)
+        base_count = min(source_index.ntotal, len(source_chunks))
+        registry = DocumentRegistry.load(_documents_path(), limit=base_count)
+
+        # Replay healed segments and the journal as on startup, collecting the appended rows
+        rows = _AppendedRows(base_count)
+        healed_hashes = set()
+        healed_folded = []
+        for seq, records, embeddings in _iter_healed_segments():
+            healed_folded.append(seq)
+            keep = [i for i, r in enumerate(records)
+                    if r["hash"] not in healed_hashes and not source_chunks.contains_hash(r["hash"])]
+            rows.add(embeddings[keep])
+            rows.extend(records[i]["text"] for i in keep)
+            healed_hashes.update(records[i]["hash"] for i in keep)
+        journal = _get_document_journal()
+        folded = []
+        for seq, ops, embeddings in journal.committed():
+            apply_ops(rows, rows, registry, ops, embeddings)
+            folded.append(seq)
+
+        live = registry.live_mask(len(rows))
+        extra = np.concatenate(rows.vectors) if rows.vectors else np.zeros((0, source_index.d), dtype="float32")
+        base_keep = np.zeros(source_index.ntotal, dtype=bool)
+        base_keep[:base_count] = live[:base_count]
+        compacted = compact_index(source_index, base_keep, extra[live[base_count:]])
+
+        kept_chunks = itertools.chain(
+            (source_chunks[i] for i in np.flatnonzero(live[:base_count]).tolist()),
+            (text for text, keep in zip(rows.texts, live[base_count:].tolist()) if keep),
+        )
+        tmp_path = index_path.with_suffix(".faiss.tmp")
+        faiss.write_index(compacted, str(tmp_path))
+        os.replace(tmp_path, index_path)
+        write_chunk_store(chunks_path, kept_chunks)
+        registry.renumbered(live).save(_documents_path())
+        _write_index_meta(compacted, index_config_from_env())
+        if RETRIEVAL_MODE != "dense":
+            # Positions changed: rebuild the lexical index so workers can load it on reload
+            compacted_chunks = ChunkStore(chunks_path)
+            try:
+                build_lexical_index(compacted_chunks, _read_index_meta().get("generation", 0))
+            finally:
+                compacted_chunks.close()
+
+        # Only now drop what was folded in; segments committed meanwhile stay for replay
+        if folded:
+            journal.mark_folded(folded[-1])
+            journal.remove(folded)
+        if healed_folded:
+            healed_journal = _get_healed_journal()
+            healed_journal.mark_folded(healed_folded[-1])
+            healed_journal.remove(healed_folded)
+        source_chunks.close()
+
+        result = {
+            "status": "compacted",
+            "chunks": int(live.sum()),
+            "removed_chunks": int(len(live) - live.sum()),
+            "folded_journal_segments": len(folded),
+            "folded_healed_segments": len(healed_folded),
+            "documents": len(registry),
+            "seconds": round(time.time() - started, 2),
+        }
+        logger.info(f"Compacted base index: {result}")
+        return result
+    finally:
+        lock_file.close()
+
+
+def reload_base_index() -> None:
+    """Reopen the cached base index, chunks and documents (e.g. after a compaction)."""
+    global base_index, base_chunks
+    with document_lock, base_index_lock:
+        base_index, base_chunks = load_or_build_base_index(embedder)
+
+
+def compact_and_reload() -> Dict:
+    result = compact_base_index()
+    if result["status"] == "compacted":
+        reload_base_index()
+    return result
+
+
+def merge_lexical_delta() -> None:
+    """Fold chunks added to the lexical index since it was built into its arrays, once there are enough."""
+    index = base_lexical
+    if index is None or not index.needs_merge():
+        return
+    started = time.time()
+    merged = index.merge_delta(lock=base_index_lock)
+    logger.info(f"Merged {merged} chunks into the lexical index in {time.time() - started:.1f}s")
 
 
-def load_or_build_base_index(embedder: SentenceTransformer) -> Tuple[faiss.Index, List[str]]:
+def maintain_documents() -> None:
+    """
+    Reload after another worker's compaction, pick up its document changes, merge the
+    lexical delta and compact tombstones.
+    """
+    if _read_index_meta().get("generation", 0) != base_generation:
+        logger.info("Cached base index was rewritten by another worker, reloading it")
+        reload_base_index()
+    sync_documents()
+    merge_lexical_delta()
+
+    deleted = base_documents.deleted_count if base_documents is not None else 0
+    if COMPACT_TOMBSTONE_RATIO > 0 and deleted and deleted >= COMPACT_TOMBSTONE_RATIO * base_index.ntotal:
+        logger.info(f"{deleted} of {base_index.ntotal} chunks are tombstoned, compacting the base index...")
+        compact_and_reload()
+
+
+async def document_maintenance_loop() -> None:
+    while True:
+        await asyncio.sleep(DOCUMENT_SYNC_INTERVAL)
+        try:
+            # Own thread: a compaction must not hold up the query executor
+            await asyncio.to_thread(maintain_documents)
+        except Exception as e:
+            logger.warning(f"Document maintenance failed: {e}")
+
+
+def _process_memory() -> Dict:
+    """Resident memory of this process in MB, split into private (anon) and file-backed (mapped) pages."""
+    fields = {"VmRSS": "rss_mb", "RssAnon": "anon_mb", "RssFile": "file_mb", "RssShmem": "shmem_mb"}
+    memory = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    memory[fields[key]] = round(int(value.split()[0]) / 1024, 1)
+    except (OSError, ValueError):
+        pass  # Not Linux
+    return memory
+
+
+def load_or_build_base_index(embedder) -> Tuple[faiss.Index, ChunkStore]:
     index_path, chunks_path = _cache_paths()
     rebuild = _is_truthy_env(os.getenv("AUTORAG_REBUILD_CACHE")) or _is_truthy_env(os.getenv("AUTORAG_FORCE_REBUILD"))
+    config = index_config_from_env()
 
-    if index_path.exists() and chunks_path.exists() and not rebuild:
+    built_chunks: Optional[List[str]] = None
+    loaded_chunks = _open_cached_chunks(chunks_path) if index_path.exists() and not rebuild else None
+    if loaded_chunks is not None:
         logger.info("Loading cached base index and chunks...")
-        loaded_index = faiss.read_index(str(index_path))
-        with open(chunks_path, "rb") as f:
-            loaded_chunks = pickle.load(f)
-        logger.info(f"Loaded cached base index with {loaded_index.ntotal} vectors")
-        return loaded_index, loaded_chunks
-
-    logger.info("Building base index and chunks from scratch...")
-    # Removed dataset loading - using simple text data instead
-    # dataset = load_dataset("wikitext", "wikitext-103-v1", split="train")
-    
-    # Simple fallback data for demo
-    sample_texts = [
-        "AutoRAG is an automated retrieval augmented generation system.",
-        "Machine learning helps in building intelligent applications.",
-        "Natural language processing enables computers to understand human language.",
-        "FastAPI is a modern web framework for building APIs with Python.",
-        "Vector databases store and retrieve high-dimensional vectors efficiently."
-    ]
 
-    texts = []
-    # Use sample texts instead of dataset
-    for text in sample_texts:
-        if text:
-            texts.append(text)
+        cached_params = _read_index_meta().get("build_params", {})
+        if cached_params == build_params(config):
+            loaded_index = _open_base_index(index_path)
+            logger.info(f"Loaded cached base index with {loaded_index.ntotal} vectors ({describe_index(loaded_index)})")
+            if len(loaded_chunks) > loaded_index.ntotal:
+                # An interrupted ingestion can leave chunks written after the last index checkpoint
+                logger.warning(f"Chunk store has {len(loaded_chunks)} entries but the index has {loaded_index.ntotal} vectors; ignoring the extra chunks")
+                loaded_chunks.truncate(loaded_index.ntotal)
+            registry = DocumentRegistry.load(_documents_path(), limit=loaded_index.ntotal)
+            load_healed_segments(loaded_index, loaded_chunks)
+            load_documents(loaded_index, loaded_chunks, registry)
+            load_lexical_index(loaded_chunks)
+            return loaded_index, loaded_chunks
+
+        # Backend settings changed: re-index the cached chunks with the new backend
+        logger.info(f"Index configuration changed ({cached_params} -> {build_params(config)}), re-indexing cached chunks...")
+        built_chunks = list(loaded_chunks)
+        loaded_chunks.close()
+
+    if built_chunks is None:
+        logger.info("Building base index and chunks from scratch...")
+        # Positions in a previous registry refer to the old chunks
+        _documents_path().unlink(missing_ok=True)
+        # Removed dataset loading - using simple text data instead
+        # dataset = load_dataset("wikitext", "wikitext-103-v1", split="train")
+        
+        # Simple fallback data for demo
+        sample_texts = [
+            "AutoRAG is an automated retrieval augmented generation system.",
+            "Machine learning helps in building intelligent applications.",
+            "Natural language processing enables computers to understand human language.",
+            "FastAPI is a modern web framework for building APIs with Python.",
+            "Vector databases store and retrieve high-dimensional vectors efficiently."
+        ]
+
+        texts = []
+        # Use sample texts instead of dataset
+        for text in sample_texts:
+            if text:
+                texts.append(text)
 
-    logger.info(f"Loaded {len(texts)} texts from sample data")
+        logger.info(f"Loaded {len(texts)} texts from sample data")
 
-    built_chunks: List[str] = []
-    for t in texts:
-        built_chunks.extend(chunk_text(t))
+        built_chunks = create_chunker(embedder).chunk_documents(texts).texts(texts)
 
-    logger.info(f"Created {len(built_chunks)} base chunks")
+        logger.info(f"Created {len(built_chunks)} base chunks")
 
-    logger.info("Creating embeddings and FAISS index...")
+    logger.info(f"Creating embeddings and {config['index_type']} FAISS index...")
     base_embeddings = embedder.encode(
         built_chunks,
         batch_size=32,
@@ -152,16 +858,26 @@ def load_or_build_base_index(embedder: SentenceTransformer) -> Tuple[faiss.Index
     base_embeddings = np.array(base_embeddings).astype("float32")
     faiss.normalize_L2(base_embeddings)
 
-    built_index = faiss.IndexFlatIP(base_embeddings.shape[1])
-    built_index.add(base_embeddings)
+    built_index = build_index(base_embeddings, config)
 
     index_path.parent.mkdir(parents=True, exist_ok=True)
-    faiss.write_index(built_index, str(index_path))
-    with open(chunks_path, "wb") as f:
-        pickle.dump(built_chunks, f)
-
-    logger.info(f"Saved base index cache to {index_path}")
-    return built_index, built_chunks
+    # Write-then-rename: other workers may have the previous file mapped
+    tmp_path = index_path.with_suffix(".faiss.tmp")
+    faiss.write_index(built_index, str(tmp_path))
+    os.replace(tmp_path, index_path)
+    write_chunk_store(chunks_path, built_chunks)
+    _write_index_meta(built_index, config)
+
+    logger.info(f"Saved base index cache to {index_path} ({describe_index(built_index)})")
+    if INDEX_MMAP:
+        # Drop the heap copy in favour of the shared mapping
+        built_index = _open_base_index(index_path)
+    chunk_store = ChunkStore(chunks_path)
+    registry = DocumentRegistry.load(_documents_path(), limit=built_index.ntotal)
+    load_healed_segments(built_index, chunk_store)
+    load_documents(built_index, chunk_store, registry)
+    load_lexical_index(chunk_store)
+    return built_index, chunk_store
 
 
 class QueryRequest(BaseModel):
@@ -169,6 +885,16 @@ class QueryRequest(BaseModel):
     threshold: float = 0.5
     max_results: int = 5
     use_healing: bool = True
+    nprobe: Optional[int] = None  # IVF backends: inverted lists probed per query
+    ef_search: Optional[int] = None  # HNSW backend: search beam width
+    heal_deadline: Optional[float] = None  # Seconds allowed for the healing source lookups (default: AUTORAG_HEAL_DEADLINE)
+    include_timings: bool = False  # Add the per-stage timing breakdown to the response
+
+
+class RetrievedDocument(BaseModel):
+    text: str
+    score: float  # Cosine similarity to the query (BM25 query-term coverage in lexical mode)
+    source: str  # "base" or "healed"
 
 
 class QueryResponse(BaseModel):
@@ -179,63 +905,78 @@ class QueryResponse(BaseModel):
     trust_score_after: float
     healing_triggered: bool
     healing_successful: bool
+    healing_partial: bool = False  # The healing deadline passed before all sources answered
     sources_used: List[str]
+    documents: List[RetrievedDocument] = []  # Chunks the answer was built from, with their scores
+    cached: bool = False  # Served from the answer cache (or shared with a concurrent identical query)
+    timings: Optional[Dict[str, float]] = None  # Seconds per pipeline stage, when include_timings is set
     timestamp: str
 
 
-def chunk_text(text: str, size: int = 500, overlap: int = 50) -> List[str]:
-    """Split text into overlapping chunks."""
-    chunks = []
-    i = 0
-    while i < len(text):
-        chunks.append(text[i:i+size])
-        i += size - overlap
-    return chunks
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    threshold: float = 0.5
+    max_results: int = 5
+    use_healing: bool = True
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+    heal_deadline: Optional[float] = None
 
 
-def clean_text(text: str) -> str:
-    """Enhanced text cleaning with better noise removal."""
-    if not isinstance(text, str):
-        return ""
-    
-    # Remove excessive whitespace and newlines first
-    text = re.sub(r'\n+', ' ', text)
-    text = re.sub(r'\r+', ' ', text)
-    text = re.sub(r'\t+', ' ', text)
-    
-    # Remove URLs
-    text = re.sub(r'http[s]?://\S+', '', text)
-    text = re.sub(r'www\.\S+', '', text)
-    
-    # Remove email addresses
-    text = re.sub(r'\S+@\S+', '', text)
-    
-    # Remove common web noise patterns (case-insensitive)
-    for pattern in BAD_PATTERNS:
-        text = re.sub(pattern, "", text, flags=re.IGNORECASE)
-    
-    # Remove markdown headers and separators
-    text = re.sub(r'^=+\s*$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^#+\s*', '', text, flags=re.MULTILINE)
-    
-    # Remove excessive special characters but keep basic punctuation
-    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\'\"\&\%\$\#]', ' ', text)
-    
-    # Remove multiple spaces
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
-    
-    # Remove very short words that are likely noise (but keep common short words)
-    words = text.split()
-    common_short = ['ai', 'it', 'we', 'is', 'an', 'a', 'of', 'to', 'in', 'on', 'at', 'be', 'as', 'or', 'if']
-    words = [w for w in words if len(w) > 2 or w.lower() in common_short]
-    text = ' '.join(words)
-    
-    # Keep only substantial text (lower threshold - 50 chars minimum)
-    if len(text) < 50:
-        return ""
-    
-    return text
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
+    healing_triggered_count: int
+    healed_topics_count: int
+
+
+class DocumentIn(BaseModel):
+    id: Optional[str] = None  # Generated when missing; an existing id is replaced
+    text: str
+
+
+class DocumentsRequest(BaseModel):
+    documents: List[DocumentIn]
+
+
+class DocumentResult(BaseModel):
+    id: str
+    chunks: int
+    status: str  # "created" or "updated"
+
+
+class DocumentsResponse(BaseModel):
+    documents: List[DocumentResult]
+    base_index_size: int
+    tombstoned_chunks: int
+
+
+def create_embedder():
+    """The embedding model on the configured backend (SentenceTransformer or OnnxEmbedder)."""
+    return load_embedder(EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, _cache_dir(),
+                         min_cosine=ONNX_MIN_COSINE, threads=ONNX_THREADS)
+
+
+def _embedding_cache_key() -> str:
+    """Query embedding cache key: quantized ONNX embeddings differ slightly from the torch ones."""
+    variant = getattr(embedder, "variant", None)
+    return f"{EMBEDDING_MODEL_NAME}:{variant}" if variant else EMBEDDING_MODEL_NAME
+
+
+def create_chunker(model=None) -> SentenceChunker:
+    """Sentence-aware chunker sized to the embedding model's tokenizer and input limit."""
+    return SentenceChunker.for_model(model, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS)
+
+
+def get_chunker() -> SentenceChunker:
+    global chunker
+    if chunker is None:
+        chunker = create_chunker(embedder)
+    return chunker
+
+
+def chunk_text(text: str) -> List[str]:
+    """Split text into sentence-aligned, overlapping chunks that fit the embedding model."""
+    return get_chunker().chunk(text)
 
 
 def clean_answer(text: str, max_sentences: int = 5, min_sentence_length: int = 30) -> str:
@@ -282,303 +1023,557 @@ def clean_answer(text: str, max_sentences: int = 5, min_sentence_length: int = 3
     return result
 
 
-def retrieve_from(index: faiss.Index, chunks: List[str], query: str, k: int = 3) -> Tuple[List[str], float]:
-    """Retrieve relevant chunks from the index."""
-    if index is None or len(chunks) == 0:
-        return [], 0.0
-    
+def encode_queries(queries: List[str]) -> np.ndarray:
+    """
+    Encode queries into an (n, dim) L2-normalized matrix. Cached embeddings are reused
+    and all misses are encoded in a single batched forward pass.
+    """
+    cached = [query_embedding_cache.get(_embedding_cache_key(), query) for query in queries]
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+    if missing:
+        encoded = embedder.encode([queries[i] for i in missing], batch_size=max(32, len(missing)))
+        encoded = np.ascontiguousarray(encoded, dtype="float32")
+        faiss.normalize_L2(encoded)
+        for i, vector in zip(missing, encoded):
+            cached[i] = vector
+            query_embedding_cache.put(_embedding_cache_key(), queries[i], vector)
+    return np.ascontiguousarray(np.stack(cached), dtype="float32")
+
+
+def encode_query(query: str) -> np.ndarray:
+    """Encode a query into a (1, dim) L2-normalized matrix, using the query embedding cache."""
+    return encode_queries([query])
+
+
+def _retrieve_base_lexical(q: Optional[np.ndarray], queries: List[str], k: int,
+                           search_kwargs: Dict) -> RetrievalResult:
+    """
+    Base index retrieval in lexical or hybrid mode (the caller holds base_index_lock).
+    Lexical: BM25 ranking, scored by query-term coverage. Hybrid: the BM25 and dense
+    candidate lists are fused by reciprocal rank and every fused chunk is scored by its
+    cosine similarity, so the relevance threshold means the same as in dense mode; chunks
+    only BM25 found are scored from their stored vectors.
+    """
+    # Chunks appended since the last query (healing, document updates) go to the delta;
+    # merging it into the arrays is left to the maintenance loop
+    if base_lexical.n_docs < len(base_chunks):
+        base_lexical.add(base_chunks[i] for i in range(base_lexical.n_docs, len(base_chunks)))
+    exclude = base_documents.is_deleted if base_documents is not None and base_documents.deleted_count else None
+
+    if q is None:
+        _, lex_ids, lex_coverage = base_lexical.search(queries, k, exclude=exclude)
+        return RetrievalResult.from_search(base_chunks, lex_coverage, lex_ids, MIN_SCORE)
+
+    depth = min(max(k, HYBRID_CANDIDATES), len(base_chunks))
+    _, lex_ids, _ = base_lexical.search(queries, depth, exclude=exclude)
+    dense_scores, dense_ids = search_live(base_index, q, depth, base_documents, **search_kwargs)
+
+    ids = np.full((len(queries), k), -1, dtype=np.int64)
+    scores = np.zeros((len(queries), k), dtype=np.float32)
+    for row in range(len(queries)):
+        fused_ids, _ = reciprocal_rank_fusion([dense_ids[row], lex_ids[row]], k)
+        cosine = {i: s for i, s in zip(dense_ids[row].tolist(), dense_scores[row].tolist()) if i >= 0}
+        lexical_only = [i for i in fused_ids.tolist() if i not in cosine]
+        if lexical_only:
+            cosine.update(zip(lexical_only, (reconstruct_rows(base_index, lexical_only) @ q[row]).tolist()))
+        ids[row, :len(fused_ids)] = fused_ids
+        scores[row, :len(fused_ids)] = [cosine[i] for i in fused_ids.tolist()]
+    return RetrievalResult.from_search(base_chunks, scores, ids, MIN_SCORE)
+
+
+def retrieve_batch(index: faiss.Index, chunks: Sequence[str], queries: List[str], k: int = 3,
+                   params=None) -> RetrievalResult:
+    """
+    Retrieve relevant chunks for several queries with one encode call and one
+    matrix search. Returns one result row per query, with hits scoring at most
+    AUTORAG_MIN_SCORE masked out.
+    """
+    if index is None or len(chunks) == 0 or not queries:
+        return RetrievalResult.empty(len(queries))
+
     try:
-        q = embedder.encode([query]).astype("float32")
-        faiss.normalize_L2(q)
+        lexical = index is base_index and base_lexical is not None
+        q = None
+        if not (lexical and RETRIEVAL_MODE == "lexical"):
+            with pipeline_metrics.span("query_encode"):
+                q = encode_queries(queries)
 
         num_results = min(k, len(chunks))
-        scores, idxs = index.search(q, num_results)
-        
-        if len(idxs[0]) == 0:
-            return [], 0.0
-        
-        # Filter by minimum score threshold and get docs
-        docs = []
-        valid_scores = []
-        for i, idx in enumerate(idxs[0]):
-            if scores[0][i] > 0.15:  # Slightly higher threshold for better quality
-                docs.append(chunks[idx])
-                valid_scores.append(scores[0][i])
-        
-        # Return average of valid scores
-        avg_score = float(np.mean(valid_scores)) if valid_scores else 0.0
-        return docs, avg_score
+        search_kwargs = {"params": params} if params is not None else {}
+        if index is base_index:
+            # Healing and document updates may change the base index concurrently
+            with base_index_lock, pipeline_metrics.span("base_search"):
+                if lexical:
+                    return _retrieve_base_lexical(q, queries, num_results, search_kwargs)
+                scores, idxs = search_live(index, q, num_results, base_documents, **search_kwargs)
+                return RetrievalResult.from_search(chunks, scores, idxs, MIN_SCORE)
+        with pipeline_metrics.span("heal_search"):
+            scores, idxs = index.search(q, num_results, **search_kwargs)
+            return RetrievalResult.from_search(chunks, scores, idxs, MIN_SCORE)
     except Exception as e:
-        logger.error(f"Error in retrieve_from: {e}")
-        return [], 0.0
+        logger.error(f"Error in retrieve_batch: {e}")
+        return RetrievalResult.empty(len(queries))
+
+
+def retrieve_from(index: faiss.Index, chunks: Sequence[str], query: str, k: int = 3, params=None) -> RetrievalResult:
+    """Retrieve relevant chunks from the index. `params` are optional faiss SearchParameters."""
+    return retrieve_batch(index, chunks, [query], k=k, params=params)
+
+
+def _get_outbound() -> OutboundHTTP:
+    """Return the outbound HTTP layer (per-host pools, rate limits and circuit breakers of this worker)."""
+    global outbound
+    if outbound is None:
+        outbound = OutboundHTTP(
+            headers=HEADERS,
+            timeout=HTTP_TIMEOUT,
+            max_connections=HTTP_MAX_CONNECTIONS,
+            rate=HTTP_RATE,
+            burst=HTTP_BURST,
+            max_wait=HTTP_RATE_MAX_WAIT,
+            failure_threshold=BREAKER_FAILURES,
+            cooldown=BREAKER_COOLDOWN,
+            host_rates=HTTP_HOST_RATES,
+        )
+    return outbound
+
+
+def _get_cpu_executor() -> ThreadPoolExecutor:
+    """Return the bounded executor used for encoding, searching and HTML parsing."""
+    global cpu_executor
+    if cpu_executor is None:
+        cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="autorag-cpu")
+    return cpu_executor
 
 
-def self_heal(query: str) -> Tuple[List[str], List[str]]:
+async def run_cpu_bound(func, *args, **kwargs):
     """
-    Enhanced self-healing with better source prioritization and cleaning.
-    Returns: (chunks, sources)
+    Run a CPU-bound callable on the bounded executor without blocking the event loop.
+    The caller's context goes along, so its spans count towards the request's timings.
     """
-    texts = []
-    sources = []
-    
-    # Try Wikipedia API first (more reliable and clean)
-    try:
-        # Try multiple title formats (Wikipedia titles are case-sensitive and capitalized)
-        title_variants = [
-            query.replace(" ", "_"),  # Original: "quantum computing" -> "quantum_computing"
-            query.title().replace(" ", "_"),  # Title case: "Quantum Computing" -> "Quantum_Computing"
-            query.capitalize().replace(" ", "_"),  # First word capitalized: "Quantum_computing"
-        ]
-        
-        wiki_found = False
-        for title_encoded in title_variants:
-            api_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{quote(title_encoded, safe='')}"
-            logger.debug(f"Trying Wikipedia: {title_encoded}")
-            resp = requests.get(api_url, headers=HEADERS, timeout=10)
-            
-            if resp.status_code == 200:
-                data = resp.json()
-                extract = data.get("extract", "")
-                if extract and len(extract) > 50:
-                    cleaned = clean_text(extract)
-                    if cleaned and len(cleaned) > 50:
-                        texts.append(cleaned)
-                        sources.append(f"Wikipedia: {title_encoded}")
-                        logger.info(f" Found Wikipedia summary for: {title_encoded} ({len(cleaned)} chars)")
-                        wiki_found = True
-                        break
-        
-        if not wiki_found:
-            logger.info("Wikipedia direct lookup failed, trying Wikipedia search API...")
-            # Try Wikipedia's search API directly (more reliable than DuckDuckGo)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_cpu_executor(), partial(context.run, func, *args, **kwargs))
+
+
+async def _run_base_search_batch(key: Tuple, queries: List[str]) -> RetrievalResult:
+    k, nprobe, ef_search = key
+    # Shared by the coalesced requests: each one times its wait as base_retrieval instead
+    with detached_from_request():
+        return await run_cpu_bound(
+            retrieve_batch, base_index, base_chunks, queries, k=k,
+            params=search_params(base_index, nprobe=nprobe, ef_search=ef_search)
+        )
+
+
+def _get_query_batcher() -> QueryBatcher:
+    """Return the coalescer that batches concurrent base index lookups."""
+    global query_batcher
+    if query_batcher is None:
+        query_batcher = QueryBatcher(_run_base_search_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=BATCH_WAIT_MS)
+    return query_batcher
+
+
+async def search_base(query: str, k: int, nprobe: Optional[int] = None,
+                      ef_search: Optional[int] = None) -> RetrievalResult:
+    """
+    Retrieve from the base index. Concurrent calls with the same settings that arrive
+    within AUTORAG_BATCH_WAIT_MS share one batched encode and index search.
+    """
+    with pipeline_metrics.span("base_retrieval"):
+        return await _get_query_batcher().submit(query, key=(k, nprobe, ef_search))
+
+
+def base_index_version() -> str:
+    """
+    Version of what base retrieval can return, for answer cache keys. Healing and document
+    updates append rows, deletes add tombstones and a compaction bumps the generation; all
+    workers that have applied the same changes report the same version.
+    """
+    deleted = base_documents.deleted_count if base_documents is not None else 0
+    return (f"{base_generation}:{base_index.ntotal if base_index is not None else 0}:{deleted}:"
+            f"{_applied_segments_digest()}")
+
+
+_segments_digest: Tuple[Tuple, str] = ((), "")
+
+
+def _applied_segments_digest() -> str:
+    """
+    Digest of the healed and journal segments applied since the cache generation was loaded:
+    workers whose row counts match but whose healed contents differ get different versions.
+    """
+    global _segments_digest
+
+    # The applied sets only grow until a reload replaces them
+    state = (id(applied_healed_seqs), len(applied_healed_seqs), id(applied_journal_seqs), len(applied_journal_seqs))
+    if _segments_digest[0] != state:
+        text = f"{sorted(applied_healed_seqs)}:{sorted(applied_journal_seqs)}"
+        _segments_digest = (state, hashlib.sha1(text.encode("utf-8")).hexdigest()[:12])
+    return _segments_digest[1]
+
+
+def _get_answer_cache() -> AnswerCache:
+    """Return the shared answer cache, creating it on first use (AUTORAG_ANSWER_CACHE_DB adds the disk tier)."""
+    global answer_cache
+    if answer_cache is None:
+        db_setting = (ANSWER_CACHE_DB or "").strip()
+        db_path = Path(db_setting) if db_setting.lower() not in {"", "0", "off", "false", "no", "none"} else None
+        answer_cache = AnswerCache(ANSWER_CACHE_SIZE, ttl_seconds=ANSWER_CACHE_TTL, db_path=db_path)
+    return answer_cache
+
+
+def _answer_cache_key(query: str, threshold: float, k: int, use_healing: bool,
+                      nprobe: Optional[int], ef_search: Optional[int]) -> str:
+    return answer_cache_key(
+        query, base_index_version(), threshold=threshold, k=k, use_healing=use_healing, nprobe=nprobe,
+        ef_search=ef_search, retrieval=RETRIEVAL_MODE, min_score=MIN_SCORE, model=_embedding_cache_key(),
+    )
+
+
+def _is_cacheable_answer(result: Dict) -> bool:
+    # A failed healing attempt may be a transient network error, and one cut short by the
+    # healing deadline is incomplete: let the next request retry it
+    if result.get("healing_partial"):
+        return False
+    return not result["healing_triggered"] or result["healing_successful"]
+
+
+def _get_fetch_cache() -> Optional[TieredFetchCache]:
+    """
+    Return the shared fetch cache, creating it on first use.
+    The disk tier defaults to <cache dir>/fetch_cache.sqlite; set AUTORAG_FETCH_CACHE_DB=off to disable it.
+    """
+    global fetch_cache
+    if fetch_cache is None:
+        disk = None
+        db_setting = FETCH_CACHE_DB if FETCH_CACHE_DB is not None else str(_cache_dir() / "fetch_cache.sqlite")
+        if db_setting and db_setting.strip().lower() not in {"0", "off", "false", "no", "none"}:
             try:
-                # Use Wikipedia's search API
-                search_api_url = "https://en.wikipedia.org/w/api.php"
-                search_params = {
-                    "action": "query",
-                    "format": "json",
-                    "list": "search",
-                    "srsearch": query,
-                    "srlimit": 3
-                }
-                search_resp = requests.get(search_api_url, params=search_params, headers=HEADERS, timeout=10)
-                
-                if search_resp.status_code == 200:
-                    search_data = search_resp.json()
-                    search_results = search_data.get("query", {}).get("search", [])
-                    logger.info(f"Found {len(search_results)} Wikipedia search results via API")
-                    
-                    for result in search_results:
-                        page_title = result.get("title", "")
-                        if page_title:
-                            # Get summary for this page
-                            page_title_encoded = quote(page_title, safe='')
-                            summary_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{page_title_encoded}"
-                            summary_resp = requests.get(summary_url, headers=HEADERS, timeout=10)
-                            if summary_resp.status_code == 200:
-                                summary_data = summary_resp.json()
-                                extract = summary_data.get("extract", "")
-                                if extract and len(extract) > 50:
-                                    cleaned = clean_text(extract)
-                                    if cleaned and len(cleaned) > 50:
-                                        texts.append(cleaned)
-                                        sources.append(f"Wikipedia: {page_title}")
-                                        logger.info(f" Found Wikipedia page via search: {page_title} ({len(cleaned)} chars)")
-                                        break  # Use first good result
-                            else:
-                                logger.debug(f"Wikipedia API failed for {page_title_encoded}: {summary_resp.status_code}")
-                
-                # Fallback: Try DuckDuckGo if Wikipedia search API fails
-                if not texts:
-                    logger.info("Wikipedia API search failed, trying DuckDuckGo...")
-                    with DDGS() as ddgs:
-                        wiki_results = list(ddgs.text(f"{query} site:wikipedia.org", max_results=3))
-                        logger.info(f"Found {len(wiki_results)} Wikipedia results via DuckDuckGo")
-                        for result in wiki_results:
-                            url = result.get("href", "")
-                            if "wikipedia.org/wiki/" in url:
-                                # Extract page title from URL and decode it
-                                page_title = url.split("/wiki/")[-1].split("#")[0].split("?")[0]
-                                page_title = unquote(page_title)
-                                # Get summary for this page
-                                page_title_encoded = quote(page_title, safe='')
-                                summary_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{page_title_encoded}"
-                                summary_resp = requests.get(summary_url, headers=HEADERS, timeout=10)
-                                if summary_resp.status_code == 200:
-                                    summary_data = summary_resp.json()
-                                    extract = summary_data.get("extract", "")
-                                    if extract and len(extract) > 50:
-                                        cleaned = clean_text(extract)
-                                        if cleaned and len(cleaned) > 50:
-                                            texts.append(cleaned)
-                                            sources.append(f"Wikipedia: {page_title}")
-                                            logger.info(f" Found Wikipedia page via DuckDuckGo: {page_title} ({len(cleaned)} chars)")
-                                            break
+                disk = SQLiteFetchCache(Path(db_setting))
             except Exception as e:
-                logger.warning(f"Wikipedia search failed: {e}")
-                pass
-    except Exception as e:
-        logger.warning(f"Wikipedia API failed: {e}")
-        pass
-    
-    # Web scraping as fallback (but with better cleaning and selection)
-    # Try web if we have less than 2 good sources
-    if len(texts) < 2:
-        try:
-            with DDGS() as ddgs:
-                # Better search query - more specific to avoid irrelevant results
-                # Remove common question words and focus on key terms
-                query_words = [w for w in query.lower().split() if w not in ['what', 'is', 'are', 'how', 'does', 'the', 'a', 'an']]
-                search_query = " ".join(query_words[:5])  # Take first 5 meaningful words
-                if not search_query:
-                    search_query = query
-                
-                # Add context terms to improve relevance
-                search_query = f"{search_query} definition explanation what is"
-                logger.info(f"Web search query: {search_query}")
-                web_results = list(ddgs.text(search_query, max_results=5))
-                logger.info(f"Found {len(web_results)} web search results")
-                
-                for idx, r in enumerate(web_results, 1):
-                    url = r.get("href", "")
-                    title = r.get("title", "")[:50]
-                    logger.info(f"  [{idx}/{len(web_results)}] Processing: {url[:80]} (title: {title})")
-                    
-                    # Skip Wikipedia URLs as we already tried those
-                    if "wikipedia.org" in url:
-                        logger.debug(f"    Skipping Wikipedia URL")
-                        continue
-                        
-                    try:
-                        logger.info(f"    Fetching URL...")
-                        resp = requests.get(url, headers=HEADERS, timeout=10, allow_redirects=True)
-                        logger.info(f"    Status: {resp.status_code}, Content-Type: {resp.headers.get('content-type', 'unknown')}")
-                        
-                        if resp.status_code == 200 and resp.headers.get('content-type', '').startswith('text/html'):
-                            logger.info(f"    Parsing HTML ({len(resp.text)} chars)...")
-                            soup = BeautifulSoup(resp.text, "html.parser")
-                            
-                            # Remove script and style elements
-                            for script in soup(["script", "style", "meta", "link", "nav", "header", "footer", "aside"]):
-                                script.decompose()
-                            
-                            # Try to get main content areas with better selection
-                            main_content = None
-                            
-                            # Strategy 1: Look for main/article tags
-                            main_articles = soup.find_all(['main', 'article'])
-                            logger.info(f"    Strategy 1: Found {len(main_articles)} main/article tags")
-                            for tag in main_articles:
-                                text = tag.get_text(separator=' ', strip=True)
-                                logger.info(f"    Main/article text length (raw): {len(text)}")
-                                if text and len(text) > 150:  # Lower threshold
-                                    cleaned = clean_text(text)
-                                    logger.info(f"    After cleaning: {len(cleaned)} chars")
-                                    if cleaned and len(cleaned) > 150:
-                                        main_content = cleaned
-                                        logger.info(f"     Strategy 1 SUCCESS: Found {len(main_content)} chars in main/article")
-                                        break
-                            
-                            # Strategy 2: Try divs with content-related classes
-                            if not main_content:
-                                content_divs = soup.find_all('div', class_=re.compile(r'content|main|article|post|entry|text|body|description|paragraph', re.I))
-                                logger.info(f"    Strategy 2: Found {len(content_divs)} content divs")
-                                for tag in content_divs:
-                                    text = tag.get_text(separator=' ', strip=True)
-                                    if text and len(text) > 150:
-                                        cleaned = clean_text(text)
-                                        if cleaned and len(cleaned) > 150:
-                                            main_content = cleaned
-                                            logger.info(f"     Strategy 2 SUCCESS: Found {len(main_content)} chars in content div")
-                                            break
-                            
-                            # Strategy 3: Try paragraphs - collect substantial paragraphs
-                            if not main_content:
-                                all_paragraphs = soup.find_all('p')
-                                logger.info(f"    Strategy 3: Found {len(all_paragraphs)} paragraph tags")
-                                paragraphs = []
-                                for p in all_paragraphs:
-                                    text = p.get_text(separator=' ', strip=True)
-                                    cleaned = clean_text(text)
-                                    if cleaned and len(cleaned) > 50:  # Individual paragraph threshold
-                                        paragraphs.append(cleaned)
-                                logger.info(f"    Valid paragraphs after cleaning: {len(paragraphs)}")
-                                if paragraphs:
-                                    # Combine paragraphs
-                                    combined = ' '.join(paragraphs[:10])  # Limit to first 10 paragraphs
-                                    logger.info(f"    Combined paragraphs length: {len(combined)}")
-                                    if len(combined) > 200:
-                                        main_content = combined
-                                        logger.info(f"     Strategy 3 SUCCESS: Found {len(main_content)} chars from paragraphs")
-                            
-                            # Strategy 4: Fallback to body text with noise removal
-                            if not main_content:
-                                body = soup.find('body')
-                                if body:
-                                    logger.info(f"    Strategy 4: Trying body text extraction...")
-                                    # Remove navigation and other noise
-                                    for noise in body.find_all(['nav', 'header', 'footer', 'script', 'style', 'aside']):
-                                        noise.decompose()
-                                    text = body.get_text(separator=' ', strip=True)
-                                    logger.info(f"    Body text length (raw): {len(text)}")
-                                    if text and len(text) > 200:
-                                        cleaned = clean_text(text)
-                                        logger.info(f"    Body text length (cleaned): {len(cleaned)}")
-                                        if cleaned and len(cleaned) > 150:  # More lenient for body text
-                                            main_content = cleaned
-                                            logger.info(f"     Strategy 4 SUCCESS: Found {len(main_content)} chars in body")
-                                else:
-                                    logger.info(f"    No body tag found")
-                            
-                            if main_content:
-                                texts.append(main_content)
-                                sources.append(f"Web: {url[:60]}...")
-                                logger.info(f" Extracted {len(main_content)} chars from: {url[:60]}")
-                            else:
-                                # Last resort: Try minimal cleaning - just get paragraphs with minimal filtering
-                                logger.info(f"    All strategies failed, trying minimal cleaning fallback...")
-                                paragraphs = []
-                                for p in soup.find_all('p'):
-                                    raw_text = p.get_text(separator=' ', strip=True)
-                                    # Minimal cleaning - just remove excessive whitespace
-                                    raw_text = re.sub(r'\s+', ' ', raw_text).strip()
-                                    if raw_text and len(raw_text) > 50 and not raw_text.isupper():  # Skip ALL CAPS noise
-                                        paragraphs.append(raw_text)
-                                
-                                logger.info(f"    Minimal cleaning found {len(paragraphs)} valid paragraphs")
-                                if paragraphs:
-                                    combined = ' '.join(paragraphs[:5])  # Take first 5 paragraphs
-                                    logger.info(f"    Combined (before final cleaning): {len(combined)} chars")
-                                    if len(combined) > 100:
-                                        # Apply minimal cleaning
-                                        combined = re.sub(r'http[s]?://\S+', '', combined)
-                                        combined = re.sub(r'\s+', ' ', combined).strip()
-                                        logger.info(f"    Combined (after final cleaning): {len(combined)} chars")
-                                        if len(combined) > 100:
-                                            texts.append(combined)
-                                            sources.append(f"Web: {url[:60]}...")
-                                            logger.info(f"     Fallback SUCCESS: Extracted {len(combined)} chars (minimal cleaning)")
-                                else:
-                                    logger.warning(f"    ❌ FAILED: Could not extract any content. Checked {len(soup.find_all('p'))} paragraphs but none met criteria.")
-                        else:
-                            logger.warning(f"    Skipping - Status: {resp.status_code}, Content-Type: {resp.headers.get('content-type', 'unknown')}")
-                            continue
-                    except Exception as e:
-                        logger.warning(f"    ❌ Error processing URL {url[:60]}: {str(e)[:100]}")
-                        continue
-                    
-                    if len(texts) >= 3:  # Limit to avoid too much noise
-                        break
-        except Exception as e:
-            logger.warning(f"Web search failed: {e}")
-            pass
+                logger.warning(f"Fetch cache disk tier unavailable ({db_setting}): {e}")
+        if FETCH_CACHE_SIZE <= 0 and disk is None:
+            return None
+        fetch_cache = TieredFetchCache(MemoryFetchCache(FETCH_CACHE_SIZE), disk)
+    return fetch_cache
+
 
-    heal_chunks = []
-    for i, t in enumerate(texts):
-        if t and len(t.strip()) > 50:  # Lower threshold to get more content
-            chunks = chunk_text(t)
-            heal_chunks.extend(chunks)
-            logger.debug(f"Source {i+1}: {len(chunks)} chunks from {len(t)} chars")
+async def _read_body(resp: "httpx.Response", max_bytes: Optional[int]) -> str:
+    """Read a streamed response body, stopping after max_bytes (None for no limit)."""
+    if max_bytes is None:
+        await resp.aread()
+        return resp.text
+
+    chunks = []
+    size = 0
+    async for chunk in resp.aiter_bytes():
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            logger.info(f"    Truncated body at {max_bytes} bytes")
+            break
+    # A multi-byte character cut at the cap decodes to a replacement character
+    return b"".join(chunks)[:max_bytes].decode(resp.encoding or "utf-8", errors="replace")
+
+
+async def cached_get(url: str, params: Optional[Dict] = None, ttl: float = FETCH_TTL, extract=None,
+                     max_bytes: Optional[int] = None) -> CachedResponse:
+    """
+    GET a URL through the fetch cache.
+
+    Fresh entries are returned without network access. Stale 200 entries are
+    revalidated with If-None-Match/If-Modified-Since, and 404/410 responses are
+    cached for FETCH_NEGATIVE_TTL. If `extract` is given, it is applied to HTML
+    bodies on the CPU executor and its result is cached instead of the raw page;
+    other content types are not downloaded. Bodies are streamed and cut off
+    after `max_bytes`.
+    """
+    cache = _get_fetch_cache()
+    key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+    entry = await cache.aget(key) if cache is not None else None
+    now = time.time()
+
+    if entry is not None and entry.is_fresh(now):
+        cache.record("negative_hit" if entry.status_code in NEGATIVE_STATUS_CODES else "hit")
+        return entry
+
+    headers = {}
+    if entry is not None and entry.can_revalidate():
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    # Page downloads (extract given) are timed as heal_page_fetch; API calls are timed by their callers
+    with pipeline_metrics.span("heal_page_fetch") if extract is not None else nullcontext():
+        async with _get_outbound().stream("GET", url, params=params, headers=headers) as resp:
+            if resp.status_code == 304 and entry is not None:
+                entry = entry._replace(stored_at=now, expires_at=now + ttl)
+                await cache.aput(key, entry)
+                cache.record("revalidated")
+                return entry
+
+            content_type = resp.headers.get("content-type", "")
+            html = None
+            body = ""
+            if resp.status_code == 200:
+                if extract is None:
+                    body = await _read_body(resp, max_bytes)
+                elif content_type.startswith("text/html"):
+                    html = await _read_body(resp, max_bytes)
+
+    if html is not None:
+        logger.info(f"    Parsing HTML ({len(html)} chars)...")
+        with pipeline_metrics.span("heal_html_parse"):
+            body = await run_cpu_bound(extract, html, url) or ""
+
+    fetched = CachedResponse(
+        status_code=resp.status_code,
+        body=body,
+        content_type=content_type,
+        etag=resp.headers.get("etag"),
+        last_modified=resp.headers.get("last-modified"),
+        stored_at=now,
+        expires_at=now + (ttl if resp.status_code == 200 else FETCH_NEGATIVE_TTL),
+    )
+    if cache is not None:
+        if resp.status_code == 200 or resp.status_code in NEGATIVE_STATUS_CODES:
+            await cache.aput(key, fetched)
+        cache.record("miss")
+    return fetched
+
+
+def _get_search_provider() -> SearchProvider:
+    """Return the web search provider configured by AUTORAG_SEARCH_PROVIDER, creating it on first use."""
+    global search_provider
+    if search_provider is None:
+        search_provider = create_search_provider(SEARCH_PROVIDER, timeout=HTTP_TIMEOUT)
+    return search_provider
+
+
+def _web_search_text(search_query: str, max_results: int) -> List[Dict]:
+    """Blocking web text search (run in a worker thread): [{title, href, body}, ...]."""
+    provider = _get_search_provider()
+    if provider.host is None:
+        return provider.text(search_query, max_results)
+    with _get_outbound().guard_sync(provider.host):
+        return provider.text(search_query, max_results)
+
+
+async def _fetch_wikipedia_summary(title: str) -> Optional[str]:
+    """Fetch and clean the REST summary extract for a Wikipedia page title."""
+    import httpx
+
+    summary_url = f"{WIKIPEDIA_URL}/api/rest_v1/page/summary/{quote(title, safe='')}"
+    try:
+        resp = await cached_get(summary_url, ttl=FETCH_TTL)
+    except (httpx.HTTPError, OutboundRefused) as e:
+        logger.debug(f"Wikipedia request failed for {title}: {e}")
+        return None
+
+    if resp.status_code != 200:
+        logger.debug(f"Wikipedia API failed for {title}: {resp.status_code}")
+        return None
+
+    extract = json.loads(resp.body).get("extract", "")
+    if extract and len(extract) > 50:
+        with pipeline_metrics.span("heal_clean"):
+            cleaned = clean_text(extract)
+        if cleaned and len(cleaned) > 50:
+            return cleaned
+    return None
+
+
+async def _first_wikipedia_summary(titles: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Fetch summaries for all titles concurrently.
+    Returns the first good (title, text) in the original title order.
+    """
+    summaries = await asyncio.gather(
+        *(_fetch_wikipedia_summary(title) for title in titles),
+        return_exceptions=True
+    )
+    for title, summary in zip(titles, summaries):
+        if isinstance(summary, Exception):
+            logger.debug(f"Wikipedia lookup failed for {title}: {summary}")
+            continue
+        if summary:
+            return title, summary
+    return None, None
+
+
+def extract_page_text(html: str, url: str) -> Optional[str]:
+    """Extract the main readable text from an HTML page. Returns None if nothing usable is found."""
+    from html_extract import extract_main_text
+
+    return extract_main_text(html, parser=HTML_PARSER)
+
+
+async def _scrape_page(position: int, total: int, url: str, title: str) -> Optional[str]:
+    """Fetch one web search result and extract its main text (cached per URL)."""
+    logger.info(f"  [{position}/{total}] Processing: {url[:80]} (title: {title})")
+    try:
+        pipeline_metrics.inc("autorag_heal_source_attempts_total", source="web_page")
+        resp = await cached_get(url, ttl=FETCH_TTL, extract=extract_page_text, max_bytes=MAX_PAGE_BYTES)
+        content_type = resp.content_type or 'unknown'
+        logger.info(f"    Status: {resp.status_code}, Content-Type: {content_type}")
+
+        if resp.status_code != 200 or not content_type.startswith('text/html'):
+            logger.warning(f"    Skipping - Status: {resp.status_code}, Content-Type: {content_type}")
+            return None
+
+        if resp.body:
+            pipeline_metrics.inc("autorag_heal_source_hits_total", source="web_page")
+        return resp.body or None
+    except Exception as e:
+        logger.warning(f"    ❌ Error processing URL {url[:60]}: {str(e)[:100]}")
+        return None
+
+
+async def _heal_source(source: str, lookup) -> Tuple[Optional[str], Optional[str]]:
+    """Await a (title, text) healing lookup, timing it as heal_<source> and counting attempts and hits."""
+    pipeline_metrics.inc("autorag_heal_source_attempts_total", source=source)
+    with pipeline_metrics.span(f"heal_{source}"):
+        title, text = await lookup
+    if text:
+        pipeline_metrics.inc("autorag_heal_source_hits_total", source=source)
+    return title, text
+
+
+async def _wikipedia_search_summary(query: str) -> Tuple[Optional[str], Optional[str]]:
+    """First good summary among the Wikipedia search API results for the query."""
+    search_api_url = f"{WIKIPEDIA_URL}/w/api.php"
+    search_params = {
+        "action": "query",
+        "format": "json",
+        "list": "search",
+        "srsearch": query,
+        "srlimit": 3
+    }
+    search_resp = await cached_get(search_api_url, params=search_params, ttl=FETCH_SEARCH_TTL)
+    if search_resp.status_code != 200:
+        return None, None
+
+    search_results = json.loads(search_resp.body).get("query", {}).get("search", [])
+    logger.info(f"Found {len(search_results)} Wikipedia search results via API")
+    page_titles = [r.get("title", "") for r in search_results if r.get("title")]
+    return await _first_wikipedia_summary(page_titles)
+
+
+async def _ddgs_wikipedia_summary(query: str) -> Tuple[Optional[str], Optional[str]]:
+    """First good summary among the Wikipedia pages DuckDuckGo finds for the query."""
+    with pipeline_metrics.span("heal_ddgs"):
+        wiki_results = await asyncio.to_thread(_web_search_text, f"{query} site:wikipedia.org", 3)
+    logger.info(f"Found {len(wiki_results)} Wikipedia results via DuckDuckGo")
+    page_titles = []
+    for result in wiki_results:
+        url = result.get("href", "")
+        if "wikipedia.org/wiki/" in url:
+            # Extract page title from URL and decode it
+            page_title = url.split("/wiki/")[-1].split("#")[0].split("?")[0]
+            page_titles.append(unquote(page_title))
+    return await _first_wikipedia_summary(page_titles)
+
+
+def _heal_enough(texts: List[HealText]) -> bool:
+    """Stop rule for the healing lookups: enough text from enough sources."""
+    return len(texts) >= HEAL_MIN_SOURCES and sum(len(t.text) for t in texts) >= HEAL_TARGET_CHARS
+
+
+async def _wikipedia_lookup(source: str, lookup) -> Optional[Tuple[str, str]]:
+    """One Wikipedia healing source as a fan-out lookup: ("Wikipedia: <title>", summary) or None."""
+    title, cleaned = await _heal_source(source, lookup)
+    if not cleaned:
+        return None
+    logger.info(f" Found Wikipedia summary via {source}: {title} ({len(cleaned)} chars)")
+    return f"Wikipedia: {title}", cleaned
+
+
+async def _web_page_lookup(position: int, total: int, url: str, title: str) -> Optional[Tuple[str, str]]:
+    main_content = await _scrape_page(position, total, url, title)
+    if not main_content:
+        return None
+    logger.info(f" Extracted {len(main_content)} chars from: {url[:60]}")
+    return f"Web: {url[:60]}...", main_content
+
+
+async def _web_search_lookup(query: str, fanout: HealFanout) -> None:
+    """Run the web search and launch a page fetch for each non-Wikipedia result, in result order."""
+    try:
+        # Better search query - more specific to avoid irrelevant results
+        # Remove common question words and focus on key terms
+        query_words = [w for w in query.lower().split() if w not in HEAL_STOPWORDS]
+        search_query = " ".join(query_words[:5])  # Take first 5 meaningful words
+        if not search_query:
+            search_query = query
+
+        # Add context terms to improve relevance
+        search_query = f"{search_query} definition explanation what is"
+        logger.info(f"Web search query: {search_query}")
+        pipeline_metrics.inc("autorag_heal_source_attempts_total", source="web_search")
+        with pipeline_metrics.span("heal_ddgs"):
+            web_results = await asyncio.to_thread(_web_search_text, search_query, 5)
+        logger.info(f"Found {len(web_results)} web search results")
+    except Exception as e:
+        logger.warning(f"Web search failed: {e}")
+        return None
+
+    # Skip Wikipedia URLs, the Wikipedia lookups cover those
+    candidates = []
+    for idx, r in enumerate(web_results, 1):
+        url = r.get("href", "")
+        if "wikipedia.org" in url:
+            logger.debug(f"    Skipping Wikipedia URL")
+            continue
+        candidates.append((idx, url, r.get("title", "")[:50]))
+    if candidates:
+        pipeline_metrics.inc("autorag_heal_source_hits_total", source="web_search")
+    for idx, url, title in candidates:
+        fanout.launch(_web_page_lookup(idx, len(web_results), url, title), priority=10 + idx)
+    return None
+
+
+async def self_heal(query: str, deadline: Optional[float] = None) -> Tuple[List[str], List[str], List[str], bool]:
+    """
+    Gather healing text for a query. All sources are looked up concurrently (see
+    heal_fanout): one Wikipedia summary, preferring the direct title lookup over
+    the search API and the DuckDuckGo Wikipedia search, and the pages of the web
+    search results. The remaining lookups are cancelled once _heal_enough holds or
+    `deadline` seconds (default HEAL_DEADLINE) have passed.
+    Returns: (chunks, sources, source of each chunk, whether the deadline cut the lookups short)
+    """
+    fanout = HealFanout(HEAL_DEADLINE if deadline is None else deadline, _heal_enough)
+
+    # Try multiple title formats (Wikipedia titles are case-sensitive and capitalized)
+    title_variants = list(dict.fromkeys([
+        query.replace(" ", "_"),  # Original: "quantum computing" -> "quantum_computing"
+        query.title().replace(" ", "_"),  # Title case: "Quantum Computing" -> "Quantum_Computing"
+        query.capitalize().replace(" ", "_"),  # First word capitalized: "Quantum_computing"
+    ]))
+    logger.debug(f"Trying Wikipedia: {', '.join(title_variants)}")
+    fanout.launch(_wikipedia_lookup("wikipedia_direct", _first_wikipedia_summary(title_variants)), 0, group="wikipedia")
+    fanout.launch(_wikipedia_lookup("wikipedia_search", _wikipedia_search_summary(query)), 1, group="wikipedia")
+    fanout.launch(_wikipedia_lookup("ddgs_wikipedia", _ddgs_wikipedia_summary(query)), 2, group="wikipedia")
+    fanout.launch(_web_search_lookup(query, fanout), 10)
+
+    gathered = await fanout.run()
+    if gathered.cancelled:
+        pipeline_metrics.inc("autorag_heal_lookups_cancelled_total", gathered.cancelled)
+    if gathered.timed_out:
+        pipeline_metrics.inc("autorag_heal_deadline_exceeded_total")
+        logger.warning(f"⏱️ Healing deadline ({fanout.deadline:.1f}s) reached, continuing with "
+                       f"{len(gathered.texts)} sources")
+    texts = [t.text for t in gathered.texts]
+    sources = [t.source for t in gathered.texts]
+
+    # Lower threshold to get more content
+    usable = [i for i, t in enumerate(texts) if t and len(t.strip()) > 50]
+    usable_texts = [texts[i] for i in usable]
+    with pipeline_metrics.span("heal_chunk"):
+        spans = await run_cpu_bound(get_chunker().chunk_documents, usable_texts)
+    heal_chunks = spans.texts(usable_texts)
+    chunk_sources = [sources[usable[d]] for d in spans.doc_ids.tolist()]
 
     if heal_chunks:
         logger.info(f" Self-healing collected {len(heal_chunks)} chunks from {len(sources)} sources")
@@ -592,7 +1587,14 @@ def self_heal(query: str) -> Tuple[List[str], List[str]]:
     if not texts and not heal_chunks:
         logger.error("❌ Self-healing failed - no content found from any source")
     
-    return heal_chunks, sources
+    return heal_chunks, sources, chunk_sources, gathered.timed_out
+
+
+def embed_chunks(chunks: List[str]) -> np.ndarray:
+    """Encode chunks into L2-normalized float32 embeddings."""
+    emb = embedder.encode(chunks, batch_size=32, show_progress_bar=False).astype("float32")
+    faiss.normalize_L2(emb)
+    return emb
 
 
 def build_heal_index(heal_chunks: List[str]) -> Tuple[Optional[faiss.Index], List[str]]:
@@ -601,8 +1603,7 @@ def build_heal_index(heal_chunks: List[str]) -> Tuple[Optional[faiss.Index], Lis
         return None, []
 
     try:
-        emb = embedder.encode(heal_chunks, batch_size=32, show_progress_bar=False).astype("float32")
-        faiss.normalize_L2(emb)
+        emb = embed_chunks(heal_chunks)
 
         index = faiss.IndexFlatIP(emb.shape[1])
         index.add(emb)
@@ -613,113 +1614,401 @@ def build_heal_index(heal_chunks: List[str]) -> Tuple[Optional[faiss.Index], Lis
         return None, []
 
 
-def autorag_with_diff(query: str, threshold: float = 0.5, k: int = 5, use_healing: bool = True) -> Dict:
+def heal_topic_key(query: str) -> str:
+    """Key under which queries share one self-healing lookup (normalized text minus question words)."""
+    words = [w.strip("?!.,;:") for w in normalize_query(query).split()]
+    key = " ".join(w for w in words if w and w not in HEAL_STOPWORDS)
+    return key or normalize_query(query)
+
+
+class HealedTopic(NamedTuple):
+    index: faiss.Index
+    chunks: List[str]
+    sources: List[str]
+    chunk_sources: List[str]  # Source of each chunk
+    partial: bool  # The healing deadline cut the source lookups short
+
+
+async def heal_topic(query: str, deadline: Optional[float] = None) -> Optional[HealedTopic]:
+    """
+    Run self-healing for a query (source lookups limited to `deadline` seconds) and index what it found.
+    Returns None if nothing usable was found.
+    """
+    with pipeline_metrics.span("heal_sources"):
+        heal_chunks, heal_sources, chunk_sources, partial = await self_heal(query, deadline)
+    if not heal_chunks:
+        logger.warning("⚠️ Self-healing failed - no additional content found")
+        return None
+
+    with pipeline_metrics.span("heal_encode"):
+        heal_index, heal_chunks_list = await run_cpu_bound(build_heal_index, heal_chunks)
+    if not heal_index or not heal_chunks_list:
+        return None
+    return HealedTopic(heal_index, heal_chunks_list, heal_sources, chunk_sources, partial)
+
+
+def merge_healed(before_docs: List[str], score_before: float, heal_docs: List[str], score_heal: float,
+                 k: int) -> Tuple[List[str], float, bool]:
+    """
+    Combine base and healed results intelligently.
+    Returns (docs, score, whether the healed results were used).
+    """
+    logger.info(f"Healed results: score={score_heal:.3f}, docs={len(heal_docs)}")
+
+    if score_heal > score_before * 1.15:  # Healed is significantly better (15% improvement)
+        # Use healed results if they're significantly better
+        logger.info(f" Using healed results (score improvement: {score_before:.3f} -> {score_heal:.3f})")
+        return heal_docs, score_heal, True
+    elif score_before < 0.3:  # Base is very poor
+        # Use healed results if base is very poor (even if only slightly better)
+        if score_heal > score_before:
+            logger.info(f" Using healed results (base too poor: {score_before:.3f} -> {score_heal:.3f})")
+            return heal_docs, score_heal, True
+        logger.info(f"⚠️ Healed score ({score_heal:.3f}) not better than base ({score_before:.3f}), keeping base")
+    elif score_heal > score_before * 0.9:  # Healed is at least 90% as good
+        # Combine both if healed is decent
+        combined_docs = (before_docs[:2] + heal_docs[:2] + before_docs[2:] + heal_docs[2:])[:k*2]
+        # Deduplicate while preserving order
+        seen = set()
+        unique_docs = []
+        for doc in combined_docs:
+            doc_key = doc[:100].lower()
+            if doc_key not in seen:
+                seen.add(doc_key)
+                unique_docs.append(doc)
+        score_after = (score_before * 0.3 + score_heal * 0.7)  # Weight healed more
+        logger.info(f" Combined base + healed results (weighted score: {score_after:.3f})")
+        return unique_docs[:k], score_after, True
+    elif score_heal > score_before:
+        # Even small improvement - prefer healed
+        logger.info(f" Using healed results (slight improvement: {score_before:.3f} -> {score_heal:.3f})")
+        return heal_docs, score_heal, True
+    else:
+        # Base is better, keep it
+        logger.info(f"ℹ️ Base results better, keeping original (base: {score_before:.3f} vs healed: {score_heal:.3f})")
+
+    return before_docs.copy(), score_before, False
+
+
+async def persist_healed_topic(healed: HealedTopic) -> None:
+    """Keep useful healed knowledge so the next identical topic is answered from the base index."""
+    heal_embeddings = healed.index.reconstruct_n(0, healed.index.ntotal)
+    await run_cpu_bound(persist_healed_chunks, healed.chunks, heal_embeddings, healed.chunk_sources)
+
+
+async def preheal_topic(query: str, threshold: float) -> str:
+    """
+    Background pre-healing of one topic (see preheal.PreHealWorker): heal it into the base
+    index unless the base index already answers it. Returns "healed", "skipped" or "failed".
+    """
+    before = await search_base(query, 5)
+    before_docs, score_before = before.docs_and_score()
+    if score_before >= threshold:
+        return "skipped"
+    healed = await heal_topic(query)
+    if healed is None:
+        return "failed"
+    heal = await run_cpu_bound(retrieve_from, healed.index, healed.chunks, query, k=5)
+    _, _, used = merge_healed(before_docs, score_before, *heal.docs_and_score(), 5)
+    if not used:
+        return "failed"
+    await persist_healed_topic(healed)
+    return "healed"
+
+
+def _offer_preheal(query: str, threshold: float) -> None:
+    """Queue a low-scoring query's topic for background pre-healing, if enabled."""
+    if preheal_worker is not None:
+        preheal_worker.offer(query, threshold)
+
+
+def _scored_documents(docs: List[str], before: RetrievalResult,
+                      healed: Optional[RetrievalResult] = None) -> List[Dict]:
+    """Score and origin (base or healed index) of each chunk used in the answer."""
+    scores = {text: (score, "healed") for text, score in healed.hits()} if healed is not None else {}
+    scores.update((text, (score, "base")) for text, score in before.hits())
+    return [{"text": doc, "score": round(scores[doc][0], 3), "source": scores[doc][1]} for doc in docs if doc in scores]
+
+
+def _format_result(before_docs: List[str], after_docs: List[str], score_before: float, score_after: float,
+                   healing_triggered: bool, healing_successful: bool, sources_used: List[str],
+                   documents: List[Dict], healing_partial: bool = False) -> Dict:
+    with pipeline_metrics.span("clean_answer"):
+        before_text = clean_answer(" ".join(before_docs)) if before_docs else "No relevant information found in the knowledge base."
+        after_text = clean_answer(" ".join(after_docs)) if after_docs else "No relevant information found."
+    pipeline_metrics.inc("autorag_heal_triggered_total", value=int(healing_triggered))
+    pipeline_metrics.inc("autorag_heal_successful_total", value=int(healing_successful))
+
+    return {
+        "before_answer": before_text,
+        "after_answer": after_text,
+        "score_before": score_before,
+        "score_after": score_after,
+        "healing_triggered": healing_triggered,
+        "healing_successful": healing_successful,
+        "healing_partial": healing_partial,
+        "sources_used": sources_used,
+        "documents": documents
+    }
+
+
+async def autorag_with_diff(query: str, threshold: float = 0.5, k: int = 5, use_healing: bool = True,
+                            nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                            heal_deadline: Optional[float] = None) -> Dict:
     """
     Enhanced AutoRAG with improved self-healing logic.
+    Encoding and index searches run on the CPU executor so the event loop stays responsive.
+    `nprobe`/`ef_search` override the base index search knobs for this query, and
+    `heal_deadline` the time allowed for the healing source lookups.
     Returns a dictionary with all results.
     """
     # BEFORE: base knowledge only
-    before_docs, score_before = retrieve_from(
-        base_index, base_chunks, query, k=k
-    )
+    before = await search_base(query, k, nprobe=nprobe, ef_search=ef_search)
+    before_docs, score_before = before.docs_and_score()
+    heal = None
 
     after_docs = before_docs.copy() if before_docs else []
     score_after = score_before
     healing_triggered = False
     healing_successful = False
+    healing_partial = False
     sources_used = ["Base Knowledge Base"]
 
     # Heal ONLY if needed and enabled
     if use_healing and score_before < threshold:
         healing_triggered = True
         logger.info(f"⚠️ Self-healing triggered (score: {score_before:.3f} < {threshold})")
-        
-        heal_chunks, heal_sources = self_heal(query)
-        
-        if heal_chunks:
-            heal_index, heal_chunks_list = build_heal_index(heal_chunks)
-
-            if heal_index and heal_chunks_list:
-                heal_docs, score_heal = retrieve_from(
-                    heal_index, heal_chunks_list, query, k=k
-                )
-                
-                sources_used.extend(heal_sources)
-                
-                logger.info(f"Healed results: score={score_heal:.3f}, docs={len(heal_docs)}")
-                
-                # Improved hybrid approach: combine base and healed results intelligently
-                if score_heal > score_before * 1.15:  # Healed is significantly better (15% improvement)
-                    # Use healed results if they're significantly better
-                    after_docs = heal_docs
-                    score_after = score_heal
-                    healing_successful = True
-                    logger.info(f" Using healed results (score improvement: {score_before:.3f} -> {score_heal:.3f})")
-                elif score_before < 0.3:  # Base is very poor
-                    # Use healed results if base is very poor (even if only slightly better)
-                    if score_heal > score_before:
-                        after_docs = heal_docs
-                        score_after = score_heal
-                        healing_successful = True
-                        logger.info(f" Using healed results (base too poor: {score_before:.3f} -> {score_heal:.3f})")
-                    else:
-                        logger.info(f"⚠️ Healed score ({score_heal:.3f}) not better than base ({score_before:.3f}), keeping base")
-                elif score_heal > score_before * 0.9:  # Healed is at least 90% as good
-                    # Combine both if healed is decent
-                    combined_docs = (before_docs[:2] + heal_docs[:2] + before_docs[2:] + heal_docs[2:])[:k*2]
-                    # Deduplicate while preserving order
-                    seen = set()
-                    unique_docs = []
-                    for doc in combined_docs:
-                        doc_key = doc[:100].lower()
-                        if doc_key not in seen:
-                            seen.add(doc_key)
-                            unique_docs.append(doc)
-                    after_docs = unique_docs[:k]
-                    score_after = (score_before * 0.3 + score_heal * 0.7)  # Weight healed more
-                    healing_successful = True
-                    logger.info(f" Combined base + healed results (weighted score: {score_after:.3f})")
-                elif score_heal > score_before:
-                    # Even small improvement - prefer healed
-                    after_docs = heal_docs
-                    score_after = score_heal
-                    healing_successful = True
-                    logger.info(f" Using healed results (slight improvement: {score_before:.3f} -> {score_heal:.3f})")
-                else:
-                    # Base is better, keep it
-                    logger.info(f"ℹ️ Base results better, keeping original (base: {score_before:.3f} vs healed: {score_heal:.3f})")
-        else:
-            logger.warning("⚠️ Self-healing failed - no additional content found")
-
-    before_text = clean_answer(" ".join(before_docs)) if before_docs else "No relevant information found in the knowledge base."
-    after_text = clean_answer(" ".join(after_docs)) if after_docs else "No relevant information found."
 
-    return {
-        "before_answer": before_text,
-        "after_answer": after_text,
-        "score_before": score_before,
-        "score_after": score_after,
-        "healing_triggered": healing_triggered,
-        "healing_successful": healing_successful,
-        "sources_used": sources_used
-    }
+        healed = await heal_topic(query, heal_deadline)
+        if healed is not None:
+            healing_partial = healed.partial
+            heal = await run_cpu_bound(
+                retrieve_from, healed.index, healed.chunks, query, k=k
+            )
+            heal_docs, score_heal = heal.docs_and_score()
+            sources_used.extend(healed.sources)
+            after_docs, score_after, healing_successful = merge_healed(
+                before_docs, score_before, heal_docs, score_heal, k
+            )
 
+            if healing_successful and PERSIST_HEALED:
+                await persist_healed_topic(healed)
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the RAG system on startup."""
-    global embedder, base_index, base_chunks
-    
+    if score_before < threshold and not (healing_successful and PERSIST_HEALED):
+        _offer_preheal(query, threshold)
+
+    return _format_result(before_docs, after_docs, score_before, score_after,
+                          healing_triggered, healing_successful, sources_used,
+                          _scored_documents(after_docs, before, heal), healing_partial)
+
+
+async def autorag_batch(queries: List[str], threshold: float = 0.5, k: int = 5, use_healing: bool = True,
+                        nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                        heal_deadline: Optional[float] = None) -> List[Dict]:
+    """
+    Answer several queries at once. All queries are encoded in one forward pass and
+    searched with one matrix search; only sub-threshold queries are healed, with one
+    self-healing lookup per distinct topic (see heal_topic_key).
+    Returns one result dictionary per query, in order.
+    """
+    before = await run_cpu_bound(
+        retrieve_batch, base_index, base_chunks, queries, k=k,
+        params=search_params(base_index, nprobe=nprobe, ef_search=ef_search)
+    )
+
+    scores_before = before.mean_scores().tolist()
+
+    # Group the queries that need healing by topic
+    topics: Dict[str, List[int]] = {}
+    if use_healing:
+        for i in np.flatnonzero(np.asarray(scores_before) < threshold).tolist():
+            topics.setdefault(heal_topic_key(queries[i]), []).append(i)
+    if topics:
+        logger.info(f"⚠️ Self-healing triggered for {sum(len(v) for v in topics.values())}/{len(queries)} queries "
+                    f"({len(topics)} distinct topics)")
+
+    # Heal each topic once, concurrently, using its first query
+    topic_items = list(topics.items())
+    healed_topics = await asyncio.gather(*(heal_topic(queries[members[0]], heal_deadline) for _, members in topic_items))
+
+    results: List[Optional[Dict]] = [None] * len(queries)
+    persisted = set()  # Topics whose healed knowledge was folded into the base index
+    for (topic, members), healed in zip(topic_items, healed_topics):
+        if healed is None:
+            continue
+        heal_hits = await run_cpu_bound(
+            retrieve_batch, healed.index, healed.chunks, [queries[i] for i in members], k=k
+        )
+        scores_heal = heal_hits.mean_scores().tolist()
+
+        topic_successful = False
+        for row, i in enumerate(members):
+            before_docs, score_before = before.docs(i), scores_before[i]
+            after_docs, score_after, healing_successful = merge_healed(
+                before_docs, score_before, heal_hits.docs(row), scores_heal[row], k
+            )
+            topic_successful = topic_successful or healing_successful
+            results[i] = _format_result(before_docs, after_docs, score_before, score_after, True,
+                                        healing_successful, ["Base Knowledge Base"] + healed.sources,
+                                        _scored_documents(after_docs, before[i], heal_hits[row]), healed.partial)
+
+        if topic_successful and PERSIST_HEALED:
+            await persist_healed_topic(healed)
+            persisted.add(topic)
+
+    for i, score_before in enumerate(scores_before):
+        if score_before < threshold and heal_topic_key(queries[i]) not in persisted:
+            _offer_preheal(queries[i], threshold)
+
+    healing_queries = {i for members in topics.values() for i in members}
+    for i in range(len(queries)):
+        if results[i] is None:
+            before_docs = before.docs(i)
+            results[i] = _format_result(before_docs, before_docs.copy(), scores_before[i], scores_before[i],
+                                        i in healing_queries, False, ["Base Knowledge Base"],
+                                        _scored_documents(before_docs, before[i]))
+    return results
+
+
+def _serving():
+    """Context marking a query being answered, so background pre-healing waits for idle time."""
+    return preheal_worker.busy() if preheal_worker is not None else nullcontext()
+
+
+async def answer_query(query: str, threshold: float = 0.5, k: int = 5, use_healing: bool = True,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       heal_deadline: Optional[float] = None) -> Tuple[Dict, bool]:
+    """
+    autorag_with_diff through the answer cache. Returns (result, served from cache);
+    concurrent identical queries share one computation.
+    """
+    key = _answer_cache_key(query, threshold, k, use_healing, nprobe, ef_search)
+    with _serving():
+        result, cached = await _get_answer_cache().get_or_compute(
+            key,
+            lambda: autorag_with_diff(query, threshold=threshold, k=k, use_healing=use_healing,
+                                      nprobe=nprobe, ef_search=ef_search, heal_deadline=heal_deadline),
+            cacheable=_is_cacheable_answer,
+            # A persisted heal changes the base index version: store under the version repeats will ask for
+            store_key=lambda: _answer_cache_key(query, threshold, k, use_healing, nprobe, ef_search),
+        )
+    pipeline_metrics.inc("autorag_queries_total", cached=str(cached).lower())
+    return result, cached
+
+
+async def answer_batch(queries: List[str], threshold: float = 0.5, k: int = 5, use_healing: bool = True,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       heal_deadline: Optional[float] = None) -> List[Tuple[Dict, bool]]:
+    """autorag_batch through the answer cache: only the queries without a cached result are computed."""
+    cache = _get_answer_cache()
+    keys = [_answer_cache_key(query, threshold, k, use_healing, nprobe, ef_search) for query in queries]
+    cached = await cache.aget_many(keys)
+    results: List[Tuple[Dict, bool]] = [(dict(entry.result), True) if entry is not None else None for entry in cached]
+
+    missing = [i for i, entry in enumerate(cached) if entry is None]
+    if missing:
+        started = time.perf_counter()
+        with _serving():
+            computed = await autorag_batch([queries[i] for i in missing], threshold=threshold, k=k,
+                                           use_healing=use_healing, nprobe=nprobe, ef_search=ef_search,
+                                           heal_deadline=heal_deadline)
+        seconds = (time.perf_counter() - started) / len(missing)
+        for i, result in zip(missing, computed):
+            if _is_cacheable_answer(result):
+                # Keyed on the base index version after any persisted heals, as in answer_query
+                await cache.aput(_answer_cache_key(queries[i], threshold, k, use_healing, nprobe, ef_search),
+                                 result, seconds)
+            results[i] = (result, False)
+    pipeline_metrics.inc("autorag_queries_total", len(queries) - len(missing), cached="true")
+    pipeline_metrics.inc("autorag_queries_total", len(missing), cached="false")
+    return results
+
+
+@contextmanager
+def _startup_phase(name: str):
+    """Record how long a startup phase takes in startup_phases."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[name] = round(time.perf_counter() - started, 3)
+
+
+def _import_healing_modules() -> None:
+    """Import the healing-only dependencies ahead of the first healing request."""
+    import httpx  # noqa: F401
+    import html_extract  # noqa: F401
+    _get_search_provider()
+    if isinstance(search_provider, DDGSProvider):
+        import duckduckgo_search  # noqa: F401
+
+
+def start_preheal_worker() -> None:
+    """Start background pre-healing and queue the seed topics from AUTORAG_PREHEAL_TOPICS."""
+    global preheal_worker
+
+    if not PERSIST_HEALED:
+        # Pre-healed knowledge only helps later queries once it is in the base index
+        logger.warning("⚠️ AUTORAG_PREHEAL needs AUTORAG_PERSIST_HEALED; background pre-healing is disabled")
+        return
+    preheal_worker = PreHealWorker(preheal_topic, heal_topic_key, max_queue=PREHEAL_QUEUE,
+                                   concurrency=PREHEAL_CONCURRENCY, idle_seconds=PREHEAL_IDLE_SECONDS,
+                                   retry_after=PREHEAL_RETRY_AFTER, claim_dir=_cache_dir() / "preheal")
+    preheal_worker.start()
+    if PREHEAL_TOPICS:
+        try:
+            topics = load_seed_topics(Path(PREHEAL_TOPICS))
+        except OSError as e:
+            logger.warning(f"Could not read pre-heal topics from {PREHEAL_TOPICS}: {e}")
+            return
+        queued = sum(preheal_worker.offer(topic, PREHEAL_THRESHOLD, origin="seed") for topic in topics)
+        logger.info(f"🩹 Queued {queued}/{len(topics)} seed topics for pre-healing")
+
+
+async def initialize_rag() -> None:
+    """
+    Load the embedding model and base index (in worker threads, so the event loop keeps
+    answering /health) and mark the service ready. Run in the background by startup_event.
+    """
+    global embedder, base_index, base_chunks, chunker, healed_sync_task, maintenance_task, startup_state, startup_error
+
+    started = time.perf_counter()
     try:
         logger.info("Initializing Self-Healing RAG System...")
-        
+
         # Load embedder
-        logger.info("Loading sentence transformer model...")
-        embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        logger.info(f"Loading embedding model ({EMBEDDING_BACKEND})...")
+        with _startup_phase("model"):
+            model = await asyncio.to_thread(create_embedder)
+        embedder = model
+        chunker = create_chunker(model)
+        logger.info(f"Chunking: {chunker.params()}")
+
+        with _startup_phase("index"):
+            index, chunks = await asyncio.to_thread(load_or_build_base_index, model)
+        base_chunks = chunks
+        base_index = index
+        if PERSIST_HEALED and HEALED_SYNC_INTERVAL > 0:
+            healed_sync_task = asyncio.create_task(healed_sync_loop())
+
+        if EMBED_CACHE_PATH:
+            try:
+                with _startup_phase("embedding_cache"):
+                    restored = await asyncio.to_thread(query_embedding_cache.load, Path(EMBED_CACHE_PATH))
+                logger.info(f"Restored {restored} cached query embeddings from {EMBED_CACHE_PATH}")
+            except Exception as e:
+                logger.warning(f"Could not load query embedding cache: {e}")
 
-        base_index, base_chunks = load_or_build_base_index(embedder)
+        if DOCUMENT_SYNC_INTERVAL > 0:
+            maintenance_task = asyncio.create_task(document_maintenance_loop())
+        if PREHEAL:
+            start_preheal_worker()
 
+        startup_phases["warm_up"] = round(time.perf_counter() - started, 3)
+        startup_phases["ready_after"] = round(time.perf_counter() - _import_started, 3)
+        startup_state = "ready"
         logger.info(f"✅ RAG System initialized successfully! Base index contains {base_index.ntotal} vectors")
+        logger.info(f"⏱️ Startup phases (s): {startup_phases}")
     except Exception as e:
         logger.error(f"❌ Failed to initialize RAG system: {e}")
         logger.error("This might be due to missing dependencies or insufficient memory.")
@@ -728,7 +2017,65 @@ async def startup_event():
         embedder = None
         base_index = None
         base_chunks = []
+        startup_state = "failed"
+        startup_error = str(e)
         logger.warning("⚠️ Starting with limited functionality - some features may not work")
+        return
+
+    try:
+        with _startup_phase("healing_imports"):
+            await asyncio.to_thread(_import_healing_modules)
+    except Exception as e:
+        logger.warning(f"Could not import the healing dependencies: {e}")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Start loading the RAG system in the background, so uvicorn binds the port right away."""
+    global warmup_task
+
+    startup_phases["app_startup"] = round(time.perf_counter() - _import_started, 3)
+    warmup_task = asyncio.create_task(initialize_rag())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the outbound connection pools and worker threads."""
+    global outbound, cpu_executor, healed_sync_task, fetch_cache, answer_cache, search_provider
+
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    if healed_sync_task is not None:
+        healed_sync_task.cancel()
+        healed_sync_task = None
+    if query_batcher is not None:
+        query_batcher.flush_all()
+    if maintenance_task is not None:
+        maintenance_task.cancel()
+    if preheal_worker is not None:
+        await preheal_worker.stop()
+
+    if EMBED_CACHE_PATH:
+        try:
+            saved = query_embedding_cache.save(Path(EMBED_CACHE_PATH))
+            logger.info(f"Saved {saved} cached query embeddings to {EMBED_CACHE_PATH}")
+        except Exception as e:
+            logger.warning(f"Could not save query embedding cache: {e}")
+    if outbound is not None:
+        await outbound.aclose()
+        outbound = None
+    if cpu_executor is not None:
+        cpu_executor.shutdown(wait=False)
+        cpu_executor = None
+    if fetch_cache is not None:
+        fetch_cache.close()
+        fetch_cache = None
+    if answer_cache is not None:
+        answer_cache.close()
+        answer_cache = None
+    if search_provider is not None:
+        search_provider.close()
+        search_provider = None
 
 
 @app.get("/")
@@ -740,7 +2087,13 @@ async def root():
         "status": "running",
         "endpoints": {
             "POST /query": "Query the RAG system",
-            "GET /health": "Health check",
+            "POST /query/batch": "Answer several queries in one call",
+            "POST /documents": "Add or replace documents in the base index",
+            "DELETE /documents/{id}": "Remove a document from the base index",
+            "POST /documents/compact": "Drop deleted documents' chunks from the cached index",
+            "GET /health": "Health check (answers while the index is still loading)",
+            "GET /ready": "Readiness check: 503 until the base index is loaded",
+            "GET /metrics": "Prometheus metrics (stage latencies, healing and cache counters)",
             "GET /": "This endpoint"
         }
     }
@@ -748,14 +2101,112 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
+    """Health check endpoint. Answers as soon as the port is bound; see /ready for readiness."""
+    # The fetch and answer caches count their SQLite entries with a query: keep that off the event loop
+    fetch_cache_stats = await asyncio.to_thread(fetch_cache.stats) if fetch_cache is not None else None
+    answer_cache_stats = await asyncio.to_thread(answer_cache.stats) if answer_cache is not None else None
     return {
         "status": "healthy",
+        "startup": {"state": startup_state, "error": startup_error, "phases": startup_phases},
         "base_index_size": base_index.ntotal if base_index else 0,
-        "base_chunks_count": len(base_chunks) if base_chunks else 0
+        "base_chunks_count": len(base_chunks) if base_chunks else 0,
+        "base_chunk_store": base_chunks.stats() if isinstance(base_chunks, ChunkStore) else None,
+        "base_index": describe_index(base_index),
+        "healed_chunks_count": healed_chunks_count,
+        "documents": base_documents.stats() if base_documents is not None else None,
+        "retrieval_mode": RETRIEVAL_MODE,
+        "lexical_index": base_lexical.stats() if base_lexical is not None else None,
+        "process_memory": _process_memory(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "fetch_cache": fetch_cache_stats,
+        "outbound": outbound.stats() if outbound is not None else None,
+        "preheal": preheal_worker.stats() if preheal_worker is not None else None,
+        "pipeline_stages": pipeline_metrics.stage_summary(),
+        "answer_cache": answer_cache_stats,
+        "query_batcher": query_batcher.stats() if query_batcher is not None else None
     }
 
 
+def _outbound_metric_families() -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+    """Per-host outbound request counters and circuit breaker states for GET /metrics."""
+    hosts = outbound.stats() if outbound is not None else {}
+
+    def samples(field: str) -> List[Tuple[Dict[str, str], float]]:
+        return [({"host": host}, stats[field]) for host, stats in hosts.items()]
+
+    breaker_states = {"closed": 0, "half_open": 1, "open": 2}
+    return [
+        ("autorag_outbound_requests_total", "counter", "Outbound requests sent per host", samples("requests")),
+        ("autorag_outbound_connections_opened_total", "counter",
+         "New connections opened per host (requests minus these reused a keep-alive connection)",
+         samples("connections_opened")),
+        ("autorag_outbound_connections_reused_total", "counter", "Pooled requests that reused a connection",
+         samples("connections_reused")),
+        ("autorag_outbound_failures_total", "counter", "Outbound errors, timeouts, 429 and 5xx responses per host",
+         samples("failures")),
+        ("autorag_outbound_throttle_seconds_total", "counter", "Seconds requests waited for the host rate limit",
+         samples("throttle_seconds")),
+        ("autorag_outbound_rejected_total", "counter", "Requests not sent, by reason (rate_limited, circuit_open)",
+         [({"host": host, "reason": reason}, stats[reason]) for host, stats in hosts.items()
+          for reason in ("rate_limited", "circuit_open")]),
+        ("autorag_outbound_breaker_state", "gauge", "Circuit breaker per host: 0 closed, 1 half open, 2 open",
+         [({"host": host}, breaker_states[stats["breaker"]]) for host, stats in hosts.items()]),
+    ]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, healing and answer cache counters (this worker)."""
+    gauges = {
+        "autorag_base_index_rows": ("Rows in the live base index, including tombstoned ones",
+                                    base_index.ntotal if base_index is not None else 0),
+        "autorag_tombstoned_chunks": ("Chunks of replaced or deleted documents awaiting compaction",
+                                      base_documents.deleted_count if base_documents is not None else 0),
+        "autorag_healed_chunks": ("Healed chunks folded into the base index", healed_chunks_count),
+        "autorag_ready": ("1 once the embedding model and base index are loaded", int(startup_state == "ready")),
+    }
+    if answer_cache is not None:
+        # stats() also counts the SQLite tier: keep that off the event loop
+        answer_cache_stats = await asyncio.to_thread(answer_cache.stats)
+        gauges["autorag_answer_cache_entries"] = ("Answers held in the in-memory answer cache",
+                                                  answer_cache_stats["entries"])
+    if preheal_worker is not None:
+        gauges["autorag_preheal_queue_depth"] = ("Topics waiting for background pre-healing",
+                                                 preheal_worker.stats()["queued"])
+    histograms = {}
+    if query_batcher is not None:
+        gauges["autorag_query_batcher_queue_depth"] = ("Queries waiting to be batched", query_batcher.depth)
+        histograms["autorag_query_batch_size"] = ("Queries per batched encode and base index search",
+                                                  query_batcher.batch_size)
+        histograms["autorag_query_batcher_queue_depth_on_submit"] = ("Queries already waiting when a query was queued",
+                                                                     query_batcher.queue_depth)
+    families = _outbound_metric_families()
+    if preheal_worker is not None:
+        preheal = preheal_worker.stats()
+        families.append(("autorag_preheal_topics_total", "counter",
+                         "Background pre-heal offers and outcomes (queued offers end healed, skipped, failed or "
+                         "other_worker)",
+                         [({"outcome": outcome}, preheal[outcome])
+                          for outcome in ("offered", "deduplicated", "dropped", "healed", "skipped", "failed",
+                                          "other_worker")]))
+    return PlainTextResponse(pipeline_metrics.render(gauges, families, histograms),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness check: 200 once the embedding model and base index are loaded, 503 before (or on failure)."""
+    body = {
+        "status": startup_state,
+        "error": startup_error,
+        "phases": startup_phases,
+        "base_index_size": base_index.ntotal if base_index is not None else 0,
+    }
+    if startup_state != "ready":
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
 @app.post("/query", response_model=QueryResponse)
 async def query_rag(request: QueryRequest):
     """
@@ -765,10 +2216,13 @@ async def query_rag(request: QueryRequest):
     - **threshold**: Trust score threshold below which healing is triggered (default: 0.5)
     - **max_results**: Maximum number of results to return (default: 5)
     - **use_healing**: Whether to enable self-healing (default: True)
+    - **heal_deadline**: Seconds allowed for the healing source lookups; what was found by then is used
     """
     try:
         if not request.query or not request.query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
+        if request.heal_deadline is not None and request.heal_deadline <= 0:
+            raise HTTPException(status_code=400, detail="heal_deadline must be positive")
         
         # Check if system is properly initialized
         if embedder is None or base_index is None:
@@ -785,12 +2239,16 @@ async def query_rag(request: QueryRequest):
                 timestamp=datetime.now().isoformat()
             )
         
-        result = autorag_with_diff(
-            query=request.query,
-            threshold=request.threshold,
-            k=request.max_results,
-            use_healing=request.use_healing
-        )
+        with request_timings() as timings:
+            result, cached = await answer_query(
+                query=request.query,
+                threshold=request.threshold,
+                k=request.max_results,
+                use_healing=request.use_healing,
+                nprobe=request.nprobe,
+                ef_search=request.ef_search,
+                heal_deadline=request.heal_deadline
+            )
         
         return QueryResponse(
             query=request.query,
@@ -800,14 +2258,136 @@ async def query_rag(request: QueryRequest):
             trust_score_after=round(result["score_after"], 3),
             healing_triggered=result["healing_triggered"],
             healing_successful=result["healing_successful"],
+            healing_partial=result.get("healing_partial", False),
             sources_used=result["sources_used"],
+            documents=result["documents"],
+            cached=cached,
+            timings={stage: round(seconds, 4) for stage, seconds in timings.items()} if request.include_timings else None,
             timestamp=datetime.now().isoformat()
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing query: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch(request: BatchQueryRequest):
+    """
+    Answer several queries in one call.
+
+    All queries are encoded in one batched forward pass and searched with a single
+    matrix search. Sub-threshold queries are healed once per distinct topic.
+    Settings (threshold, max_results, use_healing, nprobe, ef_search, heal_deadline) apply to every query.
+    """
+    try:
+        if not request.queries:
+            raise HTTPException(status_code=400, detail="queries cannot be empty")
+        if len(request.queries) > MAX_BATCH_QUERIES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+        if any(not q or not q.strip() for q in request.queries):
+            raise HTTPException(status_code=400, detail="Queries cannot be empty")
+        if request.heal_deadline is not None and request.heal_deadline <= 0:
+            raise HTTPException(status_code=400, detail="heal_deadline must be positive")
+        if embedder is None or base_index is None:
+            raise HTTPException(status_code=503, detail="The RAG system is not fully initialized yet")
+
+        answers = await answer_batch(
+            request.queries,
+            threshold=request.threshold,
+            k=request.max_results,
+            use_healing=request.use_healing,
+            nprobe=request.nprobe,
+            ef_search=request.ef_search,
+            heal_deadline=request.heal_deadline
+        )
+
+        timestamp = datetime.now().isoformat()
+        responses = [
+            QueryResponse(
+                query=query,
+                answer=result["after_answer"],
+                before_answer=result["before_answer"],
+                trust_score_before=round(result["score_before"], 3),
+                trust_score_after=round(result["score_after"], 3),
+                healing_triggered=result["healing_triggered"],
+                healing_successful=result["healing_successful"],
+                healing_partial=result.get("healing_partial", False),
+                sources_used=result["sources_used"],
+                documents=result["documents"],
+                cached=cached,
+                timestamp=timestamp
+            )
+            for query, (result, cached) in zip(request.queries, answers)
+        ]
+        healing_queries = [q for q, (r, _) in zip(request.queries, answers) if r["healing_triggered"]]
+        return BatchQueryResponse(
+            results=responses,
+            healing_triggered_count=len(healing_queries),
+            healed_topics_count=len({heal_topic_key(q) for q in healing_queries}),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing batch query: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@app.post("/documents", response_model=DocumentsResponse)
+async def add_documents(request: DocumentsRequest):
+    """
+    Add or replace documents in the base index without a rebuild.
+
+    Only the given documents are chunked and embedded. A document whose id already
+    exists replaces the previous version; the old chunks are tombstoned and
+    compacted away in the background.
+    """
+    try:
+        if not request.documents:
+            raise HTTPException(status_code=400, detail="documents cannot be empty")
+        if any(not d.text or not d.text.strip() for d in request.documents):
+            raise HTTPException(status_code=400, detail="Document text cannot be empty")
+        if embedder is None or base_index is None:
+            raise HTTPException(status_code=503, detail="The RAG system is not fully initialized yet")
+
+        documents = [(d.id or uuid.uuid4().hex, d.text) for d in request.documents]
+        try:
+            results = await run_cpu_bound(upsert_documents, documents)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        return DocumentsResponse(
+            documents=[DocumentResult(**result) for result in results],
+            base_index_size=base_index.ntotal,
+            tombstoned_chunks=base_documents.deleted_count,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error adding documents: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@app.delete("/documents/{doc_id:path}")
+async def remove_document(doc_id: str):
+    """Remove a document. Its chunks stop matching immediately and are compacted away later."""
+    if embedder is None or base_index is None:
+        raise HTTPException(status_code=503, detail="The RAG system is not fully initialized yet")
+    removed = await run_cpu_bound(delete_document, doc_id)
+    if removed is None:
+        raise HTTPException(status_code=404, detail=f"Unknown document: {doc_id}")
+    return {"id": doc_id, "deleted": True, "chunks_removed": removed, "tombstoned_chunks": base_documents.deleted_count}
+
+
+@app.post("/documents/compact")
+async def compact_documents():
+    """Compact the cached base index now instead of waiting for the tombstone threshold."""
+    if embedder is None or base_index is None:
+        raise HTTPException(status_code=503, detail="The RAG system is not fully initialized yet")
+    return await asyncio.to_thread(compact_and_reload)
+
+
 @app.post("/query/demo")
 async def query_demo(request: QueryRequest):
     """
@@ -817,11 +2397,14 @@ async def query_demo(request: QueryRequest):
         if not request.query or not request.query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
-        result = autorag_with_diff(
+        result, _ = await answer_query(
             query=request.query,
             threshold=request.threshold,
             k=request.max_results,
-            use_healing=request.use_healing
+            use_healing=request.use_healing,
+            nprobe=request.nprobe,
+            ef_search=request.ef_search,
+            heal_deadline=request.heal_deadline
         )
         
         # Format output similar to notebook
@@ -13,6 +13,8 @@ import requests
 from bs4 import BeautifulSoup
 import wikipedia
 
+from keyword_index import KeywordIndex
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AutoRAG API with Wikipedia",
@@ -82,17 +84,12 @@ def search_wikipedia(query: str, max_results: int = 3) -> List[str]:
         print(f"Wikipedia search error: {e}")
         return []
 
+# Built once at startup; a query only reads the postings of its own words
+KB_INDEX = KeywordIndex(MOCK_KNOWLEDGE)
+
 def simple_search(query: str, max_results: int = 3) -> List[str]:
-    """Simple keyword-based search in mock knowledge base"""
-    query_lower = query.lower()
-    results = []
-    
-    for knowledge in MOCK_KNOWLEDGE:
-        # Simple keyword matching
-        if any(word in knowledge.lower() for word in query_lower.split()):
-            results.append(knowledge)
-    
-    return results[:max_results]
+    """Simple keyword-based search in mock knowledge base, most matching query words first"""
+    return [doc for doc, matched in KB_INDEX.search(query, max_results, lambda matched, _q, _d: matched)]
 
 def web_search(query: str, max_results: int = 2) -> List[str]:
     """Simple web search using DuckDuckGo"""
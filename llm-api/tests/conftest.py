@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The API modules are flat files in llm-api/, imported by name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
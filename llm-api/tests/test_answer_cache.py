@@ -0,0 +1,142 @@
+import asyncio
+
+from answer_cache import AnswerCache, answer_cache_key
+
+
+def test_key_depends_on_query_version_and_settings():
+    key = answer_cache_key("What is RAG?", "1:10:0:abc", top_k=5)
+    assert key == answer_cache_key("what is  rag?", "1:10:0:abc", top_k=5)
+    assert key != answer_cache_key("What is RAG?", "1:11:0:abc", top_k=5)
+    assert key != answer_cache_key("What is RAG?", "1:10:0:abc", top_k=3)
+
+
+def test_concurrent_misses_compute_once():
+    cache = AnswerCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": "42"}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [r for r, _ in results] == [{"answer": "42"}] * 3
+    assert sorted(cached for _, cached in results) == [False, True, True]
+    assert cache.stats()["coalesced"] == 2
+    assert cache.stats()["misses"] == 1
+
+    result, cached = asyncio.run(cache.get_or_compute("k", compute))
+    assert cached and result == {"answer": "42"} and len(calls) == 1
+
+
+def test_cancelled_caller_does_not_cancel_computation():
+    cache = AnswerCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": "done"}
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    (result, cached), first_cancelled = asyncio.run(main())
+    assert first_cancelled
+    assert result == {"answer": "done"} and cached
+    assert len(calls) == 1
+    assert cache.get("k").result == {"answer": "done"}
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_only_cacheable_results_are_stored():
+    cache = AnswerCache()
+
+    async def compute():
+        return {"answer": None}
+
+    result, cached = asyncio.run(cache.get_or_compute("k", compute, cacheable=lambda r: r["answer"] is not None))
+    assert result == {"answer": None} and not cached
+    assert cache.get("k") is None
+    assert cache.stats()["stores"] == 0
+
+
+def test_store_key_is_evaluated_after_computation():
+    cache = AnswerCache()
+    version = ["v1"]
+
+    async def compute():
+        version[0] = "v2"  # E.g. healing persisted new chunks
+        return {"answer": "healed"}
+
+    asyncio.run(cache.get_or_compute("q@v1", compute, store_key=lambda: f"q@{version[0]}"))
+    assert cache.get("q@v1") is None
+    assert cache.get("q@v2").result == {"answer": "healed"}
+
+
+def test_failed_computation_is_not_cached():
+    cache = AnswerCache()
+
+    async def compute():
+        raise RuntimeError("boom")
+
+    async def main():
+        try:
+            await cache.get_or_compute("k", compute)
+        except RuntimeError:
+            pass
+
+    asyncio.run(main())
+    assert cache.get("k") is None
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_lru_eviction_and_ttl():
+    cache = AnswerCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, {"key": key}, 0.1)
+    assert cache.get("a") is None
+    assert cache.get("c").result == {"key": "c"}
+
+    expired = AnswerCache(ttl_seconds=0.01)
+    expired.put("a", {}, 0.1)
+    asyncio.run(asyncio.sleep(0.02))
+    assert expired.get("a") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db = tmp_path / "answers.sqlite"
+    cache = AnswerCache(db_path=db)
+    asyncio.run(cache.aput("k", {"answer": "persisted"}, 1.5))
+    cache.close()
+
+    restarted = AnswerCache(db_path=db)
+    entries = asyncio.run(restarted.aget_many(["k", "missing"]))
+    assert entries[0].result == {"answer": "persisted"}
+    assert entries[1] is None
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1 and stats["misses"] == 1
+    assert restarted.get("k") is not None and restarted.stats()["hits"] == 1
+    restarted.close()
+
+
+def test_disabled_cache_always_computes():
+    cache = AnswerCache(max_entries=0)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {}
+
+    asyncio.run(cache.get_or_compute("k", compute))
+    asyncio.run(cache.get_or_compute("k", compute))
+    assert len(calls) == 2
@@ -0,0 +1,79 @@
+from chunk_store import ChunkStore, ChunkStoreWriter, chunk_hash, store_paths, write_chunk_store
+
+TEXTS = ["first chunk", "zweiter Abschnitt ü", "", "fourth  chunk\n"]
+
+
+def test_write_and_read_back(tmp_path):
+    blob = tmp_path / "chunks.bin"
+    assert write_chunk_store(blob, TEXTS) == len(TEXTS)
+
+    store = ChunkStore(blob)
+    assert len(store) == len(TEXTS)
+    assert list(store) == TEXTS
+    assert store[-1] == TEXTS[-1]
+    assert store.get_many([3, 0]) == [TEXTS[3], TEXTS[0]]
+    assert store.contains_hash(chunk_hash("fourth chunk"))  # Whitespace-normalized
+    assert not store.contains_hash(chunk_hash("missing"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["chunks.bin", "chunks.hashes", "chunks.lock", "chunks.spans"]
+    store.close()
+
+
+def test_rewrite_leaves_open_store_readable(tmp_path):
+    blob = tmp_path / "chunks.bin"
+    write_chunk_store(blob, TEXTS)
+    old = ChunkStore(blob)
+    write_chunk_store(blob, ["replacement"])
+
+    assert list(old) == TEXTS
+    assert list(ChunkStore(blob)) == ["replacement"]
+
+
+def test_empty_store(tmp_path):
+    blob = tmp_path / "chunks.bin"
+    write_chunk_store(blob, [])
+    store = ChunkStore(blob)
+    assert len(store) == 0
+    assert not store.contains_hash(chunk_hash("anything"))
+
+
+def test_writer_resume_truncates_unflushed_chunks(tmp_path):
+    blob = tmp_path / "chunks.bin"
+    writer = ChunkStoreWriter(blob)
+    writer.append_many(TEXTS[:2])
+    checkpoint = writer.position()
+    writer.append_many(TEXTS[2:])  # Written after the last checkpoint
+    writer.close()
+
+    writer = ChunkStoreWriter(blob, resume_from=checkpoint)
+    assert writer.append("resumed") == 2
+    writer.close()
+
+    store = ChunkStore(blob)
+    assert list(store) == TEXTS[:2] + ["resumed"]
+    assert not store.contains_hash(chunk_hash(TEXTS[3]))
+    assert store_paths(blob)[0].stat().st_size == len("".join(TEXTS[:2]).encode("utf-8")) + len("resumed")
+
+
+def test_writer_without_resume_starts_empty(tmp_path):
+    blob = tmp_path / "chunks.bin"
+    write_chunk_store(blob, TEXTS)
+    ChunkStoreWriter(blob).close()
+    assert len(ChunkStore(blob)) == 0
+
+
+def test_truncate_hides_chunks_and_their_hashes(tmp_path):
+    blob = tmp_path / "chunks.bin"
+    write_chunk_store(blob, TEXTS)
+    store = ChunkStore(blob)
+    store.extend(["tail one", "tail two"])
+
+    store.truncate(len(TEXTS) + 1)
+    assert list(store)[-1] == "tail one"
+
+    store.truncate(2)
+    assert list(store) == TEXTS[:2]
+    assert store.contains_hash(chunk_hash(TEXTS[1]))
+    assert not store.contains_hash(chunk_hash(TEXTS[3]))
+    assert store.stats()["tail_chunks"] == 0
+    store.append("new tail")
+    assert store[2] == "new tail"
@@ -0,0 +1,77 @@
+import numpy as np
+
+from chunking import SentenceChunker, chunk_spans_from_offsets
+
+SENTENCES = [
+    "The cat sat on the mat.",
+    "It was a sunny day outside.",
+    "Birds sang in the old oak tree.",
+    "Nobody noticed the time passing.",
+]
+TEXT = " ".join(SENTENCES)
+
+
+def _word_count(text):
+    return len(SentenceChunker().token_offsets([text])[0])
+
+
+def test_chunks_end_on_sentence_boundaries():
+    chunker = SentenceChunker(max_tokens=16, overlap_tokens=0)
+    chunks = chunker.chunk(TEXT)
+
+    assert chunks == [" ".join(SENTENCES[:2]), " ".join(SENTENCES[2:])]
+    assert all(_word_count(chunk) <= 16 for chunk in chunks)
+
+
+def test_short_text_is_one_chunk():
+    assert SentenceChunker(max_tokens=100).chunk(TEXT) == [TEXT]
+    assert SentenceChunker().chunk("") == []
+
+
+def test_overlap_repeats_trailing_sentences():
+    chunker = SentenceChunker(max_tokens=16, overlap_tokens=8)
+    chunks = chunker.chunk(TEXT)
+
+    assert chunks[0] == " ".join(SENTENCES[:2])
+    assert chunks[1].startswith(SENTENCES[1])
+    assert chunks[-1].endswith(SENTENCES[-1])
+
+
+def test_long_sentence_is_split_between_words():
+    text = " ".join(f"word{i}" for i in range(25)) + "."
+    chunks = SentenceChunker(max_tokens=10, overlap_tokens=0).chunk(text)
+
+    assert len(chunks) == 3
+    assert " ".join(chunks) == text
+    assert all(_word_count(chunk) <= 10 for chunk in chunks)
+
+
+def test_spans_index_into_the_document():
+    chunker = SentenceChunker(max_tokens=16, overlap_tokens=0)
+    spans = chunker.spans(TEXT)
+
+    assert spans.dtype == np.int64 and spans.shape == (2, 2)
+    assert [TEXT[s:e] for s, e in spans.tolist()] == chunker.chunk(TEXT)
+
+
+def test_chunk_documents_matches_per_document_chunking():
+    chunker = SentenceChunker(max_tokens=16, overlap_tokens=4)
+    documents = [TEXT, "", "One short sentence."]
+    batch = chunker.chunk_documents(documents)
+
+    assert batch.doc_ids.tolist() == [0] * len(chunker.chunk(TEXT)) + [2]
+    assert batch.texts(documents) == chunker.chunk(TEXT) + chunker.chunk(documents[2])
+
+
+def test_no_tokens_gives_no_spans():
+    assert chunk_spans_from_offsets("", np.zeros((0, 2), dtype=np.int64), max_tokens=8).shape == (0, 2)
+
+
+def test_for_model_uses_the_model_input_limit():
+    class Model:
+        max_seq_length = 128
+        tokenizer = None
+
+    chunker = SentenceChunker.for_model(Model())
+    assert chunker.max_tokens == 126
+    assert chunker.params() == {"tokenizer": "words", "max_tokens": 126, "overlap_tokens": 32}
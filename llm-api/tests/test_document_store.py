@@ -0,0 +1,147 @@
+import os
+import time
+
+import numpy as np
+
+from document_store import DocumentJournal, DocumentRegistry, STALE_SEGMENT_SECONDS, apply_ops
+
+
+def _put(doc_id, chunks):
+    return {"op": "put", "id": doc_id, "chunks": chunks}
+
+
+def _append(journal, ops, n_chunks):
+    return journal.append(ops, np.full((n_chunks, 4), len(ops), dtype="float32"))
+
+
+def test_journal_yields_committed_segments_in_order(tmp_path):
+    journal = DocumentJournal(tmp_path)
+    assert _append(journal, [_put("a", ["x"])], 1) == 1
+    assert _append(journal, [_put("b", ["y", "z"])], 2) == 2
+    assert _append(journal, [{"op": "delete", "id": "a"}], 0) == 3
+
+    segments = list(journal.committed())
+    assert [seq for seq, _, _ in segments] == [1, 2, 3]
+    assert segments[1][1] == [_put("b", ["y", "z"])]
+    assert segments[1][2].shape == (2, 4)
+    assert [seq for seq, _, _ in journal.committed(skip={2})] == [1, 3]
+
+
+def test_journal_stops_at_segment_being_written(tmp_path):
+    journal = DocumentJournal(tmp_path)
+    _append(journal, [_put("a", ["x"])], 1)
+    (tmp_path / "segment-00000002.jsonl").write_text("")  # Operations written, embeddings not yet
+    _append(journal, [_put("b", ["y"])], 1)
+
+    assert [seq for seq, _, _ in journal.committed()] == [1]
+
+
+def test_journal_skips_abandoned_segment(tmp_path):
+    journal = DocumentJournal(tmp_path)
+    _append(journal, [_put("a", ["x"])], 1)
+    abandoned = tmp_path / "segment-00000002.jsonl"
+    abandoned.write_text("")
+    old = time.time() - STALE_SEGMENT_SECONDS - 1
+    os.utime(abandoned, (old, old))
+    _append(journal, [_put("b", ["y"])], 1)
+
+    assert [seq for seq, _, _ in journal.committed()] == [1, 3]
+
+
+def test_journal_reports_segments_in_flight_up_to_a_bound(tmp_path):
+    journal = DocumentJournal(tmp_path)
+    _append(journal, [_put("a", ["x"])], 1)
+    (tmp_path / "segment-00000002.jsonl").write_text("")
+    _append(journal, [_put("b", ["y"])], 1)
+
+    assert journal.in_flight() == [2]
+    assert journal.in_flight(through=1) == []
+    assert journal.in_flight(skip={2}) == []
+    assert [seq for seq, _, _ in journal.committed(through=1)] == [1]
+
+    np.save(tmp_path / "segment-00000002.npy", np.zeros((0, 4), dtype="float32"))
+    assert journal.in_flight() == []
+    assert [seq for seq, _, _ in journal.committed(through=2)] == [1, 2]
+
+
+def test_journal_append_never_reuses_sequence_numbers(tmp_path):
+    journal = DocumentJournal(tmp_path)
+    _append(journal, [_put("a", ["x"])], 1)
+    _append(journal, [_put("b", ["y"])], 1)
+    journal.mark_folded(2)
+    journal.remove([1, 2])
+    assert list(journal.committed()) == []
+    assert _append(journal, [_put("c", ["z"])], 1) == 3
+
+    # Another worker created the next segment between our scan and our create
+    (tmp_path / "segment-00000004.jsonl").write_text("")
+    assert DocumentJournal(tmp_path).append([], np.zeros((0, 4), dtype="float32")) == 5
+
+
+def test_journal_clear_folds_everything(tmp_path):
+    journal = DocumentJournal(tmp_path, digits=6)
+    _append(journal, [_put("a", ["x"])], 1)
+    _append(journal, [_put("b", ["y"])], 1)
+    assert (tmp_path / "segment-000002.npy").exists()
+
+    assert journal.clear() == [1, 2]
+    assert journal.folded_through() == 2
+    assert list(tmp_path.glob("segment-*")) == []
+    assert _append(journal, [_put("c", ["z"])], 1) == 3
+
+
+def test_registry_tombstones_replaced_and_deleted_ranges():
+    registry = DocumentRegistry()
+    registry.put("a", 0, 3)
+    registry.put("b", 3, 5)
+    assert registry.put("a", 5, 7) == (0, 3)
+    assert registry.delete("b") == (3, 5)
+    assert registry.delete("missing") is None
+
+    assert registry.deleted_count == 5
+    assert registry.live_mask(8).tolist() == [False] * 5 + [True] * 3
+    assert registry.is_deleted(np.array([0, 4, 5, -1, 100])).tolist() == [True, True, False, False, False]
+    registry.delete("a")
+    assert registry.deleted_count == 7
+
+
+def test_registry_renumbered_after_compaction():
+    registry = DocumentRegistry()
+    registry.put("a", 0, 2)
+    registry.put("b", 2, 4)
+    registry.put("c", 4, 5)
+    registry.put("a", 5, 6)  # Tombstones 0..1
+
+    compacted = registry.renumbered(registry.live_mask(6))
+    assert compacted.ranges == {"b": (0, 2), "c": (2, 3), "a": (3, 4)}
+    assert compacted.deleted_count == 0
+
+
+def test_registry_save_and_load(tmp_path):
+    registry = DocumentRegistry()
+    registry.put("a", 0, 2)
+    registry.put("b", 2, 6)
+    registry.save(tmp_path / "documents.jsonl")
+
+    assert DocumentRegistry.load(tmp_path / "documents.jsonl").ranges == registry.ranges
+    assert DocumentRegistry.load(tmp_path / "documents.jsonl", limit=4).ranges == {"a": (0, 2)}
+    assert len(DocumentRegistry.load(tmp_path / "missing.jsonl")) == 0
+
+
+class _ListIndex:
+    def __init__(self):
+        self.rows = []
+
+    def add(self, embeddings):
+        self.rows.extend(embeddings.tolist())
+
+
+def test_apply_ops_appends_chunks_and_tombstones():
+    index, chunks, registry = _ListIndex(), [], DocumentRegistry()
+    ops = [_put("a", ["x", "y"]), _put("b", ["z"]), _put("a", ["w"]), {"op": "delete", "id": "b"}]
+    apply_ops(index, chunks, registry, ops, np.arange(8, dtype="float32").reshape(4, 2))
+
+    assert chunks == ["x", "y", "z", "w"]
+    assert index.rows[3] == [6.0, 7.0]
+    assert registry.ranges == {"a": (3, 4)}
+    assert registry.live_mask(4).tolist() == [False, False, False, True]
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, normalize_query
+
+
+def _vector(seed):
+    return np.random.default_rng(seed).random(4).astype("float32")
+
+
+def test_normalize_query():
+    assert normalize_query("  What IS\tRAG?\n") == "what is rag?"
+    assert normalize_query("ｆｕｌｌ width") == "full width"  # NFKC
+
+
+def test_hits_on_normalized_query_per_model():
+    cache = EmbeddingCache(max_size=10)
+    cache.put("model-a", "What is RAG?", _vector(0))
+
+    np.testing.assert_array_equal(cache.get("model-a", "  what is rag? "), _vector(0))
+    assert cache.get("model-b", "What is RAG?") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_returns_copies():
+    cache = EmbeddingCache()
+    cache.put("m", "q", _vector(0))
+    cache.get("m", "q")[:] = 0
+    np.testing.assert_array_equal(cache.get("m", "q"), _vector(0))
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache(max_size=2)
+    cache.put("m", "a", _vector(0))
+    cache.put("m", "b", _vector(1))
+    cache.get("m", "a")  # b is now least recently used
+    cache.put("m", "c", _vector(2))
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") is not None and cache.get("m", "c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = EmbeddingCache(ttl_seconds=0.01)
+    cache.put("m", "q", _vector(0))
+    time.sleep(0.02)
+    assert cache.get("m", "q") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache():
+    cache = EmbeddingCache(max_size=0)
+    cache.put("m", "q", _vector(0))
+    assert cache.get("m", "q") is None
+    assert cache.stats()["misses"] == 0
+
+
+def test_save_and_load_keep_lru_order(tmp_path):
+    cache = EmbeddingCache(max_size=10)
+    for i, query in enumerate(["a", "b", "c"]):
+        cache.put("m", query, _vector(i))
+    assert cache.save(tmp_path / "embeddings.npz") == 3
+
+    restored = EmbeddingCache(max_size=2)
+    assert restored.load(tmp_path / "embeddings.npz") == 3
+    assert restored.get("m", "a") is None  # Oldest entry beyond max_size
+    np.testing.assert_array_equal(restored.get("m", "c"), _vector(2))
+    assert EmbeddingCache().load(tmp_path / "missing.npz") == 0
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from fetch_cache import CachedResponse, MemoryFetchCache, SQLiteFetchCache, TieredFetchCache
+
+
+def _response(body="page", status_code=200, etag=None, age=0.0, ttl=60.0):
+    now = time.time() - age
+    return CachedResponse(status_code, body, "text/html", etag, None, now, now + ttl)
+
+
+def test_freshness_and_revalidation():
+    assert _response().is_fresh()
+    assert not _response(age=120).is_fresh()
+    assert _response(etag='"v1"').can_revalidate()
+    assert not _response().can_revalidate()
+    assert not _response(status_code=404, etag='"v1"').can_revalidate()
+
+
+def test_memory_lru():
+    cache = MemoryFetchCache(max_entries=2)
+    cache.put("a", _response("a"))
+    cache.put("b", _response("b"))
+    cache.get("a")
+    cache.put("c", _response("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == "a" and cache.get("c").body == "c"
+    assert cache.stats() == {"memory_entries": 2, "memory_max_entries": 2}
+
+    disabled = MemoryFetchCache(max_entries=0)
+    disabled.put("a", _response())
+    assert disabled.get("a") is None
+
+
+def test_sqlite_roundtrip_and_pruning(tmp_path):
+    db = tmp_path / "fetch.sqlite"
+    cache = SQLiteFetchCache(db)
+    cache.put("fresh", _response("fresh", etag='"v1"'))
+    cache.put("old", _response("old", age=3600))
+    assert cache.get("fresh") == cache.get("fresh")
+    assert cache.get("fresh").etag == '"v1"'
+    cache.close()
+
+    reopened = SQLiteFetchCache(db, max_age=60)
+    assert reopened.get("old") is None
+    assert reopened.get("fresh").body == "fresh"
+    assert reopened.stats()["disk_entries"] == 1
+    reopened.close()
+
+
+def test_tiered_promotes_disk_hits(tmp_path):
+    disk = SQLiteFetchCache(tmp_path / "fetch.sqlite")
+    disk.put("k", _response("from disk"))
+    cache = TieredFetchCache(MemoryFetchCache(), disk)
+
+    assert cache.memory.get("k") is None
+    assert cache.get("k").body == "from disk"
+    assert cache.memory.get("k").body == "from disk"
+    cache.close()
+
+
+def test_async_variants_use_both_tiers(tmp_path):
+    db = tmp_path / "fetch.sqlite"
+    cache = TieredFetchCache(MemoryFetchCache(), SQLiteFetchCache(db))
+
+    async def main():
+        await cache.aput("k", _response("stored"))
+        return await cache.aget("k"), await cache.aget("missing")
+
+    hit, miss = asyncio.run(main())
+    assert hit.body == "stored" and miss is None
+    cache.close()
+
+    restarted = TieredFetchCache(MemoryFetchCache(), SQLiteFetchCache(db))
+    assert asyncio.run(restarted.aget("k")).body == "stored"
+    restarted.close()
+
+
+def test_outcome_counters(tmp_path):
+    cache = TieredFetchCache(MemoryFetchCache(max_entries=8), SQLiteFetchCache(tmp_path / "fetch.sqlite"))
+    cache.put("k", _response())
+    for outcome in ("hit", "hit", "negative_hit", "revalidated", "miss"):
+        cache.record(outcome)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["negative_hits"], stats["revalidated"], stats["misses"]) == (2, 1, 1, 1)
+    assert stats["memory_entries"] == 1 and stats["disk_entries"] == 1
+    cache.close()
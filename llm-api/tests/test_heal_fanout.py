@@ -0,0 +1,103 @@
+import asyncio
+
+from heal_fanout import HealFanout
+
+
+async def _lookup(source, delay, text="text"):
+    await asyncio.sleep(delay)
+    return (source, text) if text is not None else None
+
+
+async def _failing(delay):
+    await asyncio.sleep(delay)
+    raise RuntimeError("lookup failed")
+
+
+def _run(fanout_setup, deadline=1.0, enough=lambda texts: False):
+    async def main():
+        fanout = HealFanout(deadline, enough)
+        fanout_setup(fanout)
+        return await fanout.run()
+
+    return asyncio.run(main())
+
+
+def test_collects_all_results_by_priority():
+    def setup(fanout):
+        fanout.launch(_lookup("slow", 0.03), priority=0)
+        fanout.launch(_lookup("fast", 0.01), priority=1)
+        fanout.launch(_lookup("empty", 0.01, text=""), priority=2)
+        fanout.launch(_lookup("none", 0.01, text=None), priority=3)
+        fanout.launch(_failing(0.01), priority=4)
+
+    result = _run(setup)
+    assert [t.source for t in result.texts] == ["slow", "fast"]
+    assert not result.timed_out and result.cancelled == 0
+
+
+def test_stops_once_enough():
+    def setup(fanout):
+        fanout.launch(_lookup("a", 0.01), priority=0)
+        fanout.launch(_lookup("b", 0.02), priority=1)
+        fanout.launch(_lookup("slow", 5.0), priority=2)
+
+    result = _run(setup, enough=lambda texts: len(texts) >= 2)
+    assert [t.source for t in result.texts] == ["a", "b"]
+    assert not result.timed_out
+    assert result.cancelled == 1
+    assert result.elapsed < 1.0
+
+
+def test_deadline_returns_partial_results():
+    def setup(fanout):
+        fanout.launch(_lookup("fast", 0.01), priority=1)
+        fanout.launch(_lookup("slow", 5.0), priority=0)
+
+    result = _run(setup, deadline=0.1)
+    assert [t.source for t in result.texts] == ["fast"]
+    assert result.timed_out and result.cancelled == 1
+    assert result.elapsed < 1.0
+
+
+def test_group_waits_for_higher_priority_member():
+    def setup(fanout):
+        fanout.launch(_lookup("wiki-exact", 0.05), priority=0, group="wiki")
+        fanout.launch(_lookup("wiki-variant", 0.01), priority=1, group="wiki")
+
+    result = _run(setup)
+    assert [t.source for t in result.texts] == ["wiki-exact"]
+
+
+def test_group_falls_back_when_higher_priority_member_fails():
+    def setup(fanout):
+        fanout.launch(_failing(0.02), priority=0, group="wiki")
+        fanout.launch(_lookup("wiki-variant", 0.01), priority=1, group="wiki")
+        fanout.launch(_lookup("wiki-other", 5.0), priority=2, group="wiki")
+
+    result = _run(setup)
+    assert [t.source for t in result.texts] == ["wiki-variant"]
+    assert result.cancelled == 1
+    assert result.elapsed < 1.0
+
+
+def test_group_takes_best_finished_member_at_deadline():
+    def setup(fanout):
+        fanout.launch(_lookup("wiki-exact", 5.0), priority=0, group="wiki")
+        fanout.launch(_lookup("wiki-variant", 0.01), priority=1, group="wiki")
+
+    result = _run(setup, deadline=0.1)
+    assert [t.source for t in result.texts] == ["wiki-variant"]
+    assert result.timed_out
+
+
+def test_lookup_can_launch_more_lookups():
+    def setup(fanout):
+        async def search():
+            await asyncio.sleep(0.01)
+            fanout.launch(_lookup("page", 0.01), priority=2)
+            return None
+
+        fanout.launch(search(), priority=1)
+
+    result = _run(setup)
+    assert [t.source for t in result.texts] == ["page"]
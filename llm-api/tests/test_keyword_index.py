@@ -0,0 +1,54 @@
+from keyword_index import KeywordIndex, jaccard, word_tokens
+
+DOCUMENTS = [
+    "Python is a programming language.",
+    "FAISS indexes dense vectors for similarity search.",
+    "Python bindings make FAISS easy to use from Python.",
+    "Nothing relevant here.",
+]
+
+
+def _matched(matched, query_terms, doc_terms):
+    return matched
+
+
+def test_word_tokens_drop_punctuation_and_case():
+    assert word_tokens("Hello, WORLD! hello-world") == {"hello", "world"}
+
+
+def test_postings_and_document_frequency():
+    index = KeywordIndex(DOCUMENTS)
+
+    assert len(index) == 4
+    assert index.document_frequency("python") == 2
+    assert index.document_frequency("faiss") == 2
+    assert index.document_frequency("missing") == 0
+    assert index.matches(["python", "faiss", "missing"]) == {0: 1, 1: 1, 2: 2}
+    assert index.stats()["documents"] == 4
+
+
+def test_search_ranks_by_score_and_keeps_document_order_on_ties():
+    index = KeywordIndex(DOCUMENTS)
+
+    results = index.search("python faiss", k=3, score=_matched)
+    assert [doc for doc, _ in results] == [DOCUMENTS[2], DOCUMENTS[0], DOCUMENTS[1]]
+    assert [score for _, score in results] == [2, 1, 1]
+
+
+def test_search_skips_non_positive_scores():
+    index = KeywordIndex(DOCUMENTS)
+
+    assert index.search("unknown words", k=3, score=_matched) == []
+    assert index.search("python", k=3, score=lambda matched, q, d: 0) == []
+
+
+def test_custom_tokenizer():
+    index = KeywordIndex(["a-b c", "c d"], tokenize=str.split)
+
+    assert index.matches(["a-b", "c"]) == {0: 2, 1: 1}
+
+
+def test_jaccard():
+    assert jaccard(2, 2, 2) == 1.0
+    assert jaccard(1, 2, 3) == 0.25
+    assert jaccard(0, 0, 0) == 0
@@ -0,0 +1,102 @@
+import random
+
+import numpy as np
+import pytest
+
+import lexical_index
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
+WORDS = ["alpha", "beta", "gamma", "delta", "healing", "index", "query", "python", "faiss", "chunk", "retrieval"]
+
+
+def _corpus(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))) for _ in range(n)]
+
+
+def _assert_same_scores(a, b, queries):
+    assert a.n_docs == b.n_docs
+    assert a.total_len == pytest.approx(b.total_len)
+    for query in queries:
+        a_pos, a_scores, a_cov = a.score(query)
+        b_pos, b_scores, b_cov = b.score(query)
+        np.testing.assert_array_equal(a_pos, b_pos)
+        np.testing.assert_allclose(a_scores, b_scores, rtol=1e-5)
+        np.testing.assert_allclose(a_cov, b_cov, rtol=1e-5)
+
+
+QUERIES = ["alpha", "healing index", "python faiss chunk", "unknown words", "query query retrieval"]
+
+
+def test_delta_matches_fresh_build():
+    texts = _corpus(300)
+    fresh = BM25Index.build(texts)
+
+    incremental = BM25Index.build(texts[:200])
+    assert incremental.add(texts[200:]) == 100
+    _assert_same_scores(incremental, fresh, QUERIES)  # Scored from arrays plus delta
+
+    incremental.merge_delta()
+    assert incremental._delta_len == []
+    _assert_same_scores(incremental, fresh, QUERIES)
+
+
+def test_add_leaves_merging_to_the_caller(monkeypatch):
+    monkeypatch.setattr(lexical_index, "MERGE_MIN_DELTA", 20)
+    texts = _corpus(30, seed=1)
+    index = BM25Index.build([])
+    index.add(texts)
+
+    assert len(index._delta_len) == 30 and len(index.doc_len) == 0
+    assert index.needs_merge()
+    assert index.merge_delta() == 30
+    assert not index.needs_merge()
+    _assert_same_scores(index, BM25Index.build(texts), QUERIES)
+
+
+def test_merge_keeps_chunks_added_while_sorting():
+    texts = _corpus(60, seed=2)
+    index = BM25Index.build(texts[:20])
+    index.add(texts[20:40])
+
+    class Lock:
+        """Stands in for base_index_lock; a search thread adds chunks between the snapshot and the swap."""
+
+        acquired = 0
+
+        def __enter__(self):
+            Lock.acquired += 1
+            if Lock.acquired == 2:
+                index.add(texts[40:])
+
+        def __exit__(self, *exc):
+            return False
+
+    assert index.merge_delta(lock=Lock()) == 20
+    assert len(index.doc_len) == 40 and len(index._delta_len) == 20
+    _assert_same_scores(index, BM25Index.build(texts), QUERIES)
+
+
+def test_search_pads_and_excludes():
+    index = BM25Index.build(["healing rag", "rag index", "unrelated text"])
+    scores, ids, coverage = index.search(["rag healing"], k=4)
+    assert ids[0].tolist()[:2] == [0, 1]
+    assert ids[0, 3] == -1 and scores[0, 3] == -np.inf
+    assert coverage[0, 0] == pytest.approx(1.0)
+
+    _, ids, _ = index.search(["rag healing"], k=4, exclude=lambda positions: positions == 0)
+    assert ids[0].tolist()[:2] == [1, -1]
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    texts = _corpus(50)
+    index = BM25Index.build(texts[:40])
+    index.add(texts[40:])
+    index.save(tmp_path / "lexical.npz")
+
+    _assert_same_scores(BM25Index.load(tmp_path / "lexical.npz"), BM25Index.build(texts), QUERIES)
+
+
+def test_reciprocal_rank_fusion_prefers_agreement():
+    ids, _ = reciprocal_rank_fusion([np.array([1, 2, 3]), np.array([2, 3, -1])], k=2)
+    assert ids.tolist() == [2, 3]
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from outbound_http import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, TokenBucket, parse_host_rates
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(False)
+    breaker.record(True)  # Success resets the count
+    for _ in range(2):
+        breaker.record(False)
+    assert breaker.state == CLOSED
+
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.opened == 1
+    assert not breaker.allow()
+    assert 0 < breaker.retry_after() <= 60
+
+
+def test_breaker_half_open_trial_closes_or_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    breaker.record(False)
+    assert not breaker.allow()
+    time.sleep(0.06)
+
+    assert breaker.allow()  # The single trial request
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.opened == 2
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()  # Trial abandoned without a verdict
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.allow() and breaker.retry_after() == 0.0
+
+
+def test_breaker_disabled_with_zero_threshold():
+    breaker = CircuitBreaker(failure_threshold=0, cooldown=60)
+    for _ in range(10):
+        breaker.record(False)
+    assert breaker.allow() and breaker.state == CLOSED
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve(max_wait=0) == 0.0
+    assert bucket.reserve(max_wait=0) == 0.0
+    assert bucket.reserve(max_wait=0) is None  # Nothing taken
+    assert bucket.reserve(max_wait=1) == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve(max_wait=1) == pytest.approx(0.2, abs=0.02)
+
+
+def test_token_bucket_unlimited():
+    bucket = TokenBucket(rate=0, burst=1)
+    assert all(bucket.reserve(max_wait=0) == 0.0 for _ in range(100))
+
+
+def test_parse_host_rates():
+    assert parse_host_rates("en.wikipedia.org=5:10, API.example.com=0.5") == {
+        "en.wikipedia.org": (5.0, 10.0),
+        "api.example.com": (0.5, None),
+    }
+    assert parse_host_rates("") == {}
+    with pytest.raises(ValueError):
+        parse_host_rates("host=fast")
@@ -0,0 +1,105 @@
+import asyncio
+
+from preheal import PreHealWorker, load_seed_topics
+
+
+def _worker(heal, **kwargs):
+    kwargs.setdefault("idle_seconds", 0)
+    return PreHealWorker(heal, lambda query: query.lower(), **kwargs)
+
+
+def test_offers_are_deduplicated_and_bounded():
+    healed = []
+
+    async def heal(query, threshold):
+        healed.append(query)
+        return "healed"
+
+    async def main():
+        worker = _worker(heal, max_queue=2, idle_seconds=60)  # Never idle: nothing is healed
+        assert not worker.offer("before start", 0.5)
+        worker.start()
+        assert worker.offer("Topic A", 0.5)
+        assert not worker.offer("topic a", 0.5)
+        assert worker.offer("Topic B", 0.5)
+        assert not worker.offer("Topic C", 0.5)
+        await worker.stop()
+        return worker.stats()
+
+    stats = asyncio.run(main())
+    assert healed == []
+    assert (stats["offered"], stats["deduplicated"], stats["dropped"], stats["queued"]) == (4, 1, 1, 2)
+
+
+def test_attempted_topics_are_not_requeued():
+    outcomes = iter(["failed", "healed"])
+
+    async def heal(query, threshold):
+        return next(outcomes)
+
+    async def main():
+        worker = _worker(heal)
+        worker.start()
+        worker.offer("topic", 0.5)
+        await worker._queue.join()
+        requeued = worker.offer("topic", 0.5)
+        await worker.stop()
+        return requeued, worker.stats()
+
+    requeued, stats = asyncio.run(main())
+    assert not requeued
+    assert stats["failed"] == 1 and stats["deduplicated"] == 1
+
+
+def test_waits_for_idle():
+    healed = []
+
+    async def heal(query, threshold):
+        healed.append(query)
+        return "healed"
+
+    async def main():
+        worker = _worker(heal, idle_seconds=0.1)
+        worker.start()
+        with worker.busy():
+            worker.offer("topic", 0.5)
+            await asyncio.sleep(0.3)
+            during = list(healed)
+        await asyncio.sleep(0.5)
+        await worker.stop()
+        return during
+
+    assert asyncio.run(main()) == []
+    assert healed == ["topic"]
+
+
+def test_workers_sharing_claim_dir_heal_each_topic_once(tmp_path):
+    healed = []
+
+    async def heal(query, threshold):
+        healed.append(query)
+        await asyncio.sleep(0.1)
+        return "healed"
+
+    async def main():
+        workers = [_worker(heal, claim_dir=tmp_path) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+            worker.offer("Topic", 0.5)
+        await asyncio.sleep(0.3)
+        late = _worker(heal, claim_dir=tmp_path)  # Another process starting later
+        late.start()
+        late.offer("topic", 0.5)
+        await asyncio.sleep(0.3)
+        for worker in workers + [late]:
+            await worker.stop()
+        return sum(worker.counters["other_worker"] for worker in workers + [late])
+
+    assert asyncio.run(main()) == 2
+    assert healed == ["Topic"]
+
+
+def test_load_seed_topics(tmp_path):
+    path = tmp_path / "topics.txt"
+    path.write_text("# seeds\nquantum computing\n\n  rust borrow checker  \n", encoding="utf-8")
+    assert load_seed_topics(path) == ["quantum computing", "rust borrow checker"]
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from pipeline_metrics import Histogram
+from query_batcher import QueryBatcher
+
+
+def _recording_runner(calls):
+    async def runner(key, items):
+        calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    return runner
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(1, 4))
+    for value in (1, 3, 10):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"1": 1, "4": 2, "+Inf": 3}
+    assert snapshot["count"] == 3 and snapshot["sum"] == 14
+
+
+def test_coalesces_concurrent_submissions():
+    calls = []
+
+    async def main():
+        batcher = QueryBatcher(_recording_runner(calls), max_batch_size=8, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        return batcher, results
+
+    batcher, results = asyncio.run(main())
+    assert results == ["None:0", "None:1", "None:2"]
+    assert calls == [(None, [0, 1, 2])]
+    assert batcher.stats()["batches"] == 1 and batcher.stats()["items"] == 3
+
+
+def test_full_batch_starts_without_waiting():
+    calls = []
+
+    async def main():
+        batcher = QueryBatcher(_recording_runner(calls), max_batch_size=2, max_wait_ms=10_000)
+        return await asyncio.wait_for(asyncio.gather(batcher.submit("a"), batcher.submit("b")), timeout=1)
+
+    assert asyncio.run(main()) == ["None:a", "None:b"]
+    assert calls == [(None, ["a", "b"])]
+
+
+def test_items_with_different_keys_are_not_mixed():
+    calls = []
+
+    async def main():
+        batcher = QueryBatcher(_recording_runner(calls), max_wait_ms=5)
+        return await asyncio.gather(batcher.submit(1, key="x"), batcher.submit(2, key="y"), batcher.submit(3, key="x"))
+
+    assert asyncio.run(main()) == ["x:1", "y:2", "x:3"]
+    assert sorted(calls) == [("x", [1, 3]), ("y", [2])]
+
+
+def test_runner_errors_reach_every_caller():
+    async def failing(key, items):
+        raise ValueError("encode failed")
+
+    async def wrong_length(key, items):
+        return items[:1]
+
+    async def main(runner):
+        batcher = QueryBatcher(runner, max_wait_ms=5)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main(failing)))
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(main(wrong_length)))
+
+
+def test_flush_all_starts_pending_batches():
+    calls = []
+
+    async def main():
+        batcher = QueryBatcher(_recording_runner(calls), max_wait_ms=10_000)
+        task = asyncio.ensure_future(batcher.submit("q"))
+        await asyncio.sleep(0)
+        assert batcher.depth == 1
+        batcher.flush_all()
+        return await asyncio.wait_for(task, timeout=1)
+
+    assert asyncio.run(main()) == "None:q"
+    assert calls == [(None, ["q"])]
+
+
+@pytest.mark.parametrize("max_wait_ms", [0, -1])
+def test_zero_wait_disables_coalescing(max_wait_ms):
+    calls = []
+
+    async def main():
+        batcher = QueryBatcher(_recording_runner(calls), max_wait_ms=max_wait_ms)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    assert asyncio.run(main()) == ["None:1", "None:2"]
+    assert calls == [(None, [1]), (None, [2])]
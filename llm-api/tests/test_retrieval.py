@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from retrieval import RetrievalResult
+
+CHUNKS = ["zero", "one", "two", "three"]
+
+
+def _result():
+    scores = np.array([[0.9, 0.5, 0.1], [0.8, -np.inf, -np.inf]], dtype=np.float32)
+    ids = np.array([[2, 0, 3], [1, -1, -1]])
+    return RetrievalResult.from_search(CHUNKS, scores, ids, min_score=0.15)
+
+
+def test_from_search_masks_padding_and_low_scores():
+    result = _result()
+
+    assert result.mask.tolist() == [[True, True, False], [True, False, False]]
+    assert result.docs(0) == ["two", "zero"]
+    assert result.docs(1) == ["one"]
+    assert result.texts[0, 2] is None  # Masked hits are not looked up
+
+
+def test_counts_and_mean_scores():
+    result = _result()
+
+    assert result.counts().tolist() == [2, 1]
+    np.testing.assert_allclose(result.mean_scores(), [0.7, 0.8], rtol=1e-6)
+    assert result.docs_and_score(0) == (["two", "zero"], pytest.approx(0.7))
+    assert result.hits(1) == [("one", pytest.approx(0.8))]
+
+
+def test_rows_and_iteration():
+    result = _result()
+
+    rows = list(result)
+    assert len(rows) == 2 and all(len(row) == 1 for row in rows)
+    assert rows[1].docs() == ["one"]
+    assert result[0].ids.shape == (1, 3)
+
+
+def test_filter_narrows_the_mask():
+    result = _result()
+
+    assert result.filter(min_score=0.6).docs(0) == ["two"]
+    keep = np.array([[False, True, True], [True, True, True]])
+    assert result.filter(keep=keep).docs(0) == ["zero"]
+    assert result.docs(0) == ["two", "zero"]  # The original is unchanged
+
+
+def test_empty_and_1d_input():
+    empty = RetrievalResult.empty(2)
+    assert len(empty) == 2
+    assert empty.mean_scores().tolist() == [0.0, 0.0]
+    assert empty.docs_and_score(1) == ([], 0.0)
+
+    single = RetrievalResult.from_search(CHUNKS, np.array([0.5, 0.2]), np.array([3, 1]), min_score=0.15)
+    assert single.ids.shape == (1, 2)
+    assert single.docs() == ["three", "one"]
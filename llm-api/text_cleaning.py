@@ -0,0 +1,141 @@
+"""
+Text cleaning for scraped and fetched content.
+
+clean_text() strips web boilerplate (cookie banners, share buttons, URLs,
+e-mail addresses, ...) from extracted page text. Every pattern is compiled
+once at import. The noise patterns are matched against a lowercased copy of
+the text, which keeps their case-insensitive, in-order removal semantics but
+avoids an IGNORECASE scan of the whole text for each of them; passes whose
+trigger substring is absent are skipped entirely.
+
+The output is identical to applying the patterns one by one with re.sub
+(benchmarks/bench_clean_text.py checks this against the original
+implementation on the fixture corpus).
+"""
+
+import re
+from typing import List, Tuple
+
+BAD_PATTERNS = [
+    r"accept all cookies",
+    r"manage preferences",
+    r"privacy policy",
+    r"cookie",
+    r"we value your privacy",
+    r"essential cookies",
+    r"skip to main",
+    r"skip to content",
+    r"menu",
+    r"navigation",
+    r"subscribe",
+    r"newsletter",
+    r"sign up",
+    r"log in",
+    r"register",
+    r"follow us",
+    r"share on",
+    r"tweet",
+    r"facebook",
+    r"instagram",
+    r"linkedin",
+    r"twitter",
+    r"copyright.*?copyright",
+    r"all rights reserved",
+    r"related articles",
+    r"you may also like",
+    r"read more",
+    r"click here",
+    r"advertisement",
+    r"ad",
+]
+
+COMMON_SHORT_WORDS = {'ai', 'it', 'we', 'is', 'an', 'a', 'of', 'to', 'in', 'on', 'at', 'be', 'as', 'or', 'if'}
+
+# Line breaks and tabs: each run becomes one space (separate passes, so "\n\r" -> "  ")
+_BREAK_RES = [(ch, re.compile(re.escape(ch) + '+')) for ch in ('\n', '\r', '\t')]
+_URL_RE = re.compile(r'http[s]?://\S+')
+_WWW_RE = re.compile(r'www\.\S+')
+# Same matches as r'\S+@\S+' (a match always spans a whole non-space run), without
+# retrying the greedy \S+ from every position inside long runs
+_EMAIL_RE = re.compile(r'(?<!\S)\S+@\S+')
+_HEADER_RULE_RE = re.compile(r'^=+\s*$', re.MULTILINE)
+_HEADER_MARK_RE = re.compile(r'^#+\s*', re.MULTILINE)
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)\'\"\&\%\$\#]')
+
+# Noise patterns, in order: case-sensitive versions for matching the lowercased text
+# and IGNORECASE versions for the fallback path
+_BAD_LOWER_RES = [re.compile(p.lower()) for p in BAD_PATTERNS]
+_BAD_IGNORECASE_RES = [re.compile(p, re.IGNORECASE) for p in BAD_PATTERNS]
+# Characters that re.IGNORECASE matches to ASCII letters but str.lower() does not map
+# to them (or maps to two characters): dotted/dotless I and long s
+_FOLD_MISMATCH_RE = re.compile('[İıſ]')
+
+
+def _cut_spans(text: str, spans: List[Tuple[int, int]]) -> str:
+    pieces = []
+    pos = 0
+    for start, end in spans:
+        pieces.append(text[pos:start])
+        pos = end
+    pieces.append(text[pos:])
+    return ''.join(pieces)
+
+
+def remove_bad_patterns(text: str) -> str:
+    """Remove BAD_PATTERNS case-insensitively, one pattern after another."""
+    if _FOLD_MISMATCH_RE.search(text):
+        for pattern in _BAD_IGNORECASE_RES:
+            text = pattern.sub('', text)
+        return text
+
+    # Without those characters lowering is one-to-one per character, so spans found
+    # in the lowercased copy are the spans re.IGNORECASE would find in the text
+    lowered = text.lower()
+    for pattern in _BAD_LOWER_RES:
+        spans = [m.span() for m in pattern.finditer(lowered)]
+        if spans:
+            text = _cut_spans(text, spans)
+            lowered = _cut_spans(lowered, spans)
+    return text
+
+
+def clean_text(text: str) -> str:
+    """Enhanced text cleaning with better noise removal."""
+    if not isinstance(text, str):
+        return ""
+
+    # Remove excessive whitespace and newlines first
+    for ch, pattern in _BREAK_RES:
+        if ch in text:
+            text = pattern.sub(' ', text)
+
+    # Remove URLs and email addresses
+    if '://' in text:
+        text = _URL_RE.sub('', text)
+    if 'www.' in text:
+        text = _WWW_RE.sub('', text)
+    if '@' in text:
+        text = _EMAIL_RE.sub('', text)
+
+    # Remove common web noise patterns (case-insensitive)
+    text = remove_bad_patterns(text)
+
+    # Remove markdown headers and separators (no newlines are left, so only at the start)
+    if text.startswith('='):
+        text = _HEADER_RULE_RE.sub('', text)
+    if text.startswith('#'):
+        text = _HEADER_MARK_RE.sub('', text)
+
+    # Remove excessive special characters but keep basic punctuation
+    text = _SPECIAL_CHARS_RE.sub(' ', text)
+
+    # Collapse whitespace and remove very short words that are likely noise
+    # (but keep common short words)
+    words = [w for w in text.split() if len(w) > 2 or w.lower() in COMMON_SHORT_WORDS]
+    text = ' '.join(words)
+
+    # Keep only substantial text (lower threshold - 50 chars minimum)
+    if len(text) < 50:
+        return ""
+
+    return text
@@ -73,8 +73,8 @@ MODULE_NAME=$(basename "$PYTHON_FILE" .py)
 python3 -m uvicorn ${MODULE_NAME}:app --host 0.0.0.0 --port 8000 --log-level info &
 LLM_PID=$!
 
-# Wait for LLM API to be ready
-sleep 5
+# Wait for LLM API to bind its port (/health answers while the index loads, /ready once it is loaded)
+wait_for_service "http://localhost:8000/health" "LLM API"
 
 # Start backend server
 echo "Starting backend server on port 3001..."